@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+FFmpeg make 输出模拟器
+
+按指定速率输出与 FFmpeg 编译日志相似的行 (CC/AS/X86ASM/AR/LD/STRIP、编译警告)，
+每行末尾附带发出时间 "t=<时间戳>"，供基准测试计算日志链路延迟。
+
+环境变量:
+    FFAB_BENCH_LINES  输出行数 (默认 2000)
+    FFAB_BENCH_RATE   每秒行数，0 表示不限速 (默认 0)
+"""
+
+import os
+import sys
+import time
+
+SOURCES = [
+    'libavcodec/aacdec.c', 'libavcodec/aacenc.c', 'libavcodec/h264dec.c',
+    'libavcodec/h264_cabac.c', 'libavcodec/h264_cavlc.c', 'libavcodec/h264_mb.c',
+    'libavcodec/hevcdec.c', 'libavcodec/hevc_filter.c', 'libavcodec/mpegaudiodec_fixed.c',
+    'libavcodec/opusdec.c', 'libavcodec/vp9.c', 'libavcodec/utils.c',
+    'libavformat/mov.c', 'libavformat/matroskadec.c', 'libavformat/hls.c',
+    'libavformat/http.c', 'libavformat/rtmpproto.c', 'libavformat/utils.c',
+    'libavutil/frame.c', 'libavutil/mem.c', 'libavutil/opt.c', 'libavutil/pixdesc.c',
+    'libswresample/resample.c', 'libswscale/swscale.c', 'libavfilter/vf_scale.c'
+]
+
+ASM_SOURCES = [
+    'libavcodec/x86/h264_idct.asm', 'libavcodec/x86/hevc_mc.asm',
+    'libavcodec/aarch64/h264dsp_neon.S', 'libavutil/aarch64/float_dsp_neon.S'
+]
+
+LIBRARIES = ['libavcodec', 'libavformat', 'libavutil', 'libswresample', 'libswscale']
+
+
+def make_line(index: int) -> str:
+    """第 index 行的内容（不含时间戳）"""
+    if index % 97 == 96:
+        src = SOURCES[index % len(SOURCES)]
+        return f"{src}:{100 + index % 400}:{5 + index % 20}: warning: unused variable 'tmp' [-Wunused-variable]"
+    if index % 211 == 210:
+        lib = LIBRARIES[index % len(LIBRARIES)]
+        return f"AR\t{lib}/{lib}.a"
+    if index % 401 == 400:
+        lib = LIBRARIES[index % len(LIBRARIES)]
+        return f"LD\t{lib}/{lib}.so.61"
+    if index % 13 == 12:
+        src = ASM_SOURCES[index % len(ASM_SOURCES)]
+        tool = 'X86ASM' if src.endswith('.asm') else 'AS'
+        return f"{tool}\t{src.rsplit('.', 1)[0]}.o"
+    src = SOURCES[index % len(SOURCES)]
+    return f"CC\t{src[:-2]}.o"
+
+
+def main() -> int:
+    lines = int(os.environ.get('FFAB_BENCH_LINES', '2000'))
+    rate = float(os.environ.get('FFAB_BENCH_RATE', '0'))
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    out = sys.stdout
+    start = time.time()
+    for index in range(lines):
+        if interval:
+            # 按绝对时间对齐，避免 sleep 误差累积
+            delay = start + index * interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        out.write(f"{make_line(index)} t={time.time():.6f}\n")
+        out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+基准测试用的假 NDK / FFmpeg 目录
+
+在临时工作目录中生成:
+    android-ndk/toolchains/llvm/prebuilt/linux-x86_64/bin/  假 clang 与 llvm-* 工具
+    ffmpeg/configure                                        写出 Makefile 的假 configure
+    ffmpeg/RELEASE
+
+假 configure 生成的 Makefile 中:
+    all       调用 fake_make_output.py 按配置的速率输出 FFmpeg 风格的编译日志
+    install   在 --prefix 下生成空的 .so 和头文件目录
+"""
+
+import stat
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+# 与 ArchitectureConfig 中的 target 对应
+TARGETS = [
+    'aarch64-linux-android',
+    'armv7a-linux-androideabi',
+    'i686-linux-android',
+    'x86_64-linux-android'
+]
+
+TOOLS = ['llvm-ar', 'llvm-ranlib', 'llvm-strip', 'llvm-nm']
+
+FAKE_CLANG = '''#!/bin/sh
+# 假 clang: 只创建 -o 指定的输出文件
+out=""
+while [ $# -gt 0 ]; do
+    if [ "$1" = "-o" ]; then
+        out="$2"
+        shift
+    fi
+    shift
+done
+[ -n "$out" ] && : > "$out"
+exit 0
+'''
+
+FAKE_TOOL = '''#!/bin/sh
+exit 0
+'''
+
+FAKE_CONFIGURE = '''#!/bin/sh
+# 假 configure: 解析 --prefix 并写出 Makefile
+prefix=""
+for arg in "$@"; do
+    case "$arg" in
+        --prefix=*) prefix="${arg#--prefix=}" ;;
+    esac
+done
+
+echo "install prefix            $prefix"
+echo "source path               $(cd "$(dirname "$0")" && pwd)"
+echo "C compiler                clang"
+echo "ARCH                      fake"
+
+mkdir -p ffbuild
+echo "/* fake config.h */" > config.h
+echo "# fake config.mak" > ffbuild/config.mak
+
+cat > Makefile <<MK
+all:
+\t@"{python}" "{emitter}"
+install:
+\t@mkdir -p "$prefix/lib" "$prefix/include/libavcodec"
+\t@for lib in avcodec avformat avutil swresample swscale; do : > "$prefix/lib/lib\\$\\$lib.so"; done
+\t@echo "INSTALL\\tlibavcodec/libavcodec.so"
+distclean:
+\t@rm -rf Makefile config.h ffbuild
+.PHONY: all install distclean
+MK
+'''
+
+
+def _write_executable(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8', newline='\n')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def create_fake_tree(work_dir: Path, api: int = 21) -> Path:
+    """在 work_dir 中生成假 NDK 和 FFmpeg 源码目录"""
+    work_dir = Path(work_dir)
+    bin_dir = work_dir / "android-ndk" / "toolchains" / "llvm" / "prebuilt" / "linux-x86_64" / "bin"
+
+    for target in TARGETS:
+        _write_executable(bin_dir / f"{target}{api}-clang", FAKE_CLANG)
+        _write_executable(bin_dir / f"{target}{api}-clang++", FAKE_CLANG)
+    for tool in TOOLS:
+        _write_executable(bin_dir / tool, FAKE_TOOL)
+
+    ffmpeg_dir = work_dir / "ffmpeg"
+    configure = FAKE_CONFIGURE.replace('{python}', sys.executable).replace(
+        '{emitter}', str(BENCH_DIR / "fake_make_output.py"))
+    _write_executable(ffmpeg_dir / "configure", configure)
+    (ffmpeg_dir / "RELEASE").write_text("7.1\n", encoding='utf-8')
+
+    (work_dir / "build").mkdir(exist_ok=True)
+    return work_dir
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+编排层基准测试
+
+使用假工具链和假 FFmpeg (见 fake_tree.py) 测量 Python 侧的开销，无需 NDK 和网络:
+    script_gen            生成构建脚本
+    log_parse             日志行处理 (清理、阶段标记、日志级别、进度解析)
+    compile_script        CompilerManager.compile 端到端 (构建脚本方式)
+    compile_orchestrator  CompilerManager.compile 端到端 (Python 编排器方式)
+    log_manager           Web 日志管理器 LogManager.add_log / get_logs
+    sse                   Web 日志流接口 /api/logs/stream
+    sse_async             asyncio 服务模式下 --clients 个日志流连接同时接收
+
+每个场景在独立子进程中运行，分别统计峰值内存 (RSS)。
+
+用法:
+    python bench/run_bench.py
+    python bench/run_bench.py --lines 20000 --rate 5000 --scenario compile_script
+    python bench/run_bench.py --json bench_result.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+SCENARIOS = ['script_gen', 'log_parse', 'compile_script', 'compile_orchestrator', 'log_manager', 'sse',
+             'sse_async']
+
+TIMESTAMP_PATTERN = re.compile(r't=(\d+\.\d+)$')
+SKIPPED_PATTERN = re.compile(r'已跳过 (\d+) 条日志')
+
+
+class SkipScenario(Exception):
+    """当前环境无法运行的场景"""
+
+
+def peak_rss_mb() -> float:
+    """当前进程峰值内存 (MB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LatencyRecorder:
+    """按行末时间戳统计延迟和吞吐"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first = None
+        self.last = None
+        self._lock = threading.Lock()
+
+    def record(self, message: str):
+        match = TIMESTAMP_PATTERN.search(message)
+        if not match:
+            return
+        now = time.time()
+        with self._lock:
+            self.latencies.append(now - float(match.group(1)))
+            if self.first is None:
+                self.first = now
+            self.last = now
+
+    def result(self) -> Dict[str, Any]:
+        count = len(self.latencies)
+        if not count:
+            return {'lines': 0}
+        latencies = sorted(self.latencies)
+        elapsed = (self.last - self.first) if count > 1 else 0.0
+        return {
+            'lines': count,
+            'lines_per_sec': round(count / elapsed) if elapsed > 0 else None,
+            'latency_p50_ms': round(latencies[count // 2] * 1000, 3),
+            'latency_p95_ms': round(latencies[int(count * 0.95) - 1 if count > 1 else 0] * 1000, 3),
+            'latency_max_ms': round(latencies[-1] * 1000, 3)
+        }
+
+
+def bench_script_gen(args) -> Dict[str, Any]:
+    """构建脚本生成"""
+    from src.core.builder import BuildManager
+    from src.core.config import ConfigManager
+
+    work_dir = Path(tempfile.mkdtemp(prefix='ffab-bench-'))
+    try:
+        config_manager = ConfigManager(ROOT_DIR)
+        configs = [config_manager.load_preset_config(name) for name in config_manager.load_presets()]
+        manager = BuildManager(work_dir, work_dir / "build")
+
+        iterations = args.iterations
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(iterations):
+                manager.generate_build_script(configs[i % len(configs)])
+        elapsed = time.perf_counter() - start
+        return {
+            'iterations': iterations,
+            'ms_per_script': round(elapsed / iterations * 1000, 3)
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_log_parse(args) -> Dict[str, Any]:
+    """日志行处理（与 _run_compilation 中每行的处理相同）"""
+    from fake_make_output import make_line
+    from src.core.compiler import CompilerManager
+    from src.core.trace import BuildTracer
+    from src.core.utils import clean_output_line
+
+    work_dir = Path(tempfile.mkdtemp(prefix='ffab-bench-'))
+    try:
+        manager = CompilerManager(work_dir, work_dir / "build")
+        tracer = BuildTracer()
+        lines = [f"[arm64-v8a] {make_line(i)}\n" for i in range(args.lines)]
+        # 混入阶段标记
+        for i in range(0, len(lines), 500):
+            lines[i] = f"::stage:: begin arm64-v8a make {time.time():.3f} 0m1.000s 0m0.100s\n"
+
+        start = time.perf_counter()
+        for line in lines:
+            clean_line = clean_output_line(line)
+            if tracer.handle_marker(clean_line):
+                continue
+            manager._determine_log_level(clean_line)
+            manager._parse_progress(clean_line)
+        elapsed = time.perf_counter() - start
+        return {
+            'lines': len(lines),
+            'lines_per_sec': round(len(lines) / elapsed),
+            'us_per_line': round(elapsed / len(lines) * 1e6, 3)
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _bench_compile(args, executor: str) -> Dict[str, Any]:
+    """端到端编译（假工具链）"""
+    from fake_tree import create_fake_tree
+    from src.core.compiler import CompilerManager
+    from src.core.config import BuildConfig, BuildOptions
+
+    bash = shutil.which('bash')
+    if not bash or not shutil.which('make'):
+        raise SkipScenario('需要 bash 和 make')
+
+    work_dir = create_fake_tree(Path(tempfile.mkdtemp(prefix='ffab-bench-')))
+    os.environ['FFAB_BENCH_LINES'] = str(args.lines)
+    os.environ['FFAB_BENCH_RATE'] = str(args.rate)
+    try:
+        manager = CompilerManager(work_dir, work_dir / "build")
+        config = BuildConfig(
+            architectures=args.archs,
+            buildOptions=BuildOptions(parallel=len(args.archs) > 1, executor=executor)
+        )
+
+        recorder = LatencyRecorder()
+        progress_updates = []
+
+        def log_callback(message: str, level: str = 'info'):
+            recorder.record(message)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            success = manager.compile(config, bash,
+                                      progress_callback=progress_updates.append,
+                                      log_callback=log_callback)
+        elapsed = time.perf_counter() - start
+
+        result = recorder.result()
+        result.update({
+            'success': success,
+            'wall_s': round(elapsed, 3),
+            'progress_updates': len(progress_updates)
+        })
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_compile_script(args) -> Dict[str, Any]:
+    return _bench_compile(args, 'script')
+
+
+def bench_compile_orchestrator(args) -> Dict[str, Any]:
+    return _bench_compile(args, 'orchestrator')
+
+
+def _import_web_server():
+    try:
+        from src.web import server
+    except ImportError as e:
+        raise SkipScenario(f'无法导入 Web 服务器 ({e})')
+    return server
+
+
+def bench_log_manager(args) -> Dict[str, Any]:
+    """LogManager 写入与读取"""
+    from fake_make_output import make_line
+    server = _import_web_server()
+
+    log_manager = server.LogManager()
+    messages = [make_line(i) for i in range(args.lines)]
+
+    start = time.perf_counter()
+    for message in messages:
+        log_manager.add_log(message, 'info')
+    add_elapsed = time.perf_counter() - start
+
+    reads = 100
+    start = time.perf_counter()
+    for _ in range(reads):
+        log_manager.get_logs()
+    read_elapsed = time.perf_counter() - start
+
+    return {
+        'lines': len(messages),
+        'add_lines_per_sec': round(len(messages) / add_elapsed),
+        'get_logs_ms': round(read_elapsed / reads * 1000, 3)
+    }
+
+
+def bench_sse(args) -> Dict[str, Any]:
+    """Web 日志流：生产线程写入日志，SSE 客户端读取并统计延迟"""
+    from fake_make_output import make_line
+    server = _import_web_server()
+
+    work_dir = Path(tempfile.mkdtemp(prefix='ffab-bench-'))
+    try:
+        web = server.WebServer(work_dir)
+        client = web.app.test_client()
+        response = client.get('/api/logs/stream', buffered=False)
+
+        recorder = LatencyRecorder()
+        interval = 1.0 / args.rate if args.rate > 0 else 0.0
+
+        def produce():
+            start = time.time()
+            for i in range(args.lines):
+                if interval:
+                    delay = start + i * interval - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                web.log_manager.add_log(f"{make_line(i)} t={time.time():.6f}", 'info')
+
+        producer = threading.Thread(target=produce, daemon=True)
+        start = time.perf_counter()
+        producer.start()
+
+        buffer = ''
+        for chunk in response.response:
+            buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+            while '\n\n' in buffer:
+                event, buffer = buffer.split('\n\n', 1)
+                for field in event.split('\n'):
+                    if not field.startswith('data: '):
+                        continue
+                    data = json.loads(field[len('data: '):])
+                    if 'message' in data:
+                        recorder.record(data['message'])
+            if len(recorder.latencies) >= args.lines:
+                break
+        elapsed = time.perf_counter() - start
+        response.close()
+
+        result = recorder.result()
+        result['wall_s'] = round(elapsed, 3)
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _sse_async_clients(port: int, clients: int, lines: int, record: bool, results):
+    """在独立进程中运行一组 SSE 客户端，返回 (各客户端收到的行数, 延迟样本, 首末时间)"""
+    import asyncio
+    recorder = LatencyRecorder()
+
+    async def client(record_latency: bool) -> int:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+        writer.write(b'GET /api/logs/stream HTTP/1.1\r\nHost: bench\r\n\r\n')
+        await writer.drain()
+        await reader.readuntil(b'\r\n\r\n')
+        received = skipped = 0
+        buffer = b''
+        while received + skipped < lines:
+            data = await reader.read(65536)
+            if not data:
+                break
+            buffer += data
+            *events, buffer = buffer.split(b'\n\n')
+            for event in events:
+                if event.startswith(b'id: '):
+                    # 日志事件；只有记录延迟的客户端解析内容
+                    received += 1
+                    if record_latency:
+                        recorder.record(json.loads(event.split(b'\ndata: ', 1)[1])['message'])
+                    continue
+                # 落后超过缓冲区容量时服务器跳过部分日志
+                message = json.loads(event[len(b'data: '):]).get('message') or ''
+                match = SKIPPED_PATTERN.search(message)
+                if match:
+                    skipped += int(match.group(1))
+        writer.close()
+        return received
+
+    async def run():
+        return await asyncio.gather(*(client(record and i == 0) for i in range(clients)))
+
+    counts = asyncio.run(run())
+    results.put((list(counts), recorder.latencies, recorder.first, recorder.last))
+
+
+def bench_sse_async(args) -> Dict[str, Any]:
+    """asyncio 服务模式：服务器在后台线程的事件循环中运行，SSE 客户端分布在多个进程中同时读取"""
+    import asyncio
+    import multiprocessing
+    from fake_make_output import make_line
+    server = _import_web_server()
+    from src.web.asyncserver import AsyncServer
+
+    log_manager = server.LogManager()
+    async_server = AsyncServer(lambda environ, start_response: [], log_manager)
+    loop = asyncio.new_event_loop()
+    port = loop.run_until_complete(async_server.start('127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    # 客户端解析事件的开销不计入服务器所在进程；第一个客户端统计延迟
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = max(1, min(4, (os.cpu_count() or 1) - 1, args.clients))
+    shares = [args.clients // processes + (1 if i < args.clients % processes else 0) for i in range(processes)]
+    workers = [context.Process(target=_sse_async_clients, args=(port, share, args.lines, i == 0, results),
+                               daemon=True)
+               for i, share in enumerate(shares)]
+    for worker in workers:
+        worker.start()
+    deadline = time.time() + 60
+    while async_server.stream_clients < args.clients:
+        if time.time() > deadline:
+            raise RuntimeError(f'只有 {async_server.stream_clients} 个客户端连接')
+        time.sleep(0.01)
+
+    rss_before = peak_rss_mb()
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    start = time.perf_counter()
+    produce_start = time.time()
+    for i in range(args.lines):
+        if interval:
+            delay = produce_start + i * interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        log_manager.add_log(f"{make_line(i)} t={time.time():.6f}", 'info')
+
+    recorder = LatencyRecorder()
+    counts = []
+    for _ in workers:
+        worker_counts, latencies, first, last = results.get(timeout=120)
+        counts.extend(worker_counts)
+        if latencies:
+            recorder.latencies, recorder.first, recorder.last = latencies, first, last
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+
+    result = recorder.result()
+    result.update({
+        'clients': args.clients,
+        'server_threads': threading.active_count(),
+        'min_lines_per_client': min(counts),
+        'server_rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+        'wall_s': round(elapsed, 3)
+    })
+    return result
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'script_gen': bench_script_gen,
+    'log_parse': bench_log_parse,
+    'compile_script': bench_compile_script,
+    'compile_orchestrator': bench_compile_orchestrator,
+    'log_manager': bench_log_manager,
+    'sse': bench_sse,
+    'sse_async': bench_sse_async
+}
+
+
+def run_scenario(name: str, args) -> Dict[str, Any]:
+    """在当前进程中运行单个场景"""
+    try:
+        result = BENCHMARKS[name](args)
+        result['status'] = 'ok'
+    except SkipScenario as e:
+        result = {'status': 'skipped', 'reason': str(e)}
+    result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return result
+
+
+def run_isolated(name: str, argv: List[str]) -> Dict[str, Any]:
+    """在子进程中运行场景，峰值内存互不影响"""
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--worker', name] + argv
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'status': 'error', 'reason': proc.stderr.strip().splitlines()[-1:] or ['未知错误']}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print("=" * 60)
+    print("编排层基准测试结果")
+    print("=" * 60)
+    for name, result in results.items():
+        status = result.pop('status', 'ok')
+        if status != 'ok':
+            print(f"{name:<22} {status}: {result.get('reason')}")
+            continue
+        metrics = ', '.join(f"{key}={value}" for key, value in result.items())
+        print(f"{name:<22} {metrics}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='编排层基准测试（假工具链）')
+    parser.add_argument('--scenario', '-s', action='append', choices=SCENARIOS,
+                        help='只运行指定场景，可重复 (默认: 全部)')
+    parser.add_argument('--lines', type=int, default=5000, help='每个架构输出的日志行数 (默认: 5000)')
+    parser.add_argument('--rate', type=float, default=0, help='每秒输出行数，0 表示不限速 (默认: 0)')
+    parser.add_argument('--archs', nargs='+', default=['arm64-v8a', 'x86_64'],
+                        help='端到端场景编译的架构 (默认: arm64-v8a x86_64)')
+    parser.add_argument('--iterations', type=int, default=200, help='脚本生成次数 (默认: 200)')
+    parser.add_argument('--clients', type=int, default=100, help='sse_async 场景的日志流连接数 (默认: 100)')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(args.worker, args), ensure_ascii=False))
+        return 0
+
+    argv = ['--lines', str(args.lines), '--rate', str(args.rate),
+            '--iterations', str(args.iterations), '--clients', str(args.clients), '--archs'] + args.archs
+    results = {name: run_isolated(name, argv) for name in (args.scenario or SCENARIOS)}
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print_results(results)
+    return 0 if all(r.get('status', 'ok') != 'error' for r in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
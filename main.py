@@ -4,12 +4,13 @@ FFmpeg Android 编译配置器 - 主入口
 支持命令行和Web界面两种模式
 """
 
+import os
 import sys
 import argparse
 from pathlib import Path
 
 from src.cli import CLIApp
-from src.web import WebApp
+from src.web import WebApp, BuildWorker, WORKER_HOST, WORKER_PORT
 from src.utils import ProjectCleaner
 
 
@@ -22,6 +23,7 @@ def show_usage_info():
     print("   1. 命令行模式: python main.py [选项]")
     print("   2. Web界面模式: python main.py --web")
     print("   3. 清理工具: python main.py --clean")
+    print("   4. 远程编译节点: python main.py --worker --worker-host 0.0.0.0 --worker-token <令牌> --register http://协调端:5000")
     print("")
     print("🌐 推荐使用Web界面:")
     print("   - 图形化配置界面")
@@ -45,8 +47,52 @@ def main():
                        help='启动Web配置界面')
     parser.add_argument('--clean', action='store_true',
                        help='清理临时文件和编译输出')
-    parser.add_argument('--port', type=int, default=5000,
-                       help='Web服务器端口 (默认: 5000)')
+    parser.add_argument('--port', type=int,
+                       help=f'Web服务器端口 (默认: 5000)，编译节点模式下为节点端口 (默认: {WORKER_PORT})')
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                       help='Web模式下同时运行的编译任务数 (默认: 1，其余任务排队)')
+    parser.add_argument('--server', choices=['threaded', 'async'], default='threaded',
+                       help='Web服务模式: threaded 为 Flask 多线程服务器，async 为 asyncio 服务模式，'
+                            '适合大量日志流连接 (默认: threaded)')
+    parser.add_argument('--worker', action='store_true',
+                       help='以远程编译节点模式运行：接收协调端分发的单架构编译，--workers 为同时编译的架构数')
+    parser.add_argument('--remote-worker', action='append', metavar='URL',
+                       help='Web模式下使用的远程编译节点地址 (可重复)，注册后各架构分发到节点编译')
+    parser.add_argument('--register', metavar='URL',
+                       help='编译节点启动后向该协调端 (Web服务器地址) 注册')
+    parser.add_argument('--worker-url', metavar='URL',
+                       help='注册时上报的本节点地址 (默认: http://<主机名>:<端口>)')
+    parser.add_argument('--worker-host', default=WORKER_HOST, metavar='HOST',
+                       help=f'编译节点的监听地址 (默认: {WORKER_HOST})，其他机器访问时设为 0.0.0.0 或本机地址')
+    parser.add_argument('--worker-token', default=os.environ.get('FFAB_WORKER_TOKEN'), metavar='TOKEN',
+                       help='编译节点与协调端的共享令牌 (默认读取环境变量 FFAB_WORKER_TOKEN)，'
+                            '编译节点必须设置，协调端设置后才接受节点注册')
+    parser.add_argument('--parallel', action='store_true',
+                       help='各架构在独立构建目录中并行编译')
+    parser.add_argument('--jobs', '-j', type=int,
+                       help='并行任务数 (默认: nproc)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='增量编译：配置未变化时跳过 configure')
+    parser.add_argument('--ccache', action='store_true',
+                       help='启用内置编译缓存')
+    parser.add_argument('--artifact-cache', action='store_true',
+                       help='启用产物缓存：配置未变化的架构直接复用已编译结果')
+    parser.add_argument('--configure-cache', action='store_true',
+                       help='启用配置缓存：configure 参数未变化时恢复上次的配置结果')
+    parser.add_argument('--executor', choices=['script', 'orchestrator'],
+                       help='执行方式: script 生成并运行构建脚本，orchestrator 由 Python 直接调度各架构')
+    parser.add_argument('--no-resolve-components', action='store_true',
+                       help='关闭组件依赖解析：按配置中的组件原样传给 configure')
+    parser.add_argument('--opt-profile', choices=['size', 'balanced', 'speed'],
+                       help='优化档位: size 体积优先，balanced 均衡，speed 速度优先 (覆盖配置中的档位)')
+    parser.add_argument('--no-prune-libraries', action='store_true',
+                       help='关闭库裁剪：不按组件禁用 avdevice/avfilter/postproc/swscale/network')
+    parser.add_argument('--keep-libraries', nargs='+', choices=['avdevice', 'avfilter', 'postproc', 'swscale', 'network'],
+                       help='库裁剪时仍保留的库，如应用直接调用 sws_scale 时保留 swscale')
+    parser.add_argument('--package', choices=['zip', 'aar', 'tar.zst'],
+                       help='编译后 strip 各架构的库并打包到 build/dist/: zip (jniLibs + include)、aar 或 tar.zst')
+    parser.add_argument('--history', type=int, nargs='?', const=20, metavar='N',
+                       help='显示最近 N 次编译的历史记录 (默认 20) 和耗时回归，不进行编译')
     
     args = parser.parse_args()
     
@@ -58,10 +104,21 @@ def main():
         cleaner.clean_all()
         return 0
     
+    # 远程编译节点模式
+    if args.worker:
+        if not args.worker_token:
+            print("❌ 编译节点需要 --worker-token (或环境变量 FFAB_WORKER_TOKEN)，协调端使用相同的令牌")
+            return 1
+        worker = BuildWorker(work_dir, slots=args.workers, token=args.worker_token)
+        worker.run(host=args.worker_host, port=args.port or WORKER_PORT, register=args.register,
+                   url=args.worker_url)
+        return 0
+    
     # Web界面模式
     if args.web:
-        web_app = WebApp(work_dir)
-        success = web_app.run(port=args.port)
+        web_app = WebApp(work_dir, workers=args.workers, remote_workers=args.remote_worker,
+                         worker_token=args.worker_token)
+        success = web_app.run(port=args.port or 5000, server=args.server)
         return 0 if success else 1
     
     # 如果没有参数，显示使用信息并交互选择
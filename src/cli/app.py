@@ -4,10 +4,13 @@
 
 import argparse
 import sys
+import time
 from pathlib import Path
 from typing import Optional
 
 from ..core import ConfigManager, EnvironmentManager, CompilerManager
+from ..core.trace import BuildTracer
+from ..core.history import BuildHistory
 
 
 class CLIApp:
@@ -22,14 +25,18 @@ class CLIApp:
         self.config_manager = ConfigManager(self.work_dir)
         self.env_manager = EnvironmentManager(self.work_dir)
         self.compiler_manager = CompilerManager(self.work_dir, self.build_dir)
+        self.args = None
     
     def run(self, args: Optional[list] = None):
         """运行CLI应用"""
         parser = self._create_parser()
         parsed_args = parser.parse_args(args)
+        self.args = parsed_args
         
         try:
-            if parsed_args.preset:
+            if parsed_args.history is not None:
+                return self._show_history(parsed_args.history)
+            elif parsed_args.preset:
                 return self._run_with_preset(parsed_args.preset)
             elif parsed_args.config:
                 return self._run_with_config(parsed_args.config)
@@ -50,8 +57,81 @@ class CLIApp:
         parser.add_argument('--preset', '-p',
                            choices=['basic', 'standard', 'streaming', 'live', 'complete', 'minimal'],
                            help='使用预设配置')
+        parser.add_argument('--parallel', action='store_true',
+                           help='各架构在独立构建目录中并行编译')
+        parser.add_argument('--jobs', '-j', type=int,
+                           help='并行任务数 (默认: nproc)')
+        parser.add_argument('--incremental', action='store_true',
+                           help='增量编译：配置未变化时跳过 configure')
+        parser.add_argument('--ccache', action='store_true',
+                           help='启用内置编译缓存')
+        parser.add_argument('--artifact-cache', action='store_true',
+                           help='启用产物缓存：配置未变化的架构直接复用已编译结果')
+        parser.add_argument('--configure-cache', action='store_true',
+                           help='启用配置缓存：configure 参数未变化时恢复上次的配置结果')
+        parser.add_argument('--executor', choices=['script', 'orchestrator'],
+                           help='执行方式: script 生成并运行构建脚本，orchestrator 由 Python 直接调度各架构')
+        parser.add_argument('--no-resolve-components', action='store_true',
+                           help='关闭组件依赖解析：按配置中的组件原样传给 configure')
+        parser.add_argument('--opt-profile', choices=['size', 'balanced', 'speed'],
+                           help='优化档位: size 体积优先，balanced 均衡，speed 速度优先 (覆盖配置中的档位)')
+        parser.add_argument('--no-prune-libraries', action='store_true',
+                           help='关闭库裁剪：不按组件禁用 avdevice/avfilter/postproc/swscale/network')
+        parser.add_argument('--keep-libraries', nargs='+', choices=['avdevice', 'avfilter', 'postproc', 'swscale', 'network'],
+                           help='库裁剪时仍保留的库，如应用直接调用 sws_scale 时保留 swscale')
+        parser.add_argument('--package', choices=['zip', 'aar', 'tar.zst'],
+                           help='编译后 strip 各架构的库并打包到 build/dist/: zip (jniLibs + include)、aar 或 tar.zst')
+        parser.add_argument('--history', type=int, nargs='?', const=20, metavar='N',
+                           help='显示最近 N 次编译的历史记录 (默认 20) 和耗时回归，不进行编译')
         return parser
     
+    def _apply_build_options(self, config):
+        """应用命令行中的构建选项"""
+        if not self.args:
+            return
+        if self.args.parallel:
+            config.buildOptions.parallel = True
+        if self.args.jobs is not None:
+            config.buildOptions.jobs = self.args.jobs
+        if self.args.incremental:
+            config.buildOptions.incremental = True
+        if self.args.ccache:
+            config.buildOptions.ccache = True
+        if self.args.artifact_cache:
+            config.buildOptions.artifactCache = True
+        if self.args.configure_cache:
+            config.buildOptions.configureCache = True
+        if self.args.executor:
+            config.buildOptions.executor = self.args.executor
+        if self.args.no_resolve_components:
+            config.buildOptions.resolveComponents = False
+        if self.args.opt_profile:
+            config.optimizations.profile = self.args.opt_profile
+        if self.args.no_prune_libraries:
+            config.optimizations.pruneLibraries = False
+        if self.args.keep_libraries:
+            config.optimizations.keepLibraries = self.args.keep_libraries
+        if self.args.package:
+            config.buildOptions.package = self.args.package
+    
+    def _show_history(self, limit: int) -> bool:
+        """显示编译历史"""
+        builds = self.compiler_manager.history.list_builds(limit=max(limit, 1))
+        if not builds:
+            print("📜 暂无编译历史")
+            return True
+        
+        print(f"📜 编译历史 (最近 {len(builds)} 次):")
+        for build in builds:
+            started = time.strftime('%Y-%m-%d %H:%M', time.localtime(build['startTime']))
+            minutes, seconds = divmod(int(build['duration']), 60)
+            print(f"  #{build['id']:<5} {started}  {'✅' if build['success'] else '❌'} "
+                  f"{minutes:>4}m{seconds:02d}s  {build['preset'] or '-':<10} "
+                  f"{','.join(build['archs'])}  [{build['mode'] or build['executor']}] 配置 {build['configHash'][:12]}")
+            for regression in build['regressions'] or []:
+                print(f"         🐢 {BuildHistory.format_regression(regression)}")
+        return True
+    
     def _run_with_preset(self, preset_name: str) -> bool:
         """使用预设配置运行"""
         print(f"🎯 使用预设配置: {preset_name}")
@@ -100,6 +180,8 @@ class CLIApp:
     def _run_compilation(self, config) -> bool:
         """运行编译"""
         try:
+            self._apply_build_options(config)
+            
             # 显示配置摘要
             self.config_manager.print_config_summary(config)
             
@@ -107,7 +189,8 @@ class CLIApp:
             self.config_manager.validate_config(config)
             
             # 环境设置
-            if not self._setup_environment():
+            tracer = BuildTracer()
+            if not self._setup_environment(tracer):
                 return False
             
             # 询问是否开始编译
@@ -119,21 +202,24 @@ class CLIApp:
             # 开始编译
             msys2_bash_path = self.env_manager.get_msys2_bash_path()
             if not msys2_bash_path:
-                print("❌ 找不到MSYS2 bash")
+                print("❌ 找不到bash (Windows下需要MSYS2)")
                 return False
             
             return self.compiler_manager.compile(
                 config, 
                 msys2_bash_path,
-                log_callback=self._log_callback
+                log_callback=self._log_callback,
+                tracer=tracer,
+                log_batch_callback=self._log_batch_callback
             )
             
         except Exception as e:
             print(f"❌ 编译过程中出现错误: {e}")
             return False
     
-    def _setup_environment(self) -> bool:
-        """设置编译环境"""
+    def _setup_environment(self, tracer: Optional[BuildTracer] = None) -> bool:
+        """设置编译环境，tracer 记录每个步骤的耗时"""
+        tracer = tracer or BuildTracer()
         steps = [
             ("检查平台", self.env_manager.check_platform),
             ("设置MSYS2环境", self.env_manager.setup_msys2),
@@ -145,7 +231,9 @@ class CLIApp:
         for step_name, step_func in steps:
             print(f"🔧 {step_name}...")
             try:
-                if not step_func():
+                with tracer.span(step_func.__name__):
+                    ok = step_func()
+                if not ok:
                     if step_name == "安装MSYS2包":
                         print(f"⚠️ {step_name}失败，但可以继续...")
                         continue
@@ -160,4 +248,9 @@ class CLIApp:
     
     def _log_callback(self, message: str, level: str = 'info'):
         """日志回调"""
-        print(message)
\ No newline at end of file
+        print(message)
+    
+    def _log_batch_callback(self, entries: list):
+        """批量日志回调，一次写出一批编译输出"""
+        sys.stdout.write(''.join(f"{message}\n" for message, _ in entries))
+        sys.stdout.flush()
\ No newline at end of file
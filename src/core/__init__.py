@@ -6,10 +6,14 @@ from .config import ConfigManager
 from .environment import EnvironmentManager
 from .builder import BuildManager
 from .compiler import CompilerManager
+from .ccache import CompilerCache
+from .orchestrator import BuildOrchestrator
 
 __all__ = [
     'ConfigManager',
     'EnvironmentManager', 
     'BuildManager',
-    'CompilerManager'
+    'CompilerManager',
+    'CompilerCache',
+    'BuildOrchestrator'
 ]
\ No newline at end of file
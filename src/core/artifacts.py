@@ -0,0 +1,181 @@
+"""
+编译产物缓存模块
+
+按内容寻址保存每个架构的安装目录 (ffmpeg-android-<arch>)。
+缓存键由构建配置、架构、NDK 版本、FFmpeg 源码版本和本机信息（汇编检测结果、主机工具版本）
+共同决定，命中时直接恢复安装目录，跳过该架构的编译。超出容量上限时按最近使用时间淘汰。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 缓存格式版本，变更缓存内容布局或缓存键时递增
+CACHE_VERSION = "2"
+
+# 默认容量上限 (MB)
+DEFAULT_MAX_SIZE_MB = 10240
+
+# 恢复到安装目录中的标记文件，记录来源缓存键
+MARKER_FILE = ".artifact-cache-key"
+
+# 不影响编译产物的配置字段，不参与缓存键计算
+NON_ARTIFACT_FIELDS = ('architectures', 'buildOptions')
+
+
+class ArtifactCache:
+    """编译产物缓存"""
+
+    def __init__(self, cache_dir: Path, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max(0, int(max_size_mb)) * 1024 * 1024
+
+    def compute_key(self, config_data: Dict[str, Any], arch: str,
+                    ndk_version: str, ffmpeg_revision: str,
+                    host: Optional[Dict[str, Any]] = None) -> str:
+        """计算缓存键，host 为影响编译结果的本机信息（汇编检测得到的 configure 参数、主机工具版本）"""
+        data = {k: v for k, v in config_data.items() if k not in NON_ARTIFACT_FIELDS}
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'config': data,
+            'arch': arch,
+            'ndk': ndk_version,
+            'ffmpeg': ffmpeg_revision,
+            'host': host or {}
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def contains(self, key: str) -> bool:
+        """缓存中是否存在该键"""
+        return (self._entry_dir(key) / "meta.json").exists()
+
+    def restore(self, key: str, prefix: Path) -> bool:
+        """恢复安装目录，优先使用硬链接"""
+        entry_prefix = self._entry_dir(key) / "prefix"
+        if not self.contains(key) or not entry_prefix.is_dir():
+            return False
+
+        prefix = Path(prefix)
+        if prefix.exists():
+            shutil.rmtree(prefix)
+
+        shutil.copytree(entry_prefix, prefix, symlinks=True, copy_function=_link_or_copy)
+        (prefix / MARKER_FILE).write_text(key, encoding='utf-8')
+
+        # 更新使用时间
+        os.utime(self._entry_dir(key) / "meta.json")
+        return True
+
+    def store(self, key: str, prefix: Path, meta: Optional[Dict[str, Any]] = None) -> bool:
+        """保存安装目录到缓存"""
+        prefix = Path(prefix)
+        if not prefix.is_dir() or self.contains(key):
+            return False
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.cache_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            # 复制而不是硬链接，之后对安装目录的修改不会影响缓存
+            shutil.copytree(prefix, tmp_dir / "prefix", symlinks=True,
+                            ignore=shutil.ignore_patterns(MARKER_FILE))
+            entry_meta = dict(meta or {})
+            entry_meta.update({'key': key, 'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                               'size': _tree_size(tmp_dir / "prefix")})
+            with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump(entry_meta, f, indent=2, ensure_ascii=False)
+
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # 其他进程已保存同一条目
+                return False
+            return True
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def is_restored(prefix: Path) -> bool:
+        """安装目录是否由缓存恢复（可能与缓存共享硬链接）"""
+        return (Path(prefix) / MARKER_FILE).exists()
+
+    # ---- 容量管理 ----
+
+    def _list_entries(self) -> List[Tuple[float, int, Path]]:
+        """列出缓存条目: (最近使用时间, 大小, 条目目录)；恢复时会更新 meta.json 的修改时间"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            meta_file = entry_dir / "meta.json"
+            if entry_dir.name.startswith('.tmp') or not entry_dir.is_dir():
+                continue
+            try:
+                mtime = meta_file.stat().st_mtime
+                size = json.loads(meta_file.read_text(encoding='utf-8')).get('size')
+            except (OSError, ValueError):
+                continue
+            if not isinstance(size, int):
+                size = _tree_size(entry_dir / "prefix")
+            entries.append((mtime, size, entry_dir))
+        return entries
+
+    def get_size(self) -> int:
+        """缓存总大小（字节）"""
+        return sum(size for _, size, _ in self._list_entries())
+
+    def cleanup(self) -> int:
+        """按 LRU 淘汰到容量上限的 90%，返回淘汰的条目数"""
+        entries = self._list_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return 0
+
+        target = self.max_size * 0.9
+        evicted = 0
+        for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+            if total <= target:
+                break
+            # 先改名再删除，其他进程不会恢复到删除了一半的条目
+            trash = self.cache_dir / f".tmp-{uuid.uuid4().hex}"
+            try:
+                os.rename(entry_dir, trash)
+            except OSError:
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """清空缓存"""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+
+def _tree_size(path: Path) -> int:
+    """目录中文件的总大小（不跟随符号链接）"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _link_or_copy(src: str, dst: str):
+    """创建硬链接，跨文件系统等失败时回退为复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
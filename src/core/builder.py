@@ -2,10 +2,13 @@
 构建脚本生成模块
 """
 
+import shlex
+import sys
 import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from .config import BuildConfig
+from .components import pruned_libraries
 
 
 class ArchitectureConfig:
@@ -16,25 +19,29 @@ class ArchitectureConfig:
             "target": "aarch64-linux-android",
             "arch_name": "aarch64", 
             "cpu": "armv8-a",
-            "extra_cflags": ""
+            "extra_cflags": "",
+            "simd": "NEON"
         },
         "armeabi-v7a": {
             "target": "armv7a-linux-androideabi",
             "arch_name": "arm",
             "cpu": "armv7-a", 
-            "extra_cflags": "-mfpu=neon -mfloat-abi=softfp"
+            "extra_cflags": "-mfpu=neon -mfloat-abi=softfp",
+            "simd": "NEON"
         },
         "x86": {
             "target": "i686-linux-android",
             "arch_name": "x86",
             "cpu": "i686",
-            "extra_cflags": ""
+            "extra_cflags": "",
+            "simd": "SSE/AVX"
         },
         "x86_64": {
             "target": "x86_64-linux-android",
             "arch_name": "x86_64", 
             "cpu": "x86-64",
-            "extra_cflags": ""
+            "extra_cflags": "",
+            "simd": "SSE/AVX"
         }
     }
     
@@ -51,11 +58,69 @@ class ArchitectureConfig:
         return list(cls.CONFIGS.keys())
 
 
+# configure 选项: 字符串中的 $VAR 在运行时展开；(模板, 字面值) 中只展开模板，
+# 字面值（来自配置的用户输入，如额外编译选项）原样追加在后面
+ConfigureOption = Union[str, Tuple[str, str]]
+
+
 class ScriptGenerator:
     """脚本生成器"""
     
+    DISTCLEAN_CMD = 'make distclean 2>/dev/null || true'
+    
+    # 汇编检测结果，在 configure 参数数组中展开
+    ASM_ARGS = '${ASM_ARGS[@]}'
+    
+    # 汇编检测标记行前缀
+    ASM_MARKER = '::asm::'
+    
+    ASM_DETECT_FUNCTION = '''# 检测当前架构可用的汇编器，configure 参数写入 ASM_ARGS
+# 输出: ::asm:: <架构> <yes|no> <说明>
+detect_asm() {
+    ASM_ARGS=()
+    local probe
+    probe=$(mktemp -d)
+    case $ARCH in
+        arm64-v8a)
+            printf 'ld1 {v0.4s}, [x0]\\n' > "$probe/probe.s"
+            if "$CC" -c "$probe/probe.s" -o "$probe/probe.o" >/dev/null 2>&1; then
+                echo "::asm:: $ARCH yes clang 集成汇编器"
+            else
+                ASM_ARGS=(--disable-neon)
+                echo "::asm:: $ARCH no clang 集成汇编器不支持 NEON"
+            fi
+            ;;
+        armeabi-v7a)
+            printf '.fpu neon\\nvld1.32 {d0}, [r0]\\n' > "$probe/probe.s"
+            if "$CC" -mfpu=neon -c "$probe/probe.s" -o "$probe/probe.o" >/dev/null 2>&1; then
+                echo "::asm:: $ARCH yes clang 集成汇编器"
+            else
+                ASM_ARGS=(--disable-neon)
+                echo "::asm:: $ARCH no clang 集成汇编器不支持 NEON"
+            fi
+            ;;
+        x86|x86_64)
+            local format=elf32
+            [ "$ARCH" = "x86_64" ] && format=elf64
+            printf 'vextracti128 xmm0, ymm0, 0\\n' > "$probe/probe.asm"
+            if command -v nasm >/dev/null 2>&1 && nasm -f $format "$probe/probe.asm" -o "$probe/probe.o" >/dev/null 2>&1; then
+                echo "::asm:: $ARCH yes nasm"
+            elif command -v yasm >/dev/null 2>&1 && yasm -f $format "$probe/probe.asm" -o "$probe/probe.o" >/dev/null 2>&1; then
+                ASM_ARGS=(--x86asmexe=yasm)
+                echo "::asm:: $ARCH yes yasm"
+            else
+                ASM_ARGS=(--disable-x86asm)
+                echo "::asm:: $ARCH no 未找到可用的 nasm/yasm"
+            fi
+            ;;
+    esac
+    rm -rf "$probe"
+}'''
+    
     def __init__(self):
-        pass
+        # 编译缓存包装器由当前 Python 解释器执行
+        self.python_executable = sys.executable
+        self.ccache_script = Path(__file__).resolve().with_name('ccache.py')
     
     def generate_header(self, config: BuildConfig) -> str:
         """生成脚本头部"""
@@ -69,11 +134,20 @@ class ScriptGenerator:
             )
         arch_config_script = '\n'.join(arch_config_lines)
         
+        build_opts = config.buildOptions
+        jobs = build_opts.jobs if build_opts.jobs > 0 else '$(nproc)'
+        mode = '多架构并行 (树外构建)' if build_opts.parallel else '逐个架构'
+        if build_opts.incremental:
+            mode += ', 增量编译'
+        if build_opts.configureCache:
+            mode += ', 配置缓存'
+        
         return f'''#!/bin/bash
 # FFmpeg Android 多架构编译脚本
 # 生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}
 
 set -e
+set -o pipefail
 
 # 架构配置
 {arch_config_script}
@@ -82,28 +156,86 @@ set -e
 ARCHS="{arch_list}"
 API={config.api}
 
-echo "========================================="
-echo "FFmpeg Android 编译"
-echo "========================================="
-echo "目标架构: $ARCHS"
-echo "Android API: $API"
-echo "输出类型: {config.outputType}"
-echo "解码器: {', '.join(config.decoders)}"
-echo "编码器: {', '.join(config.encoders)}"
-echo "滤镜: {', '.join(config.filters)}"
-echo "========================================="'''
+# 并行任务数（多架构并行时由所有架构共享）
+JOBS={jobs}
+
+# 脚本自身路径，并行模式下按架构重新调用
+SCRIPT_PATH="$(cd "$(dirname "${{BASH_SOURCE[0]}}")" && pwd)/$(basename "${{BASH_SOURCE[0]}}")"
+
+# 单架构模式: ./build_ffmpeg.sh --arch <架构>
+SINGLE_ARCH=""
+if [ "$1" = "--arch" ]; then
+    SINGLE_ARCH="$2"
+fi
+
+if [ -z "$SINGLE_ARCH" ]; then
+    echo "========================================="
+    echo "FFmpeg Android 编译"
+    echo "========================================="
+    echo "目标架构: $ARCHS"
+    echo "Android API: $API"
+    echo "输出类型: {config.outputType}"
+    echo "构建模式: {mode}"
+    echo "并行任务数: $JOBS"
+    echo "解码器: {', '.join(config.decoders)}"
+    echo "编码器: {', '.join(config.encoders)}"
+    echo "滤镜: {', '.join(config.filters)}"
+    echo "========================================="
+fi'''
     
     def generate_environment_setup(self) -> str:
         """生成环境设置"""
         return '''
+# 主机平台: Windows 下在 MSYS2 中运行，Linux 下直接使用系统 bash
+case "$(uname -s)" in
+    MINGW*|MSYS*|CYGWIN*)
+        export HOST_TAG="windows-x86_64"
+        ;;
+    Linux*)
+        export HOST_TAG="linux-x86_64"
+        ;;
+    *)
+        echo "错误: 不支持的主机平台: $(uname -s)"
+        exit 1
+        ;;
+esac
+
+# 转换Windows路径为MSYS2路径，其他平台原样返回
+to_unix_path() {
+    if [ "$HOST_TAG" = "windows-x86_64" ]; then
+        cygpath -u "$1"
+    else
+        echo "$1"
+    fi
+}
+
+# 阶段计时标记，由 src/core/trace.py 解析
+# 用法: stage_mark begin|end <阶段>；CPU 时间取自 times 的子进程累计值
+# (times 需在当前 shell 中执行，管道或命令替换中的子 shell 统计为 0)
+stage_mark() {
+    local TIMES_FILE="${TMPDIR:-/tmp}/ffab-times.$$"
+    times > "$TIMES_FILE"
+    echo "::stage:: $1 $ARCH $2 $(date +%s.%N) $(tail -n 1 "$TIMES_FILE")"
+    rm -f "$TIMES_FILE"
+}
+
+# 目标数标记，由 src/core/progress.py 解析
+# make -n 预演本次需要执行的命令，按简要输出标签 (CC/AS/LD...) 统计目标数；预演失败时不输出
+count_objects() {
+    local COUNT
+    COUNT=$(make -n 2>/dev/null | { grep -oE 'printf "(CC|CXX|AS|X86ASM|LD|AR)\\\\t' || true; } | wc -l) || return 0
+    echo "::objects:: $ARCH $COUNT"
+}
+
 # 基础设置
 export WORK_DIR="$(pwd)"
 export NDK_ROOT="$WORK_DIR/android-ndk"
-export TOOLCHAIN="$NDK_ROOT/toolchains/llvm/prebuilt/windows-x86_64"
+export TOOLCHAIN="$NDK_ROOT/toolchains/llvm/prebuilt/$HOST_TAG"
+export SOURCE_DIR="$WORK_DIR/ffmpeg"
 
-# 转换Windows路径为MSYS2路径
-export NDK_ROOT=$(cygpath -u "$NDK_ROOT")
-export TOOLCHAIN=$(cygpath -u "$TOOLCHAIN")
+export NDK_ROOT=$(to_unix_path "$NDK_ROOT")
+export TOOLCHAIN=$(to_unix_path "$TOOLCHAIN")
+export SOURCE_DIR=$(to_unix_path "$SOURCE_DIR")
 
 # 检查环境
 if [ ! -d "$NDK_ROOT" ]; then
@@ -116,14 +248,153 @@ if [ ! -d "$TOOLCHAIN" ]; then
     exit 1
 fi
 
-if [ ! -d "ffmpeg" ]; then
+if [ ! -d "$SOURCE_DIR" ]; then
     echo "错误: FFmpeg 源码目录不存在"
     exit 1
 fi'''
     
+    def generate_ccache_setup(self, config: BuildConfig) -> str:
+        """生成编译缓存设置"""
+        build_opts = config.buildOptions
+        if not build_opts.ccache:
+            return ''
+        
+        return f'''
+# 编译缓存
+export FFAB_CCACHE_DIR={shlex.quote(build_opts.ccacheDir)}
+export FFAB_CCACHE_MAXSIZE={build_opts.ccacheMaxSize}
+CCACHE_PYTHON="{self.python_executable}"
+CCACHE_SCRIPT="{self.ccache_script}"
+
+export FFAB_CCACHE_DIR=$(to_unix_path "$FFAB_CCACHE_DIR")
+CCACHE_PYTHON=$(to_unix_path "$CCACHE_PYTHON")
+CCACHE_SCRIPT=$(to_unix_path "$CCACHE_SCRIPT")
+
+# 相对路径基于工作目录
+case "$FFAB_CCACHE_DIR" in
+    /*) ;;
+    *) export FFAB_CCACHE_DIR="$WORK_DIR/$FFAB_CCACHE_DIR" ;;
+esac
+mkdir -p "$FFAB_CCACHE_DIR"
+
+# 生成编译器包装脚本（先写临时文件再替换，避免并行架构读到写了一半的脚本）
+CCACHE="$(dirname "$SCRIPT_PATH")/ccache-wrapper"
+cat > "$CCACHE.$$" <<EOF
+#!/bin/sh
+exec "$CCACHE_PYTHON" "$CCACHE_SCRIPT" "\\$@"
+EOF
+chmod +x "$CCACHE.$$"
+mv -f "$CCACHE.$$" "$CCACHE"
+
+if [ -z "$SINGLE_ARCH" ]; then
+    echo "编译缓存目录: $FFAB_CCACHE_DIR (上限 $FFAB_CCACHE_MAXSIZE MB)"
+fi'''
+    
+    def generate_configure_cache_setup(self, config: BuildConfig) -> str:
+        """生成配置缓存设置"""
+        build_opts = config.buildOptions
+        if not build_opts.configureCache:
+            return ''
+        
+        return f'''
+# 配置缓存
+CONFIGURE_CACHE_DIR={shlex.quote(build_opts.configureCacheDir)}
+
+CONFIGURE_CACHE_DIR=$(to_unix_path "$CONFIGURE_CACHE_DIR")
+
+# 相对路径基于工作目录
+case "$CONFIGURE_CACHE_DIR" in
+    /*) ;;
+    *) CONFIGURE_CACHE_DIR="$WORK_DIR/$CONFIGURE_CACHE_DIR" ;;
+esac
+mkdir -p "$CONFIGURE_CACHE_DIR"
+
+# 带缓存的 configure: 命中时恢复 configure 生成的文件，否则运行 configure 并保存其输出
+# 用法: cached_configure <配置指纹> <configure参数...>
+cached_configure() {{
+    local FINGERPRINT=$1
+    shift
+    local ARCHIVE="$CONFIGURE_CACHE_DIR/$FINGERPRINT.tar"
+    
+    if [ -f "$ARCHIVE" ] && tar -xmf "$ARCHIVE"; then
+        echo "命中配置缓存 (${{FINGERPRINT:0:12}})，跳过 configure"
+        touch "$ARCHIVE"
+        return 0
+    fi
+    
+    # configure 运行期间新建或修改的文件即为其输出
+    # (config.h、config.mak、config_components.h、ffbuild/config.*、组件列表等)
+    local STAMP=".configure-stamp"
+    touch "$STAMP"
+    "$SOURCE_DIR/configure" "$@" || {{ rm -f "$STAMP"; return 1; }}
+    
+    local LIST="$STAMP.list"
+    find . -path ./.git -prune -o ! -type d -newer "$STAMP" \\
+        ! -name "$STAMP" ! -name "$STAMP.list" ! -path ./ffbuild/config.log -print > "$LIST"
+    if tar -cf "$ARCHIVE.$$" -T "$LIST" && mv -f "$ARCHIVE.$$" "$ARCHIVE"; then
+        echo "已保存配置缓存 (${{FINGERPRINT:0:12}})"
+    else
+        rm -f "$ARCHIVE.$$"
+        echo "警告: 保存配置缓存失败"
+    fi
+    rm -f "$STAMP" "$LIST"
+}}
+
+if [ -z "$SINGLE_ARCH" ]; then
+    echo "配置缓存目录: $CONFIGURE_CACHE_DIR"
+fi'''
+    
+    def generate_asm_detection(self, config: BuildConfig) -> str:
+        """生成汇编器检测函数"""
+        if config.optimizations.disableAsm:
+            return ''
+        return '\n' + self.ASM_DETECT_FUNCTION
+    
     def generate_build_function(self, config: BuildConfig) -> str:
         """生成构建函数"""
-        configure_cmd = self._generate_configure_command(config)
+        configure_args = self._generate_configure_command(config)
+        configure_step = self._generate_configure_step(config)
+        
+        if self._uses_build_dirs(config):
+            # 每个架构独立的树外构建目录，ffmpeg/ 源码保持只读
+            enter_build_dir = '''    # 进入架构独立的构建目录（树外构建）
+    local BUILD_DIR="$WORK_DIR/build-$ARCH"
+    mkdir -p "$BUILD_DIR"
+    cd "$BUILD_DIR"'''
+        else:
+            enter_build_dir = '''    # 进入ffmpeg目录
+    local BUILD_DIR="$SOURCE_DIR"
+    cd "$BUILD_DIR"'''
+        
+        if config.buildOptions.parallel:
+            # 不带 -j，子 make 通过 jobserver 共享调度 make 的任务数
+            make_cmd = 'make'
+        else:
+            make_cmd = 'make -j$JOBS'
+        
+        if config.optimizations.disableAsm:
+            asm_detect = ''
+        else:
+            asm_detect = '''
+    
+    # 检测汇编器（在启用编译缓存前使用原始编译器）
+    local ASM_ARGS=()
+    detect_asm'''
+        
+        if config.buildOptions.ccache:
+            ccache_begin = '''
+    # 通过编译缓存调用编译器
+    export CC="$CCACHE $CC"
+    export CXX="$CCACHE $CXX"
+    export FFAB_CCACHE_STATS="$ARCH"
+    "$CCACHE" --zero-stats "$ARCH"'''
+            ccache_end = '''
+    
+    # 编译缓存统计
+    "$CCACHE" --show-stats "$ARCH"'''
+        else:
+            ccache_begin = ''
+            ccache_end = ''
         
         return f'''
 # 编译函数
@@ -151,8 +422,10 @@ build_for_arch() {{
     export STRIP="$TOOLCHAIN/bin/llvm-strip"
     export NM="$TOOLCHAIN/bin/llvm-nm"
     
-    # 添加mingw64到PATH
-    export PATH="/mingw64/bin:$PATH"
+    # 添加mingw64到PATH（仅Windows/MSYS2）
+    if [ "$HOST_TAG" = "windows-x86_64" ]; then
+        export PATH="/mingw64/bin:$PATH"
+    fi
     
     # 设置主机编译器
     export HOSTCC="gcc"
@@ -162,16 +435,13 @@ build_for_arch() {{
     if [ ! -f "$CC" ]; then
         echo "错误: 编译器不存在: $CC"
         return 1
-    fi
+    fi{asm_detect}
+{ccache_begin}
     
     echo "使用编译器: $CC"
     echo "输出目录: $PREFIX"
     
-    # 进入ffmpeg目录
-    cd ffmpeg
-    
-    # 清理
-    make distclean 2>/dev/null || true
+{enter_build_dir}
     
     # 架构特定配置
     local EXTRA_CFLAGS=""
@@ -181,39 +451,75 @@ build_for_arch() {{
             ;;
     esac
     
-{configure_cmd}
+{configure_args}
+    
+{configure_step}
     
     echo "配置完成，开始编译 $ARCH..."
     
+    # 统计目标数，用于计算进度和剩余时间
+    count_objects
+    
     # 编译和安装
-    make -j$(nproc)
+    stage_mark begin make
+    {make_cmd}
+    stage_mark end make
+    stage_mark begin install
     make install
+    stage_mark end install
     
     echo "$ARCH 编译成功！"
     echo "库文件位置: $PREFIX"
-    ls -la "$PREFIX/lib/" 2>/dev/null || true
+    ls -la "$PREFIX/lib/" 2>/dev/null || true{ccache_end}
     
-    # 返回上级目录
-    cd ..
+    # 返回工作目录
+    cd "$WORK_DIR"
 }}'''
     
     def generate_footer(self, config: BuildConfig) -> str:
         """生成脚本尾部"""
         arch_count = len(config.architectures)
         
+        if config.buildOptions.parallel:
+            build_all = self._generate_parallel_build()
+        else:
+            build_all = '''# 逐个编译所有架构
+for ARCH in $ARCHS; do
+    build_for_arch $ARCH
+    echo ""
+done'''
+        
+        if self._uses_build_dirs(config):
+            build_all = '''# 树外构建要求源码目录中没有旧的配置
+if [ -f "$SOURCE_DIR/config.h" ]; then
+    echo "清理源码目录中的旧配置..."
+    make -C "$SOURCE_DIR" distclean >/dev/null 2>&1 || true
+fi
+
+''' + build_all
+        
         return f'''
-# 编译所有架构
+# 单架构模式直接编译后退出
+if [ -n "$SINGLE_ARCH" ]; then
+    if [[ ! ${{ARCH_CONFIG[$SINGLE_ARCH]+_}} ]]; then
+        echo "错误: 不支持的架构 $SINGLE_ARCH"
+        exit 1
+    fi
+    build_for_arch "$SINGLE_ARCH"
+    exit 0
+fi
+
+# 检查架构
 for ARCH in $ARCHS; do
     if [[ ! ${{ARCH_CONFIG[$ARCH]+_}} ]]; then
         echo "错误: 不支持的架构 $ARCH"
         echo "支持的架构: ${{!ARCH_CONFIG[@]}}"
         exit 1
     fi
-    
-    build_for_arch $ARCH
-    echo ""
 done
 
+{build_all}
+
 echo "========================================="
 echo "所有架构编译完成！"
 echo "========================================="
@@ -231,55 +537,98 @@ done
 echo ""
 echo "编译完成！已生成 {arch_count} 个架构的库文件"'''
     
+    def _generate_parallel_build(self) -> str:
+        """生成多架构并行编译部分"""
+        return '''# 生成调度 Makefile：每个架构一个目标，"+" 让各架构的 make 加入同一个 jobserver
+PARALLEL_MK="$(dirname "$SCRIPT_PATH")/parallel.mk"
+{
+    echo "SHELL := bash"
+    echo ".SHELLFLAGS := -o pipefail -c"
+    echo ".PHONY: all $ARCHS"
+    echo "all: $ARCHS"
+    for ARCH in $ARCHS; do
+        printf '%s:\\n\\t+@bash "%s" --arch %s 2>&1 | sed -u "s/^/[%s] /"\\n' "$ARCH" "$SCRIPT_PATH" "$ARCH" "$ARCH"
+    done
+} > "$PARALLEL_MK"
+
+echo "并行编译架构: $ARCHS (共享任务数: $JOBS)"
+make -j"$JOBS" -f "$PARALLEL_MK" all
+echo ""'''
+    
     def _generate_configure_command(self, config: BuildConfig) -> str:
-        """生成configure命令"""
-        lines = ['    # 配置命令', '    ./configure \\']
-        
+        """生成configure参数数组"""
+        lines = ['    # configure 参数', '    local CONFIGURE_ARGS=(']
+        for option in self._configure_options(config):
+            if isinstance(option, tuple):
+                template, literal = option
+                lines.append(f'        "{template}"{shlex.quote(literal)}')
+            else:
+                lines.append(f'        "{option}"')
+        lines.append('    )')
+        return '\n'.join(lines)
+    
+    def _configure_options(self, config: BuildConfig) -> List[ConfigureOption]:
+        """configure 选项列表，$VAR 形式的变量由脚本在运行时展开（见 ConfigureOption）"""
         # 基础配置
-        base_options = [
-            '--prefix="$PREFIX"',
+        options = [
+            '--prefix=$PREFIX',
             '--enable-cross-compile',
             '--target-os=android',
             '--arch=$ARCH_NAME',
             '--cpu=$CPU',
-            '--cc="$CC"',
-            '--cxx="$CXX"',
-            '--ar="$AR"',
-            '--ranlib="$RANLIB"',
-            '--strip="$STRIP"',
-            '--nm="$NM"',
-            '--host-cc="$HOSTCC"',
-            '--sysroot="$TOOLCHAIN/sysroot"',
-            '--extra-cflags="$EXTRA_CFLAGS"'
+            '--cc=$CC',
+            '--cxx=$CXX',
+            '--ar=$AR',
+            '--ranlib=$RANLIB',
+            '--strip=$STRIP',
+            '--nm=$NM',
+            '--host-cc=$HOSTCC',
+            '--sysroot=$TOOLCHAIN/sysroot'
         ]
         
-        for option in base_options:
-            lines.append(f'        {option} \\')
+        # 优化档位和额外的编译/链接选项
+        opt = config.optimizations
+        profile = opt.resolve_profile()
+        cflags = ['$EXTRA_CFLAGS']
+        ldflags = []
+        if profile['gcSections']:
+            cflags.extend(['-ffunction-sections', '-fdata-sections'])
+            ldflags.append('-Wl,--gc-sections')
+        options.append(self._with_literal(f'--extra-cflags={" ".join(cflags)}', opt.extraCflags))
+        if ldflags or opt.extraLdflags:
+            options.append(self._with_literal(f'--extra-ldflags={" ".join(ldflags)}', opt.extraLdflags))
+        if profile['optLevel']:
+            options.append(f'--optflags=-{profile["optLevel"]}')
+        if profile['lto'] == 'full':
+            options.append('--enable-lto')
+        elif profile['lto']:
+            options.append(f'--enable-lto={profile["lto"]}')
         
         # 输出类型配置
         is_shared = config.outputType == 'shared'
-        lines.append(f'        --{"enable" if is_shared else "disable"}-shared \\')
-        lines.append(f'        --{"disable" if is_shared else "enable"}-static \\')
+        options.append(f'--{"enable" if is_shared else "disable"}-shared')
+        options.append(f'--{"disable" if is_shared else "enable"}-static')
         
         # 优化选项
-        opt = config.optimizations
         if opt.disableAsm:
-            lines.append('        --disable-asm \\')
+            options.append('--disable-asm')
+        else:
+            options.append(self.ASM_ARGS)
         if opt.enablePic:
-            lines.append('        --enable-pic \\')
+            options.append('--enable-pic')
         if opt.disableDebug:
-            lines.append('        --disable-debug \\')
+            options.append('--disable-debug')
         if opt.disableDoc:
-            lines.append('        --disable-doc \\')
+            options.append('--disable-doc')
         if opt.disablePrograms:
-            lines.append('        --disable-programs \\')
+            options.append('--disable-programs')
         if opt.enableSmall:
-            lines.append('        --enable-small \\')
+            options.append('--enable-small')
         
         # 固定优化选项
-        lines.extend([
-            '        --disable-symver \\',
-            '        --disable-everything \\'
+        options.extend([
+            '--disable-symver',
+            '--disable-everything'
         ])
         
         # 组件配置
@@ -289,18 +638,83 @@ echo "编译完成！已生成 {arch_count} 个架构的库文件"'''
             (config.muxers, 'muxer'),
             (config.demuxers, 'demuxer'),
             (config.protocols, 'protocol'),
-            (config.filters, 'filter')
+            (config.filters, 'filter'),
+            (config.parsers, 'parser'),
+            (config.bsfs, 'bsf')
         ]
         
         for components, flag_prefix in component_types:
             for component in components:
-                lines.append(f'        --enable-{flag_prefix}={component} \\')
+                options.append(f'--enable-{flag_prefix}={component}')
         
-        # 移除最后一行的反斜杠
-        if lines and lines[-1].endswith(' \\'):
-            lines[-1] = lines[-1].rstrip(' \\')
+        # 组件用不到的库
+        for library in pruned_libraries(config):
+            options.append(f'--disable-{library}')
         
-        return '\n'.join(lines)
+        return options
+    
+    @staticmethod
+    def _with_literal(template: str, literal: str) -> ConfigureOption:
+        """在展开变量的选项后追加原样传递的用户输入"""
+        if not literal:
+            return template
+        if not template.endswith('='):
+            template += ' '
+        return (template, literal)
+    
+    def _generate_configure_step(self, config: BuildConfig) -> str:
+        """生成配置步骤"""
+        build_opts = config.buildOptions
+        if build_opts.configureCache:
+            configure_cmd = 'cached_configure "$FINGERPRINT" "${CONFIGURE_ARGS[@]}"'
+        else:
+            configure_cmd = '"$SOURCE_DIR/configure" "${CONFIGURE_ARGS[@]}"'
+        
+        if not (build_opts.incremental or build_opts.configureCache):
+            return f'''    # 清理
+{self._staged('distclean', self.DISTCLEAN_CMD, 4)}
+    
+    # 配置
+{self._staged('configure', configure_cmd, 4)}'''
+        
+        fingerprint = '''    # 配置指纹: configure 参数 + 工具链 + FFmpeg 源码版本 + 构建目录
+    # (configure 输出中包含源码和构建目录的绝对路径，树内/树外构建不能混用)
+    local FFMPEG_REV
+    FFMPEG_REV=$(git -C "$SOURCE_DIR" rev-parse HEAD 2>/dev/null || cat "$SOURCE_DIR/RELEASE" 2>/dev/null || echo unknown)
+    local FINGERPRINT
+    FINGERPRINT=$(printf '%s\\n' "${CONFIGURE_ARGS[@]}" "$TOOLCHAIN" "$FFMPEG_REV" "$BUILD_DIR" | sha256sum | cut -d' ' -f1)'''
+        
+        if not build_opts.incremental:
+            return f'''{fingerprint}
+    
+    # 清理
+{self._staged('distclean', self.DISTCLEAN_CMD, 4)}
+    
+    # 配置
+{self._staged('configure', configure_cmd, 4)}'''
+        
+        return f'''{fingerprint}
+    local FINGERPRINT_FILE="$BUILD_DIR/.configure-fingerprint"
+    
+    if [ -f Makefile ] && [ -f "$FINGERPRINT_FILE" ] && [ "$(cat "$FINGERPRINT_FILE")" = "$FINGERPRINT" ]; then
+        echo "配置未变化，跳过 configure，增量编译 $ARCH"
+    else
+        echo "配置已变化，重新配置 $ARCH"
+        rm -f "$FINGERPRINT_FILE"
+{self._staged('distclean', self.DISTCLEAN_CMD, 8)}
+{self._staged('configure', configure_cmd, 8)}
+        echo "$FINGERPRINT" > "$FINGERPRINT_FILE"
+    fi'''
+    
+    def _staged(self, stage: str, command: str, indent: int) -> str:
+        """在命令前后加上阶段计时标记"""
+        pad = ' ' * indent
+        return f"{pad}stage_mark begin {stage}\n{pad}{command}\n{pad}stage_mark end {stage}"
+    
+    def _uses_build_dirs(self, config: BuildConfig) -> bool:
+        """是否使用每个架构独立的树外构建目录"""
+        build_opts = config.buildOptions
+        return build_opts.parallel or build_opts.incremental
 
 
 class BuildManager:
@@ -320,6 +734,9 @@ class BuildManager:
             script_parts = [
                 self.generator.generate_header(config),
                 self.generator.generate_environment_setup(),
+                self.generator.generate_ccache_setup(config),
+                self.generator.generate_configure_cache_setup(config),
+                self.generator.generate_asm_detection(config),
                 self.generator.generate_build_function(config),
                 self.generator.generate_footer(config)
             ]
@@ -0,0 +1,408 @@
+"""
+编译缓存模块
+
+按内容寻址的编译器缓存（类似 ccache），包装 NDK 的 clang。
+缓存键由编译器、编译参数和预处理后的源码共同决定，命中时直接复用目标文件。
+
+本模块只依赖标准库，编译脚本会直接以脚本方式调用它:
+    python ccache.py <编译器> <参数...>
+    python ccache.py --zero-stats <标签>
+    python ccache.py --show-stats <标签>
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 缓存格式版本，变更缓存内容布局时递增
+CACHE_VERSION = "1"
+
+# 可缓存的源文件后缀
+SOURCE_SUFFIXES = ('.c', '.cc', '.cpp', '.cxx', '.m', '.s', '.S')
+
+# 后面跟独立参数值的编译选项
+OPTIONS_WITH_VALUE = {
+    '-o', '-MF', '-MT', '-MQ', '-I', '-D', '-U', '-include', '-imacros',
+    '-isystem', '-iquote', '-idirafter', '-x', '-target', '-arch',
+    '-Xclang', '-Xassembler', '-Xlinker', '--sysroot', '-isysroot'
+}
+
+# 依赖文件相关选项，预处理时需要去掉
+DEPFILE_FLAGS = {'-MD', '-MMD', '-MP'}
+DEPFILE_OPTIONS = {'-MF', '-MT', '-MQ'}
+
+# 环境变量
+ENV_CACHE_DIR = 'FFAB_CCACHE_DIR'
+ENV_MAX_SIZE = 'FFAB_CCACHE_MAXSIZE'
+ENV_STATS_TAG = 'FFAB_CCACHE_STATS'
+
+DEFAULT_MAX_SIZE_MB = 5120
+
+# 统计记录字符
+STAT_HIT = b'h'
+STAT_MISS = b'm'
+STAT_UNCACHEABLE = b'u'
+
+
+class CompileCommand:
+    """解析后的编译命令"""
+
+    def __init__(self, argv: List[str]):
+        self.compiler = argv[0]
+        self.args = argv[1:]
+        self.inputs: List[str] = []
+        self.output: Optional[str] = None
+        self.depfile: Optional[str] = None
+        self.has_compile_flag = False
+        self.preprocess_args: List[str] = []
+        self.uncacheable_reason: Optional[str] = None
+        self._parse()
+
+    def _parse(self):
+        """解析编译参数"""
+        args = self.args
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            value = args[i + 1] if i + 1 < len(args) else None
+
+            if arg.startswith('@'):
+                self.uncacheable_reason = '响应文件'
+            elif arg in ('-E', '-M', '-MM', '-S', '-fsyntax-only'):
+                self.uncacheable_reason = f'不支持的选项 {arg}'
+            elif arg == '-c':
+                self.has_compile_flag = True
+            elif arg == '-o':
+                self.output = value
+                i += 1
+            elif arg.startswith('-o') and len(arg) > 2:
+                self.output = arg[2:]
+            elif arg in DEPFILE_FLAGS:
+                pass
+            elif arg in DEPFILE_OPTIONS:
+                if arg == '-MF':
+                    self.depfile = value
+                i += 1
+            elif arg.startswith('-MF') and len(arg) > 3:
+                self.depfile = arg[3:]
+            elif arg.startswith('-MT') or arg.startswith('-MQ'):
+                pass
+            elif arg in OPTIONS_WITH_VALUE:
+                self.preprocess_args.extend([arg, value] if value is not None else [arg])
+                i += 1
+            elif arg == '-':
+                self.uncacheable_reason = '从标准输入读取源码'
+            elif not arg.startswith('-') and arg.endswith(SOURCE_SUFFIXES):
+                self.inputs.append(arg)
+            else:
+                self.preprocess_args.append(arg)
+            i += 1
+
+        if self.uncacheable_reason:
+            return
+        if not self.has_compile_flag:
+            self.uncacheable_reason = '非编译命令'
+        elif len(self.inputs) != 1:
+            self.uncacheable_reason = '源文件数量不为1'
+        elif not self.output:
+            self.uncacheable_reason = '未指定输出文件'
+        elif 'ffconf.' in self.inputs[0]:
+            # configure 的探测程序每次使用随机临时文件名，缓存只会无谓地占用空间
+            self.uncacheable_reason = 'configure 探测'
+
+    @property
+    def cacheable(self) -> bool:
+        return self.uncacheable_reason is None
+
+
+class CompilerCache:
+    """编译缓存"""
+
+    def __init__(self, cache_dir: Path, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max(0, int(max_size_mb)) * 1024 * 1024
+        self.stats_dir = self.cache_dir / "stats"
+
+    @classmethod
+    def from_env(cls) -> 'CompilerCache':
+        """从环境变量创建"""
+        cache_dir = os.environ.get(ENV_CACHE_DIR) or str(Path.home() / ".ffab-ccache")
+        max_size = os.environ.get(ENV_MAX_SIZE) or DEFAULT_MAX_SIZE_MB
+        return cls(Path(cache_dir), int(max_size))
+
+    def ensure_dirs(self):
+        """创建缓存目录"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---- 编译 ----
+
+    def run(self, argv: List[str]) -> int:
+        """以缓存方式执行编译命令，返回编译器退出码"""
+        command = CompileCommand(argv)
+        if not command.cacheable:
+            self._record(STAT_UNCACHEABLE)
+            return subprocess.call(argv)
+
+        key = self._compute_key(command)
+        if key is None:
+            self._record(STAT_UNCACHEABLE)
+            return subprocess.call(argv)
+
+        if self._restore(key, command):
+            self._record(STAT_HIT)
+            return 0
+
+        result = subprocess.run(argv, stderr=subprocess.PIPE)
+        if result.stderr:
+            sys.stderr.buffer.write(result.stderr)
+            sys.stderr.buffer.flush()
+        if result.returncode == 0:
+            self._store(key, command, result.stderr)
+        self._record(STAT_MISS)
+        return result.returncode
+
+    def _compute_key(self, command: CompileCommand) -> Optional[str]:
+        """计算缓存键：编译器身份 + 参数 + 预处理结果"""
+        compiler_path = shutil.which(command.compiler) or command.compiler
+        try:
+            compiler_stat = os.stat(compiler_path)
+        except OSError:
+            return None
+
+        preprocess_cmd = [command.compiler] + command.preprocess_args + ['-E', command.inputs[0]]
+        result = subprocess.run(preprocess_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            return None
+
+        digest = hashlib.sha256()
+        for part in (CACHE_VERSION, os.path.abspath(compiler_path),
+                     str(compiler_stat.st_size), str(compiler_stat.st_mtime_ns),
+                     os.getcwd(), command.output, command.depfile or ''):
+            digest.update(part.encode('utf-8', 'surrogateescape'))
+            digest.update(b'\0')
+        for arg in command.preprocess_args:
+            digest.update(arg.encode('utf-8', 'surrogateescape'))
+            digest.update(b'\0')
+        digest.update(result.stdout)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key[2:]
+
+    def _restore(self, key: str, command: CompileCommand) -> bool:
+        """从缓存恢复目标文件"""
+        entry = self._entry_path(key)
+        obj_file = entry.with_suffix('.o')
+        dep_file = entry.with_suffix('.d')
+        err_file = entry.with_suffix('.stderr')
+
+        if not obj_file.exists() or (command.depfile and not dep_file.exists()):
+            return False
+
+        try:
+            _atomic_copy(obj_file, Path(command.output))
+            if command.depfile:
+                _atomic_copy(dep_file, Path(command.depfile))
+            if err_file.exists():
+                sys.stderr.buffer.write(err_file.read_bytes())
+                sys.stderr.buffer.flush()
+            # 更新访问时间，用于 LRU 淘汰
+            os.utime(obj_file)
+        except OSError:
+            # 条目可能正被其他进程淘汰
+            return False
+        return True
+
+    def _store(self, key: str, command: CompileCommand, stderr: bytes):
+        """保存编译结果到缓存"""
+        entry = self._entry_path(key)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            if command.depfile:
+                if not os.path.exists(command.depfile):
+                    return
+                _atomic_copy(Path(command.depfile), entry.with_suffix('.d'))
+            if stderr:
+                _atomic_write(entry.with_suffix('.stderr'), stderr)
+            # 目标文件最后写入，作为条目完整的标志
+            _atomic_copy(Path(command.output), entry.with_suffix('.o'))
+        except OSError:
+            pass
+
+    # ---- 统计 ----
+
+    def _stats_file(self, tag: str) -> Path:
+        return self.stats_dir / f"{tag}.log"
+
+    def _record(self, stat: bytes):
+        """记录一次命中/未命中（追加写，多进程安全）"""
+        tag = os.environ.get(ENV_STATS_TAG, 'default')
+        try:
+            self.stats_dir.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(self._stats_file(tag)), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, stat)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def zero_stats(self, tag: str):
+        """清零统计"""
+        try:
+            self._stats_file(tag).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self, tag: str) -> Dict[str, int]:
+        """获取统计"""
+        try:
+            data = self._stats_file(tag).read_bytes()
+        except FileNotFoundError:
+            data = b''
+        return {
+            'hits': data.count(STAT_HIT),
+            'misses': data.count(STAT_MISS),
+            'uncacheable': data.count(STAT_UNCACHEABLE)
+        }
+
+    def format_stats(self, tag: str) -> List[str]:
+        """格式化统计信息"""
+        stats = self.get_stats(tag)
+        total = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] * 100.0 / total if total else 0.0
+        size_mb = self.get_size() / (1024 * 1024)
+        max_mb = self.max_size / (1024 * 1024)
+        return [
+            f"编译缓存统计 [{tag}]: 命中 {stats['hits']}, 未命中 {stats['misses']}, "
+            f"不可缓存 {stats['uncacheable']}, 命中率 {hit_rate:.1f}%",
+            f"编译缓存大小: {size_mb:.1f} MB / {max_mb:.0f} MB"
+        ]
+
+    # ---- 容量管理 ----
+
+    def _list_entries(self) -> List[Tuple[float, int, List[Path]]]:
+        """列出缓存条目: (最近使用时间, 大小, 文件列表)"""
+        groups: Dict[Path, List[Path]] = {}
+        if not self.cache_dir.exists():
+            return []
+        for sub_dir in self.cache_dir.iterdir():
+            if not sub_dir.is_dir() or sub_dir == self.stats_dir:
+                continue
+            for path in sub_dir.iterdir():
+                if path.name.startswith('.tmp'):
+                    continue
+                groups.setdefault(path.with_suffix(''), []).append(path)
+
+        entries = []
+        for stem, files in groups.items():
+            size = 0
+            mtime = 0.0
+            for path in files:
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                size += st.st_size
+                if path.suffix == '.o':
+                    mtime = st.st_mtime
+            entries.append((mtime, size, files))
+        return entries
+
+    def get_size(self) -> int:
+        """缓存总大小（字节）"""
+        return sum(size for _, size, _ in self._list_entries())
+
+    def cleanup(self) -> int:
+        """按 LRU 淘汰到容量上限的 90%，返回淘汰的条目数"""
+        entries = self._list_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return 0
+
+        target = self.max_size * 0.9
+        evicted = 0
+        for _, size, files in sorted(entries, key=lambda e: e[0]):
+            if total <= target:
+                break
+            for path in files:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """清空缓存"""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+
+def _atomic_copy(src: Path, dst: Path):
+    """复制文件，先写临时文件再替换"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=str(dst.parent))
+    try:
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, 'wb') as out_file, open(src, 'rb') as in_file:
+            shutil.copyfileobj(in_file, out_file)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _atomic_write(dst: Path, data: bytes):
+    """写入文件，先写临时文件再替换"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=str(dst.parent))
+    try:
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, 'wb') as out_file:
+            out_file.write(data)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv:
+        print("用法: ccache.py <编译器> <参数...> | --zero-stats <标签> | --show-stats <标签>",
+              file=sys.stderr)
+        return 2
+
+    cache = CompilerCache.from_env()
+
+    if argv[0] == '--zero-stats':
+        cache.zero_stats(argv[1] if len(argv) > 1 else 'default')
+        return 0
+
+    if argv[0] == '--show-stats':
+        tag = argv[1] if len(argv) > 1 else 'default'
+        for line in cache.format_stats(tag):
+            print(line)
+        evicted = cache.cleanup()
+        if evicted:
+            print(f"编译缓存超出上限，已淘汰 {evicted} 个最久未使用的条目")
+        return 0
+
+    return cache.run(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
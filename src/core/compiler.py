@@ -2,84 +2,645 @@
 编译管理模块
 """
 
+import re
+import shutil
+import sqlite3
 import subprocess
+import sys
+import time
+from dataclasses import replace
 from pathlib import Path
-from typing import Optional, Callable
-from .config import BuildConfig
-from .builder import BuildManager
-from .utils import create_safe_popen, safe_readline, clean_output_line
+from typing import Any, Dict, List, Optional, Callable, Tuple
+from .config import BuildConfig, ConfigManager
+from .environment import EnvironmentManager
+from .builder import BuildManager, ArchitectureConfig, ScriptGenerator
+from .ccache import CompilerCache
+from .artifacts import ArtifactCache
+from .components import ComponentResolver, COMPONENT_TYPES, pruned_libraries, required_libraries
+from .orchestrator import BuildOrchestrator, ArchState, StepState, StepStatus
+from .trace import BuildTracer, STAGE_MARKER
+from .logreader import LogReader, determine_log_level
+from .sizereport import SizeReporter
+from .packager import Packager, PackageError
+from .progress import ProgressTracker, ProgressHistory, OBJECTS_MARKER, history_key
+from .history import BuildHistory, HISTORY_DB, build_mode, config_hash
+from .utils import create_safe_popen, clean_output_line
+
+
+# 架构开始编译的提示行（x86_64 需在 x86 之前匹配）
+_ARCH_START_PATTERN = re.compile(r'开始编译架构: (arm64-v8a|armeabi-v7a|x86_64|x86)')
 
 
 class CompilerManager:
     """编译管理器"""
     
-    def __init__(self, work_dir: Path, build_dir: Path):
+    # 构建阶段对应的进度信息
+    STAGE_PROGRESS = {
+        'configure': ('configuring', '配置FFmpeg...'),
+        'make': ('building', '编译中...'),
+        'install': ('installing', '安装库文件...')
+    }
+    
+    def __init__(self, work_dir: Path, build_dir: Path, state_dir: Optional[Path] = None):
+        """build_dir 存放本次编译的脚本、耗时记录和体积报告；state_dir 存放跨编译共享的编译历史和
+        进度记录，默认与 build_dir 相同"""
         self.work_dir = Path(work_dir)
         self.build_dir = Path(build_dir)
+        self.state_dir = Path(state_dir) if state_dir else self.build_dir
         self.build_manager = BuildManager(work_dir, build_dir)
+        self.config_manager = ConfigManager(work_dir)
+        self.env_manager = EnvironmentManager(work_dir)
+        self.orchestrator: Optional[BuildOrchestrator] = None
+        self.asm_support: Dict[str, Tuple[bool, str]] = {}  # 架构 -> (是否启用汇编, 说明)
+        self.progress: Optional[ProgressTracker] = None
+        self.history = BuildHistory(self.state_dir / HISTORY_DB)
+        self.cache_stats: Dict[str, Any] = {}  # 本次编译的缓存命中情况，写入编译历史
+        self.size_report: Optional[Dict] = None  # 本次编译的体积报告
     
     def compile(self, config: BuildConfig, msys2_bash_path: str, 
                 progress_callback: Optional[Callable] = None,
-                log_callback: Optional[Callable] = None) -> bool:
-        """执行编译"""
+                log_callback: Optional[Callable] = None,
+                tracer: Optional[BuildTracer] = None,
+                log_batch_callback: Optional[Callable[[List[Tuple[str, str]]], None]] = None) -> bool:
+        """执行编译，tracer 可由调用方传入以包含环境准备阶段的耗时；
+        log_batch_callback 可批量接收编译输出的 (消息, 级别)，未提供时逐行调用 log_callback"""
+        tracer = tracer or BuildTracer()
+        self.asm_support = {}
+        self.progress = None
+        self.cache_stats = {}
+        self.size_report = None
+        history_config = config
+        success = False
+        if config.optimizations.disableAsm:
+            self.asm_support = {arch: (False, '配置中已禁用汇编') for arch in config.architectures}
         try:
-            # 生成构建脚本
-            script_path = self.build_manager.generate_build_script(config)
-            if not script_path:
-                return False
+            # 准备编译缓存
+            if config.buildOptions.ccache:
+                cache = self.get_compiler_cache(config)
+                cache.ensure_dirs()
+                if log_callback:
+                    log_callback(f"🗄️ 编译缓存: {cache.cache_dir} "
+                                 f"(上限 {config.buildOptions.ccacheMaxSize} MB)", 'info')
+            
+            # 解析组件依赖，按最小组件集编译（产物缓存键也基于解析后的配置）
+            if config.buildOptions.resolveComponents:
+                with tracer.span('resolve_components'):
+                    config = self._resolve_components(config, log_callback)
+            
+            # 按组件裁剪不需要的库
+            if config.optimizations.pruneLibraries and log_callback:
+                pruned = pruned_libraries(config)
+                if pruned:
+                    required = required_libraries(config)
+                    kept = ', '.join(f"{lib} ({reason})" for lib, reason in required.items())
+                    log_callback(f"📚 不编译的库: {', '.join(pruned)}" + (f"；保留: {kept}" if kept else ''), 'info')
+            
+            # 从产物缓存恢复命中的架构，只编译未命中的架构
+            artifact_keys = None
+            build_config = config
+            if config.buildOptions.artifactCache:
+                with tracer.span('artifact_restore'):
+                    artifact_keys = self._restore_artifacts(config, msys2_bash_path, log_callback)
+            if artifact_keys is not None:
+                self.cache_stats['artifact'] = {
+                    'hits': len(config.architectures) - len(artifact_keys),
+                    'misses': len(artifact_keys)
+                }
+                if not artifact_keys:
+                    if log_callback:
+                        log_callback("✅ 所有架构均命中产物缓存，跳过编译", 'success')
+                    self._show_compilation_results(log_callback, tracer)
+                    success = self._post_build(config, log_callback, tracer)
+                    return success
+                pending = [arch for arch in config.architectures if arch in artifact_keys]
+                build_config = replace(config, architectures=pending)
+            
+            # 按目标数计算进度和剩余时间
+            self.progress = self._create_progress_tracker(build_config)
+            
+            if build_config.buildOptions.executor == 'orchestrator':
+                # 由编排器直接调度各架构的构建步骤
+                success = self._run_orchestrator(build_config, msys2_bash_path,
+                                                 progress_callback, log_callback, tracer)
+            else:
+                # 生成构建脚本
+                with tracer.span('generate_script'):
+                    script_path = self.build_manager.generate_build_script(build_config)
+                if not script_path:
+                    return False
+                
+                # 执行编译
+                success = self._run_compilation(script_path, msys2_bash_path, 
+                                                progress_callback, log_callback, tracer,
+                                                log_batch_callback)
+            self._save_progress_history(build_config)
+            
+            # 保存新编译的架构到产物缓存
+            if success and artifact_keys:
+                with tracer.span('artifact_store'):
+                    self._store_artifacts(config, artifact_keys, log_callback)
             
-            # 执行编译
-            return self._run_compilation(script_path, msys2_bash_path, 
-                                       progress_callback, log_callback)
+            if success:
+                success = self._post_build(config, log_callback, tracer)
+            
+            return success
             
         except Exception as e:
             if log_callback:
                 log_callback(f"❌ 编译失败: {e}", 'error')
             return False
+        finally:
+            self._write_trace(tracer, log_callback)
+            self._record_history(history_config, config, tracer, success, log_callback)
+    
+    def finish_external_build(self, config: BuildConfig, success: bool,
+                              log_callback: Optional[Callable] = None,
+                              tracer: Optional[BuildTracer] = None,
+                              executor: str = 'remote') -> bool:
+        """结束在本机以外编译（如远程编译节点）、已安装到 ffmpeg-android-<arch>/ 的编译:
+        成功时生成体积报告并按配置打包；无论成败都写入耗时记录和编译历史（执行方式记为 executor）"""
+        tracer = tracer or BuildTracer()
+        self.cache_stats = {}
+        self.size_report = None
+        build_config = replace(config, buildOptions=replace(config.buildOptions, executor=executor))
+        try:
+            if success:
+                success = self._post_build(config, log_callback, tracer)
+            return success
+        except Exception as e:
+            if log_callback:
+                log_callback(f"❌ 编译失败: {e}", 'error')
+            success = False
+            return False
+        finally:
+            self._write_trace(tracer, log_callback)
+            self._record_history(config, build_config, tracer, success, log_callback)
+    
+    def _resolve_components(self, config: BuildConfig,
+                            log_callback: Optional[Callable] = None) -> BuildConfig:
+        """按 FFmpeg configure 的依赖表解析组件，返回使用最小组件集的配置"""
+        resolver = ComponentResolver(self.env_manager.ffmpeg_dir)
+        if not resolver.is_available():
+            if log_callback:
+                log_callback("⚠️ 未找到FFmpeg源码中的组件列表，跳过组件依赖解析", 'warning')
+            return config
+        
+        resolution = resolver.resolve(config)
+        if log_callback:
+            log_callback("🧩 组件依赖解析:", 'info')
+            for line in resolution.summary_lines():
+                log_callback(line, 'warning' if line.startswith('⚠️') else 'info')
+        return resolution.apply(config)
+    
+    def get_compiler_cache(self, config: BuildConfig) -> CompilerCache:
+        """获取配置对应的编译缓存"""
+        cache_dir = Path(config.buildOptions.ccacheDir)
+        if not cache_dir.is_absolute():
+            cache_dir = self.work_dir / cache_dir
+        return CompilerCache(cache_dir, config.buildOptions.ccacheMaxSize)
+    
+    def get_artifact_cache(self, config: BuildConfig) -> ArtifactCache:
+        """获取配置对应的产物缓存"""
+        cache_dir = Path(config.buildOptions.artifactCacheDir)
+        if not cache_dir.is_absolute():
+            cache_dir = self.work_dir / cache_dir
+        return ArtifactCache(cache_dir, config.buildOptions.artifactCacheMaxSize)
+    
+    def _restore_artifacts(self, config: BuildConfig, bash_path: str,
+                           log_callback: Optional[Callable] = None) -> Optional[Dict[str, str]]:
+        """从产物缓存恢复命中的架构，返回未命中架构的缓存键；无法使用缓存时返回None"""
+        revision = self.env_manager.get_ffmpeg_revision()
+        if not revision:
+            if log_callback:
+                log_callback("⚠️ 无法确定FFmpeg源码版本，本次不使用产物缓存", 'warning')
+            return None
+        
+        cache = self.get_artifact_cache(config)
+        config_data = self.config_manager._config_to_dict(config)
+        prober = BuildOrchestrator(self.work_dir, bash_path)
+        pending_keys = {}
+        
+        for arch in config.architectures:
+            key = cache.compute_key(config_data, arch, self.env_manager.ndk_version, revision,
+                                    prober.probe_host(config, arch))
+            prefix = self.work_dir / f"ffmpeg-android-{arch}"
+            
+            if cache.restore(key, prefix):
+                if log_callback:
+                    log_callback(f"♻️ {arch} 命中产物缓存 ({key[:12]})，跳过编译", 'success')
+                continue
+            
+            # 由缓存恢复的安装目录与缓存共享硬链接，重新安装前先删除
+            if prefix.exists() and ArtifactCache.is_restored(prefix):
+                shutil.rmtree(prefix)
+            
+            if log_callback:
+                log_callback(f"🔨 {arch} 未命中产物缓存，需要编译", 'info')
+            pending_keys[arch] = key
+        
+        return pending_keys
+    
+    def _store_artifacts(self, config: BuildConfig, artifact_keys: Dict[str, str],
+                         log_callback: Optional[Callable] = None):
+        """保存新编译的架构到产物缓存"""
+        cache = self.get_artifact_cache(config)
+        
+        for arch, key in artifact_keys.items():
+            prefix = self.work_dir / f"ffmpeg-android-{arch}"
+            meta = {
+                'arch': arch,
+                'ndk': self.env_manager.ndk_version,
+                'ffmpeg': self.env_manager.get_ffmpeg_revision()
+            }
+            try:
+                if cache.store(key, prefix, meta) and log_callback:
+                    log_callback(f"💾 {arch} 已保存到产物缓存 ({key[:12]})", 'info')
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"⚠️ 保存 {arch} 到产物缓存失败: {e}", 'warning')
+        
+        evicted = cache.cleanup()
+        if evicted and log_callback:
+            log_callback(f"🧹 产物缓存超出上限 {config.buildOptions.artifactCacheMaxSize} MB，"
+                         f"淘汰了 {evicted} 个最久未使用的条目", 'info')
+    
+    def _create_progress_tracker(self, config: BuildConfig) -> ProgressTracker:
+        """创建进度跟踪器，载入同一配置上一次编译各架构的目标数和耗时"""
+        config_data = self.config_manager._config_to_dict(config)
+        records = ProgressHistory(self.state_dir).load()
+        history = {}
+        for arch in config.architectures:
+            record = records.get(history_key(config_data, arch))
+            if record:
+                history[arch] = record
+        build_opts = config.buildOptions
+        parallel = build_opts.executor == 'orchestrator' or build_opts.parallel
+        return ProgressTracker(config.architectures, parallel, history)
+    
+    def _save_progress_history(self, config: BuildConfig):
+        """记录本次编译完成的架构，供下一次估计进度"""
+        if not self.progress:
+            return
+        config_data = self.config_manager._config_to_dict(config)
+        entries = {history_key(config_data, arch): entry
+                   for arch, entry in self.progress.history_entries().items()}
+        try:
+            ProgressHistory(self.state_dir).update(entries)
+        except OSError:
+            pass
+    
+    def _record_history(self, config: BuildConfig, build_config: BuildConfig, tracer: BuildTracer,
+                        success: bool, log_callback: Optional[Callable] = None):
+        """写入编译历史，提示与同一配置以往编译相比的耗时回归
+
+        config 为调用方传入的配置（用于配置哈希和匹配预设），build_config 为组件解析后实际编译的配置
+        """
+        digest = config_hash(self.config_manager._config_to_dict(config))
+        stages = [{
+            'arch': span.arch,
+            'stage': span.name,
+            'duration': round(span.duration, 3),
+            'cpuTime': None if span.cpuTime is None else round(span.cpuTime, 3),
+            'status': span.status
+        } for span in tracer.spans]
+        
+        cache = dict(self.cache_stats)
+        built_archs = {span.arch for span in tracer.spans if span.name == 'make'}
+        if built_archs:
+            # 未执行 configure 的架构为配置缓存命中或配置未变化
+            configured = {span.arch for span in tracer.spans if span.name == 'configure'}
+            cache['configure'] = {'run': len(built_archs & configured),
+                                  'skipped': len(built_archs - configured)}
+        if build_config.buildOptions.ccache and built_archs:
+            compiler_cache = self.get_compiler_cache(build_config)
+            cache['ccache'] = {arch: compiler_cache.get_stats(arch) for arch in sorted(built_archs)}
+        
+        sizes = None
+        if self.size_report:
+            sizes = {arch: {'total': arch_report['totalSize'],
+                            'libs': {name: lib['size'] for name, lib in arch_report['libs'].items()}}
+                     for arch, arch_report in self.size_report['archs'].items()}
+        
+        build = {
+            'startTime': tracer.origin,
+            'endTime': time.time(),
+            'configHash': digest,
+            'preset': self._match_preset(digest),
+            'archs': config.architectures,
+            'executor': build_config.buildOptions.executor,
+            'mode': build_mode(build_config.buildOptions, cache),
+            'success': success,
+            'ndk': self.env_manager.ndk_version,
+            'ffmpeg': self.env_manager.get_ffmpeg_revision(),
+            'cache': cache,
+            'sizes': sizes
+        }
+        try:
+            record = self.history.record(build, stages)
+        except (sqlite3.Error, OSError) as e:
+            if log_callback:
+                log_callback(f"⚠️ 写入编译历史失败: {e}", 'warning')
+            return
+        
+        if log_callback:
+            log_callback(f"🗃️ 编译历史 #{record['id']} (配置 {digest[:12]})", 'info')
+            for regression in record['regressions']:
+                log_callback(f"🐢 耗时回归: {BuildHistory.format_regression(regression)}", 'warning')
+    
+    def _match_preset(self, digest: str) -> Optional[str]:
+        """配置哈希与某个预设相同时返回预设名"""
+        for name, preset in self.config_manager.load_presets().items():
+            try:
+                preset_config = self.config_manager._dict_to_config(dict(preset['config']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if config_hash(self.config_manager._config_to_dict(preset_config)) == digest:
+                return name
+        return None
+    
+    def _progress_info(self, info: dict, force: bool = True) -> Optional[dict]:
+        """在进度信息中加入总进度、剩余时间和各架构进度；force 为 False 时按间隔限流"""
+        if not self.progress:
+            return info
+        snapshot = self.progress.report(force)
+        if snapshot is None:
+            return None
+        info.update(snapshot)
+        return info
+    
+    def _building_info(self, arch: str) -> Optional[dict]:
+        """编译目标计数后的进度信息，按间隔限流"""
+        state = self.progress.archs[arch]
+        total = f"{'~' if state.estimated else ''}{state.total}" if state.total else '?'
+        return self._progress_info({
+            'stage': 'building',
+            'arch': arch,
+            'message': f'{arch}: 编译中 {state.done}/{total}'
+        }, force=False)
+    
+    def _handle_objects_marker(self, line: str, log_callback: Optional[Callable] = None) -> bool:
+        """处理目标数标记行，返回是否为标记行"""
+        marker = self.progress.handle_marker(line) if self.progress else None
+        if not marker:
+            return False
+        arch, total = marker
+        if log_callback:
+            log_callback(f"📐 [{arch}] 本次需要编译 {total} 个目标", 'info')
+        return True
+    
+    def cancel(self, arch: Optional[str] = None) -> bool:
+        """取消编排器中正在编译的架构，未指定架构时取消全部"""
+        orchestrator = self.orchestrator
+        if not orchestrator:
+            return False
+        if arch:
+            return orchestrator.cancel_arch(arch)
+        return orchestrator.cancel_all()
+    
+    def get_build_states(self) -> Dict[str, dict]:
+        """获取编排器中各架构的构建状态"""
+        if not self.orchestrator:
+            return {}
+        return self.orchestrator.get_states()
+    
+    def _write_trace(self, tracer: BuildTracer, log_callback: Optional[Callable] = None):
+        """写入 Chrome trace 格式的耗时记录"""
+        tracer.finish()
+        try:
+            trace_path = tracer.write(self.build_dir)
+            if log_callback:
+                log_callback(f"⏱️ 耗时记录: {trace_path} (可在 chrome://tracing 或 ui.perfetto.dev 中打开)", 'info')
+        except OSError as e:
+            if log_callback:
+                log_callback(f"⚠️ 写入耗时记录失败: {e}", 'warning')
+    
+    def _post_build(self, config: BuildConfig, log_callback: Optional[Callable],
+                    tracer: BuildTracer) -> bool:
+        """编译成功后：分析库体积，按配置打包"""
+        with tracer.span('size_report'):
+            self._write_size_report(config, log_callback)
+        
+        if not config.buildOptions.package:
+            return True
+        with tracer.span('package'):
+            return self._package(config, log_callback)
+    
+    def _package(self, config: BuildConfig, log_callback: Optional[Callable] = None) -> bool:
+        """strip 各架构的库并打包为 jniLibs/AAR 归档"""
+        build_opts = config.buildOptions
+        output_dir = Path(build_opts.packageDir)
+        if not output_dir.is_absolute():
+            output_dir = self.work_dir / output_dir
+        
+        if log_callback:
+            log_callback(f"📦 打包 {build_opts.package}...", 'info')
+        packager = Packager(self.work_dir, output_dir, jobs=build_opts.jobs)
+        try:
+            packager.package(config.architectures, build_opts.package,
+                             shared=config.outputType == 'shared', api=config.api,
+                             log_callback=log_callback)
+        except (PackageError, OSError) as e:
+            if log_callback:
+                log_callback(f"❌ 打包失败: {e}", 'error')
+            return False
+        return True
+    
+    def _write_size_report(self, config: BuildConfig, log_callback: Optional[Callable] = None):
+        """分析各架构的库，按段和组件统计体积，写入 build/size-report.json"""
+        components = [name for attr in COMPONENT_TYPES for name in getattr(config, attr)]
+        reporter = SizeReporter(self.work_dir)
+        try:
+            report = reporter.generate(config.architectures, components)
+            report_path = reporter.write(report, self.build_dir)
+        except OSError as e:
+            if log_callback:
+                log_callback(f"⚠️ 生成体积报告失败: {e}", 'warning')
+            return
+        self.size_report = report
+        
+        if log_callback:
+            log_callback("📦 产物体积:", 'info')
+            for line in reporter.summary_lines(report):
+                log_callback(line, 'info')
+            log_callback(f"📊 体积报告: {report_path}", 'info')
+    
+    def _handle_asm_marker(self, line: str, log_callback: Optional[Callable] = None) -> bool:
+        """处理汇编检测标记行 (::asm:: <架构> <yes|no> <说明>)；不是标记行时返回False"""
+        index = line.find(ScriptGenerator.ASM_MARKER)
+        if index < 0:
+            return False
+        
+        fields = line[index + len(ScriptGenerator.ASM_MARKER):].split(maxsplit=2)
+        if len(fields) < 2:
+            return False
+        arch, enabled = fields[0], fields[1] == 'yes'
+        detail = fields[2] if len(fields) > 2 else ''
+        self.asm_support[arch] = (enabled, detail)
+        
+        if log_callback:
+            simd = ArchitectureConfig.CONFIGS.get(arch, {}).get('simd', 'SIMD')
+            if enabled:
+                log_callback(f"🧮 {arch}: 启用 {simd} 汇编 ({detail})", 'info')
+            else:
+                log_callback(f"⚠️ {arch}: 未启用 {simd} 汇编 ({detail})", 'warning')
+        return True
+    
+    def _show_asm_summary(self, log_callback: Optional[Callable] = None):
+        """显示各架构的 SIMD 汇编启用情况"""
+        if not log_callback or not self.asm_support:
+            return
+        log_callback("SIMD 汇编:", 'info')
+        for arch, (enabled, detail) in sorted(self.asm_support.items()):
+            simd = ArchitectureConfig.CONFIGS.get(arch, {}).get('simd', 'SIMD')
+            if enabled:
+                log_callback(f"  ✅ {arch}: {simd} ({detail})", 'info')
+            else:
+                log_callback(f"  ❌ {arch}: 未启用 ({detail})", 'warning')
+    
+    def _show_trace_summary(self, tracer: Optional[BuildTracer], log_callback: Optional[Callable] = None):
+        """显示各架构各阶段的耗时汇总（墙钟秒/CPU秒）"""
+        if not tracer or not log_callback:
+            return
+        lines = tracer.summary_lines()
+        if not lines:
+            return
+        log_callback("构建耗时 (墙钟秒/CPU秒):", 'info')
+        for line in lines:
+            log_callback(line, 'info')
+    
+    def _run_orchestrator(self, config: BuildConfig, bash_path: str,
+                          progress_callback: Optional[Callable] = None,
+                          log_callback: Optional[Callable] = None,
+                          tracer: Optional[BuildTracer] = None) -> bool:
+        """通过编排器执行编译"""
+        def on_output(arch: str, step: str, line: str):
+            clean_line = clean_output_line(line)
+            if self._handle_asm_marker(clean_line, log_callback):
+                return
+            if OBJECTS_MARKER in clean_line and self._handle_objects_marker(clean_line, log_callback):
+                return
+            if clean_line and log_callback:
+                log_callback(f"[{arch}] {clean_line}", self._determine_log_level(clean_line))
+            if self.progress and self.progress.handle_line(clean_line, arch) and progress_callback:
+                progress_info = self._building_info(arch)
+                if progress_info:
+                    progress_callback(progress_info)
+        
+        def on_state(state: ArchState, step: Optional[StepState]):
+            if step is None:
+                if state.status == StepStatus.SUCCESS and self.progress:
+                    self.progress.finish(state.arch)
+                    if progress_callback:
+                        progress_callback(self._progress_info({
+                            'stage': 'building',
+                            'arch': state.arch,
+                            'message': f'{state.arch}: 编译完成'
+                        }))
+                if not log_callback:
+                    return
+                if state.status == StepStatus.SUCCESS:
+                    log_callback(f"✅ {state.arch} 编译成功", 'success')
+                elif state.status == StepStatus.CANCELLED:
+                    log_callback(f"⏹️ {state.arch} 已取消", 'warning')
+                elif state.status == StepStatus.FAILED:
+                    log_callback(f"❌ {state.arch} 编译失败: {state.error}", 'error')
+                return
+            
+            if self.progress:
+                if step.status == StepStatus.RUNNING:
+                    self.progress.begin(state.arch, step.name, step.startTime)
+                elif step.status == StepStatus.SUCCESS:
+                    self.progress.end(state.arch, step.name, step.endTime)
+            
+            if step.status == StepStatus.RUNNING:
+                if log_callback:
+                    log_callback(f"▶️ [{state.arch}] {step.name}", 'info')
+                if progress_callback and step.name in self.STAGE_PROGRESS:
+                    stage, message = self.STAGE_PROGRESS[step.name]
+                    progress_callback(self._progress_info({
+                        'stage': stage,
+                        'arch': state.arch,
+                        'message': f'{state.arch}: {message}'
+                    }))
+            elif step.status == StepStatus.SUCCESS and log_callback:
+                log_callback(f"✔️ [{state.arch}] {step.name} 完成 ({step.duration:.1f}s)", 'info')
+            elif step.status == StepStatus.SKIPPED and step.name == 'configure' and log_callback:
+                reason = '配置缓存命中' if step.cached else '配置未变化'
+                log_callback(f"⏭️ [{state.arch}] 跳过 configure ({reason})", 'info')
+        
+        if log_callback:
+            log_callback("🚀 开始编译 (Python 编排器)...", 'info')
+        
+        self.orchestrator = BuildOrchestrator(self.work_dir, bash_path,
+                                              output_callback=on_output,
+                                              state_callback=on_state)
+        success = self.orchestrator.run(config)
+        
+        # 步骤状态中已有起止时间和 CPU 时间，直接转为耗时记录
+        if tracer:
+            for state in self.orchestrator.states.values():
+                for step in state.steps.values():
+                    if step.startTime is None or step.endTime is None or step.status == StepStatus.SKIPPED:
+                        continue
+                    tracer.add(state.arch, step.name, step.startTime, step.endTime,
+                               step.cpuTime, status=step.status)
+        
+        if success:
+            if log_callback:
+                log_callback("✅ 编译成功完成！", 'success')
+            self._show_compilation_results(log_callback, tracer)
+        elif log_callback:
+            failed = [arch for arch, state in self.orchestrator.states.items()
+                      if state.status != StepStatus.SUCCESS]
+            log_callback(f"❌ 编译失败，未完成的架构: {', '.join(failed)}", 'error')
+            self._show_trace_summary(tracer, log_callback)
+        return success
     
     def _run_compilation(self, script_path: Path, msys2_bash_path: str,
                         progress_callback: Optional[Callable] = None,
-                        log_callback: Optional[Callable] = None) -> bool:
+                        log_callback: Optional[Callable] = None,
+                        tracer: Optional[BuildTracer] = None,
+                        log_batch_callback: Optional[Callable] = None) -> bool:
         """运行编译脚本"""
         try:
             if log_callback:
                 log_callback("🚀 开始编译...", 'info')
             
             # 构建命令
-            script_name = script_path.name
-            cmd = f'"{msys2_bash_path}" -lc "cd \'{self.work_dir}\' && chmod +x build/{script_name} && ./build/{script_name}"'
-            
-            # 启动进程
-            process = create_safe_popen(cmd, shell=True, cwd=self.work_dir)
-            
-            # 实时读取输出
-            while True:
-                output = safe_readline(process)
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    clean_line = clean_output_line(output)
-                    if clean_line and log_callback:
-                        # 根据内容判断日志级别
-                        level = self._determine_log_level(clean_line)
-                        log_callback(clean_line, level)
-                        
-                        # 更新进度
-                        if progress_callback:
-                            progress_info = self._parse_progress(clean_line)
-                            if progress_info:
-                                progress_callback(progress_info)
+            try:
+                script_rel = script_path.relative_to(self.work_dir).as_posix()
+            except ValueError:
+                script_rel = script_path.as_posix()
+            
+            # 以字节方式读取输出，由读取线程按块解码
+            binary = {'text': False, 'encoding': None, 'errors': None, 'bufsize': 0}
+            if sys.platform.startswith('win'):
+                # MSYS2 需要登录shell初始化PATH
+                cmd = f'"{msys2_bash_path}" -lc "cd \'{self.work_dir}\' && bash \'{script_rel}\'"'
+                process = create_safe_popen(cmd, shell=True, cwd=self.work_dir, **binary)
+            else:
+                # 系统bash直接执行脚本，无需登录shell
+                process = create_safe_popen([msys2_bash_path, script_rel], cwd=self.work_dir, **binary)
             
-            return_code = process.poll()
+            # 读取线程持续排空管道，这里按批处理积压的输出行
+            reader = LogReader(process.stdout).start()
+            for batch in reader.batches():
+                self._handle_output_batch(batch, progress_callback, log_callback,
+                                          log_batch_callback, tracer)
+            
+            return_code = process.wait()
+            if reader.error and log_callback:
+                log_callback(f"⚠️ 读取编译输出出错: {reader.error}", 'warning')
             
             if return_code == 0:
                 if log_callback:
                     log_callback("✅ 编译成功完成！", 'success')
-                self._show_compilation_results(log_callback)
+                self._show_compilation_results(log_callback, tracer)
                 return True
             else:
                 if log_callback:
                     log_callback(f"❌ 编译失败，退出码: {return_code}", 'error')
+                self._show_trace_summary(tracer, log_callback)
                 return False
                 
         except Exception as e:
@@ -87,31 +648,95 @@ class CompilerManager:
                 log_callback(f"❌ 执行编译时出错: {e}", 'error')
             return False
     
+    def _handle_output_batch(self, batch: List, progress_callback: Optional[Callable],
+                             log_callback: Optional[Callable], log_batch_callback: Optional[Callable],
+                             tracer: Optional[BuildTracer]):
+        """处理一批编译输出：标记行更新状态，其余行按批写入日志"""
+        entries: List[Tuple[str, str]] = []
+        
+        def flush():
+            if not entries:
+                return
+            if log_batch_callback:
+                log_batch_callback(list(entries))
+            elif log_callback:
+                for message, level in entries:
+                    log_callback(message, level)
+            entries.clear()
+        
+        for line in batch:
+            text = line.text
+            if '::' in text:
+                # 标记行会单独输出日志，先写出之前的行以保持顺序
+                if ScriptGenerator.ASM_MARKER in text:
+                    flush()
+                    if self._handle_asm_marker(text, log_callback):
+                        continue
+                
+                if OBJECTS_MARKER in text:
+                    flush()
+                    if self._handle_objects_marker(text, log_callback):
+                        continue
+                
+                # 阶段计时标记只用于耗时记录和进度，不写入日志
+                marker = tracer.handle_marker(text) if tracer and STAGE_MARKER in text else None
+                if marker:
+                    event, arch, stage = marker
+                    if self.progress:
+                        if event == 'begin':
+                            self.progress.begin(arch, stage)
+                        else:
+                            self.progress.end(arch, stage)
+                    if event == 'begin' and progress_callback and stage in self.STAGE_PROGRESS:
+                        flush()
+                        progress_stage, message = self.STAGE_PROGRESS[stage]
+                        progress_callback(self._progress_info({
+                            'stage': progress_stage,
+                            'arch': arch,
+                            'message': f'{arch}: {message}'
+                        }))
+                    continue
+            
+            entries.append((text, line.level))
+            
+            # 按编译目标行更新进度
+            if self.progress and '\t' in text:
+                arch = self.progress.handle_line(text)
+                if arch and progress_callback:
+                    progress_info = self._building_info(arch)
+                    if progress_info:
+                        flush()
+                        progress_callback(progress_info)
+                    continue
+            
+            # 更新进度
+            if progress_callback:
+                progress_info = self._parse_progress(text)
+                if progress_info:
+                    flush()
+                    progress_callback(self._progress_info(progress_info))
+        
+        flush()
+    
     def _determine_log_level(self, line: str) -> str:
         """确定日志级别"""
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in ['error', 'failed', 'fatal']):
-            return 'error'
-        elif any(keyword in line_lower for keyword in ['warning', 'warn']):
-            return 'warning'
-        elif any(keyword in line_lower for keyword in ['success', 'completed', 'done']):
-            return 'success'
-        else:
-            return 'info'
+        return determine_log_level(line)
     
     def _parse_progress(self, line: str) -> Optional[dict]:
         """解析进度信息"""
-        line_lower = line.lower()
-        
         # 检测架构编译开始
-        for i, arch in enumerate(['arm64-v8a', 'armeabi-v7a', 'x86', 'x86_64']):
-            if f'开始编译架构: {arch}' in line:
+        if '开始编译架构' in line:
+            match = _ARCH_START_PATTERN.search(line)
+            if match:
+                arch = match.group(1)
                 return {
                     'stage': 'compiling',
                     'arch': arch,
                     'message': f'正在编译架构: {arch}'
                 }
         
+        line_lower = line.lower()
+        
         # 检测编译阶段
         if 'configure' in line_lower and 'ffmpeg' in line_lower:
             return {
@@ -136,7 +761,8 @@ class CompilerManager:
         
         return None
     
-    def _show_compilation_results(self, log_callback: Optional[Callable] = None):
+    def _show_compilation_results(self, log_callback: Optional[Callable] = None,
+                                  tracer: Optional[BuildTracer] = None):
         """显示编译结果"""
         if not log_callback:
             return
@@ -172,4 +798,8 @@ class CompilerManager:
         log_callback("使用说明:", 'info')
         log_callback("1. 将 lib/ 目录中的 .so 文件复制到 Android 项目的 src/main/jniLibs/对应架构目录", 'info')
         log_callback("2. 将 include/ 目录中的头文件复制到 Android 项目的 src/main/cpp/include/", 'info')
-        log_callback("3. 在 CMakeLists.txt 中配置链接这些库", 'info')
\ No newline at end of file
+        log_callback("3. 在 CMakeLists.txt 中配置链接这些库", 'info')
+        log_callback("提示: 设置打包格式 (命令行 --package zip|aar|tar.zst) 可自动 strip 并打包为 jniLibs/AAR", 'info')
+        
+        self._show_asm_summary(log_callback)
+        self._show_trace_summary(tracer, log_callback)
\ No newline at end of file
@@ -0,0 +1,364 @@
+"""
+组件依赖解析模块
+
+读取 FFmpeg 源码中的组件列表 (allcodecs.c、allformats.c 等) 和 configure 中的
+依赖表 (<组件>_deps / _deps_any / _select)，在编译前计算启用组件的最小闭包:
+    - 自动添加依赖的组件 (选择的 parser、bsf、protocol 等) 和解码器对应的 parser
+    - 找出 FFmpeg 中不存在的组件、依赖无法满足 (configure 会静默禁用) 的组件
+    - 找出已被其他组件自动选择、无需单独启用的组件
+"""
+
+import fnmatch
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import BuildConfig, PRUNABLE_LIBRARIES
+
+# 配置字段 -> configure 组件类型
+COMPONENT_TYPES = {
+    'decoders': 'decoder',
+    'encoders': 'encoder',
+    'muxers': 'muxer',
+    'demuxers': 'demuxer',
+    'parsers': 'parser',
+    'bsfs': 'bsf',
+    'protocols': 'protocol',
+    'filters': 'filter'
+}
+
+# 组件类型 -> (源码文件, 匹配 extern 声明的正则)，与 configure 中 find_things_extern 一致
+COMPONENT_SOURCES = {
+    'decoder': ('libavcodec/allcodecs.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_decoder;'),
+    'encoder': ('libavcodec/allcodecs.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_encoder;'),
+    'parser': ('libavcodec/parsers.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_parser;'),
+    'bsf': ('libavcodec/bitstream_filters.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_bsf;'),
+    'muxer': ('libavformat/allformats.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_muxer;'),
+    'demuxer': ('libavformat/allformats.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_demuxer;'),
+    'protocol': ('libavformat/protocols.c', r'^[^#\n]*extern[^\n]*\bff_(\w+)_protocol;'),
+    'filter': ('libavfilter/allfilters.c', r'^extern const AVFilter ff_[avfsinkrc]{2,5}_(\w+);')
+}
+
+# 常用的非 FFmpeg 组件名
+COMPONENT_ALIASES = {
+    'decoder': {'h265': 'hevc'},
+    'encoder': {'h265': 'hevc'},
+    'demuxer': {'mp4': 'mov', 'm4a': 'mov', '3gp': 'mov'},
+    'protocol': {'srt': 'libsrt'}
+}
+
+# 解码器对应的 parser（同名的不需要列出）
+DECODER_PARSERS = {
+    'mp1': 'mpegaudio', 'mp1float': 'mpegaudio',
+    'mp2': 'mpegaudio', 'mp2float': 'mpegaudio',
+    'mp3': 'mpegaudio', 'mp3float': 'mpegaudio',
+    'mpeg1video': 'mpegvideo', 'mpeg2video': 'mpegvideo',
+    'mpeg4': 'mpeg4video',
+    'eac3': 'ac3',
+    'aac_fixed': 'aac'
+}
+
+# libavfilter 始终编译的滤镜（allfilters.c 中特意不按 configure 的格式声明）
+ALWAYS_BUILT = {
+    'filter': {'buffer', 'abuffer', 'buffersink', 'abuffersink'}
+}
+
+# configure 中以下列表里的外部库、硬件加速和许可证默认不启用
+UNAVAILABLE_LISTS = re.compile(r'^(EXTERNAL_\w+|HWACCEL_\w+|LICENSE)_LIST$')
+
+# 自动检测且 NDK sysroot 中存在的外部库
+ASSUMED_AVAILABLE = {'zlib'}
+
+# 需要 libswscale 的滤镜（configure 中 <滤镜>_filter_deps 含 swscale）
+SWSCALE_FILTERS = {'scale', 'scale2ref', 'zoompan', 'sab', 'smartblur', 'showcqt'}
+
+# 需要 libpostproc 的滤镜
+POSTPROC_FILTERS = {'pp'}
+
+# 需要网络支持的协议（configure 中直接或经由 tcp/udp/http 选择 network）
+NETWORK_PROTOCOLS = {
+    'tcp', 'udp', 'udplite', 'sctp', 'unix', 'http', 'https', 'httpproxy', 'tls',
+    'rtmp', 'rtmps', 'rtmpe', 'rtmpt', 'rtmpte', 'rtmpts', 'rtp', 'srtp', 'prompeg',
+    'ftp', 'gopher', 'gophers', 'icecast', 'mmsh', 'mmst', 'ipfs_gateway', 'ipns_gateway',
+    'srt', 'libsrt', 'librist', 'libssh', 'sftp', 'libzmq', 'librtmp', 'librtmps',
+    'librtmpe', 'librtmpt', 'librtmpte'
+}
+
+# 需要网络支持的封装格式 (rtsp/sap/sdp 经由 rtpdec 选择 rtp/udp 协议)
+NETWORK_FORMATS = {
+    'demuxer': {'rtsp', 'sap', 'sdp', 'rtp'},
+    'muxer': {'rtsp', 'sap'}
+}
+
+_TABLE_PATTERN = re.compile(r'^(\w+?)_(deps_any|deps|select)="([^"]*)"', re.MULTILINE)
+_LIST_PATTERN = re.compile(r'^([A-Z0-9_]+_LIST)="([^"]*)"', re.MULTILINE)
+
+
+@dataclass
+class ComponentResolution:
+    """组件解析结果，各列表中的组件以 (类型, 名称) 表示"""
+    components: Dict[str, List[str]] = field(default_factory=dict)  # 配置字段 -> 最终启用的组件
+    aliased: List[Tuple[str, str, str]] = field(default_factory=list)  # (类型, 原名称, FFmpeg 名称)
+    added: List[Tuple[str, str, str]] = field(default_factory=list)  # (类型, 名称, 原因)
+    unknown: List[Tuple[str, str]] = field(default_factory=list)  # FFmpeg 中不存在
+    unsatisfied: List[Tuple[str, str, str]] = field(default_factory=list)  # (类型, 名称, 缺少的依赖)
+    redundant: List[Tuple[str, str, str]] = field(default_factory=list)  # (类型, 名称, 原因)
+
+    def apply(self, config: BuildConfig) -> BuildConfig:
+        """返回使用解析结果中组件列表的配置副本"""
+        return replace(config, **self.components)
+
+    def summary_lines(self) -> List[str]:
+        """解析结果摘要"""
+        lines = []
+        for comp_type, name, target in self.aliased:
+            lines.append(f"↪️ {comp_type} {name} → {target}")
+        for comp_type, name, reason in self.added:
+            lines.append(f"➕ 自动添加 {comp_type} {name} ({reason})")
+        for comp_type, name in self.unknown:
+            lines.append(f"⚠️ FFmpeg 中不存在 {comp_type} {name}，已忽略")
+        for comp_type, name, missing in self.unsatisfied:
+            lines.append(f"⚠️ {comp_type} {name} 依赖不满足 (缺少 {missing})，configure 会将其禁用，已移除")
+        for comp_type, name, reason in self.redundant:
+            lines.append(f"ℹ️ 无需单独启用 {comp_type} {name} ({reason})")
+
+        lines.append("最终启用的组件:")
+        for attr, comp_type in COMPONENT_TYPES.items():
+            names = self.components.get(attr)
+            if names:
+                lines.append(f"  {comp_type} ({len(names)}): {', '.join(names)}")
+        return lines
+
+
+class ComponentResolver:
+    """FFmpeg 组件依赖解析器"""
+
+    def __init__(self, ffmpeg_dir: Path):
+        self.ffmpeg_dir = Path(ffmpeg_dir)
+        self.available: Dict[str, Set[str]] = {}  # 组件类型 -> 源码中存在的组件
+        self.deps: Dict[str, List[str]] = {}
+        self.deps_any: Dict[str, List[str]] = {}
+        self.select: Dict[str, List[str]] = {}
+        self.unavailable: Set[str] = set()
+        self._loaded = False
+
+    def is_available(self) -> bool:
+        """FFmpeg 源码中是否有 configure 和组件列表"""
+        return ((self.ffmpeg_dir / "configure").exists()
+                and (self.ffmpeg_dir / "libavcodec" / "allcodecs.c").exists())
+
+    def load(self):
+        """读取组件列表和 configure 依赖表"""
+        if self._loaded:
+            return
+
+        for comp_type, (source, pattern) in COMPONENT_SOURCES.items():
+            path = self.ffmpeg_dir / source
+            text = path.read_text(encoding='utf-8', errors='replace') if path.exists() else ''
+            self.available[comp_type] = set(re.findall(pattern, text, re.MULTILINE))
+
+        configure = (self.ffmpeg_dir / "configure").read_text(encoding='utf-8', errors='replace')
+        tables = {'deps': self.deps, 'deps_any': self.deps_any, 'select': self.select}
+        for name, kind, value in _TABLE_PATTERN.findall(configure):
+            # 含变量展开的值无法静态解析
+            tables[kind][name] = [token for token in value.split() if '$' not in token]
+
+        lists = {name: value for name, value in _LIST_PATTERN.findall(configure)}
+        for name, value in lists.items():
+            if UNAVAILABLE_LISTS.match(name):
+                self.unavailable.update(self._expand_list(value, lists))
+        self.unavailable -= ASSUMED_AVAILABLE
+
+        self._loaded = True
+
+    def resolve(self, config: BuildConfig) -> ComponentResolution:
+        """计算配置中组件的最小闭包"""
+        self.load()
+        result = ComponentResolution()
+
+        # 用户请求的组件
+        requested: List[str] = []
+        for attr, comp_type in COMPONENT_TYPES.items():
+            for name in getattr(config, attr):
+                for resolved in self._match(comp_type, name, result):
+                    node = f"{resolved}_{comp_type}"
+                    if node not in requested:
+                        requested.append(node)
+
+        # 沿 _select 和组件间的 _deps 展开
+        closure, _ = self._expand(requested)
+
+        # 移除依赖不满足的节点，直到不再变化（与 configure 中 check_deps 的规则一致）
+        enabled = set(closure)
+        missing_deps: Dict[str, List[str]] = {}
+        changed = True
+        while changed:
+            changed = False
+            for node in sorted(enabled):
+                missing = self._missing(node, enabled, closure)
+                if missing:
+                    enabled.discard(node)
+                    missing_deps[node] = missing
+                    changed = True
+
+        # 只保留仍由可用组件需要的节点
+        enabled, reasons = self._expand([node for node in requested if node in enabled], enabled)
+
+        for node in requested:
+            comp_type, name = self._split(node)
+            if node in missing_deps:
+                result.unsatisfied.append((comp_type, name, self._describe_missing(node, missing_deps)))
+            elif node in reasons:
+                result.redundant.append((comp_type, name, reasons[node]))
+
+        type_order = list(COMPONENT_TYPES.values())
+        added = [parsed for parsed in map(self._split, enabled - set(requested)) if parsed]
+        for comp_type, name in sorted(added, key=lambda item: (type_order.index(item[0]), item[1])):
+            result.added.append((comp_type, name, reasons[f"{name}_{comp_type}"]))
+
+        enabled_components = [parsed for parsed in map(self._split, enabled) if parsed]
+        for attr, comp_type in COMPONENT_TYPES.items():
+            result.components[attr] = sorted(name for t, name in enabled_components if t == comp_type)
+        return result
+
+    def _match(self, comp_type: str, name: str, result: ComponentResolution) -> List[str]:
+        """将用户输入的组件名 (可含通配符) 转换为 FFmpeg 组件名"""
+        available = self.available[comp_type]
+        if any(ch in name for ch in '*?['):
+            matches = sorted(fnmatch.filter(available, name))
+            if not matches:
+                result.unknown.append((comp_type, name))
+            return matches
+
+        if name in ALWAYS_BUILT.get(comp_type, ()):
+            result.redundant.append((comp_type, name, '始终编译'))
+            return []
+
+        if name not in available:
+            alias = COMPONENT_ALIASES.get(comp_type, {}).get(name)
+            if alias and alias in available:
+                result.aliased.append((comp_type, name, alias))
+                return [alias]
+            result.unknown.append((comp_type, name))
+            return []
+        return [name]
+
+    def _expand(self, roots: List[str],
+                allowed: Optional[Set[str]] = None) -> Tuple[Set[str], Dict[str, str]]:
+        """从 roots 展开依赖闭包，返回 (闭包, 每个新增节点的来源)；allowed 限制可加入的节点"""
+        reasons: Dict[str, str] = {}
+        closure: Set[str] = set()
+        pending = list(roots)
+        while pending:
+            node = pending.pop(0)
+            if node in closure:
+                continue
+            closure.add(node)
+
+            deps = self.select.get(node, []) + self.deps.get(node, [])
+            parsed = self._split(node)
+            if parsed and parsed[0] == 'decoder':
+                parser = DECODER_PARSERS.get(parsed[1], parsed[1])
+                if parser in self.available['parser']:
+                    deps = [f"{parser}_parser"] + deps
+
+            for dep in deps:
+                if dep in self.unavailable or (allowed is not None and dep not in allowed):
+                    continue
+                if self._split(dep) is None and dep not in self.select:
+                    # 库、系统特性等不需要展开
+                    continue
+                if dep not in reasons:
+                    # 经由内部子系统选择的组件，原因记为最初选择它的组件
+                    reasons[dep] = (f"{parsed[0]} {parsed[1]} 需要" if parsed
+                                    else reasons.get(node, f"{node} 需要"))
+                pending.append(dep)
+        return closure, reasons
+
+    def _missing(self, node: str, enabled: Set[str], closure: Set[str]) -> List[str]:
+        """node 缺少的依赖"""
+        missing = [dep for dep in self.deps.get(node, []) + self.select.get(node, [])
+                   if not self._satisfied(dep, enabled, closure, set())]
+        any_deps = self.deps_any.get(node)
+        if any_deps and not any(self._satisfied(dep, enabled, closure, set()) for dep in any_deps):
+            missing.append('/'.join(any_deps))
+        return missing
+
+    def _describe_missing(self, node: str, missing_deps: Dict[str, List[str]]) -> str:
+        """缺少的依赖说明，被移除的依赖组件附上其自身缺少的依赖"""
+        parts = []
+        for dep in missing_deps[node]:
+            if dep in missing_deps and dep != node:
+                parts.append(f"{dep}: {', '.join(missing_deps[dep])}")
+            else:
+                parts.append(dep)
+        return '; '.join(parts)
+
+    def _satisfied(self, token: str, enabled: Set[str], closure: Set[str], seen: Set[str]) -> bool:
+        """依赖项是否可用"""
+        if token in self.unavailable:
+            return False
+        if token in enabled:
+            return True
+        if token in closure or self._split(token):
+            return False
+        if token in seen:
+            return True
+        # 库和内部子系统，按其自身依赖判断
+        seen.add(token)
+        if not all(self._satisfied(dep, enabled, closure, seen) for dep in self.deps.get(token, [])):
+            return False
+        any_deps = self.deps_any.get(token)
+        return not any_deps or any(self._satisfied(dep, enabled, closure, seen) for dep in any_deps)
+
+    def _split(self, node: str) -> Optional[Tuple[str, str]]:
+        """'h264_decoder' -> ('decoder', 'h264')；不是组件时返回None"""
+        for comp_type, names in self.available.items():
+            suffix = f"_{comp_type}"
+            if node.endswith(suffix) and node[:-len(suffix)] in names:
+                return comp_type, node[:-len(suffix)]
+        return None
+
+    @staticmethod
+    def _expand_list(value: str, lists: Dict[str, str], depth: int = 0) -> Set[str]:
+        """展开 configure 列表中引用的其他列表 ($XXX_LIST)"""
+        items = set()
+        for token in value.split():
+            if token.startswith('$'):
+                ref = token.lstrip('$').strip('{}')
+                if ref in lists and depth < 10:
+                    items.update(ComponentResolver._expand_list(lists[ref], lists, depth + 1))
+            else:
+                items.add(token)
+        return items
+
+
+def required_libraries(config: BuildConfig) -> Dict[str, str]:
+    """可裁剪的库中配置需要的库 -> 原因"""
+    required = {}
+    filters = set(config.filters)
+    if filters:
+        required['avfilter'] = f"filter {sorted(filters)[0]}"
+    for name in sorted(filters & SWSCALE_FILTERS):
+        required.setdefault('swscale', f"filter {name}")
+    for name in sorted(filters & POSTPROC_FILTERS):
+        required.setdefault('postproc', f"filter {name}")
+
+    network = [('protocol', name) for name in config.protocols if name in NETWORK_PROTOCOLS]
+    network += [('demuxer', name) for name in config.demuxers if name in NETWORK_FORMATS['demuxer']]
+    network += [('muxer', name) for name in config.muxers if name in NETWORK_FORMATS['muxer']]
+    if network:
+        required['network'] = f"{network[0][0]} {network[0][1]}"
+
+    for library in config.optimizations.keepLibraries:
+        required.setdefault(library, '配置中保留')
+    return required
+
+
+def pruned_libraries(config: BuildConfig) -> List[str]:
+    """不需要编译的库，按 PRUNABLE_LIBRARIES 的顺序"""
+    if not config.optimizations.pruneLibraries:
+        return []
+    required = required_libraries(config)
+    return [library for library in PRUNABLE_LIBRARIES if library not in required]
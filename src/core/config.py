@@ -2,21 +2,93 @@
 配置管理模块
 """
 
+import copy
 import json
+import re
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field
+
+
+# 优化档位，OptimizationConfig 中未显式设置 (None) 的 optLevel/lto/gcSections 取档位中的值
+OPTIMIZATION_PROFILES = {
+    'size': {'optLevel': 'Oz', 'lto': 'thin', 'gcSections': True},
+    'balanced': {'optLevel': 'O2', 'lto': 'thin', 'gcSections': True},
+    'speed': {'optLevel': 'O3', 'lto': 'thin', 'gcSections': False}
+}
+
+# 可按组件裁剪的库 (configure 的 --disable-<库>)。libavcodec/libavformat/libavutil/libswresample
+# 始终保留，应用代码通常直接调用它们解码、解封装和重采样音频
+PRUNABLE_LIBRARIES = ('avdevice', 'avfilter', 'postproc', 'swscale', 'network')
+
+# 目录选项中不允许的字符：控制字符、引号、反引号和 $（目录会写入构建脚本）
+UNSAFE_PATH_CHARS = re.compile(r'[\x00-\x1f\x7f"\'`$]')
+
+# extraCflags/extraLdflags 中的每个选项须以 - 开头，只能包含这些字符（选项会传给 configure）
+EXTRA_FLAG_PATTERN = re.compile(r'^-[A-Za-z0-9_=+,.:/@%-]*$')
+
+# 组件名：字母、数字、下划线和 -（别名，如 libvpx-vp9），可使用通配符 *
+COMPONENT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_*-]+$')
+
+# 组件列表字段
+COMPONENT_FIELDS = ('decoders', 'encoders', 'muxers', 'demuxers', 'protocols', 'filters', 'parsers', 'bsfs')
+
+# buildOptions 中的目录选项
+PATH_OPTIONS = ('ccacheDir', 'artifactCacheDir', 'configureCacheDir', 'packageDir')
+
+# 预设文件缓存: 路径 -> ((修改时间, 大小), 预设)，各 ConfigManager 共享，文件变化后重新读取
+_presets_cache: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_presets_lock = threading.Lock()
 
 
 @dataclass
 class OptimizationConfig:
     """优化配置"""
-    disableAsm: bool = True
+    disableAsm: bool = False  # 为 False 时按架构检测汇编器，可用时启用 NEON/SSE 等 SIMD 汇编
     enablePic: bool = True
     disableDebug: bool = True
     disableDoc: bool = True
     disablePrograms: bool = True
     enableSmall: bool = False
+    profile: str = ""  # 优化档位: size / balanced / speed，为空时使用 FFmpeg 默认的编译选项
+    optLevel: Optional[str] = None  # 优化级别 (O2/O3/Oz 等)，通过 --optflags 传给 configure
+    lto: Optional[str] = None  # 链接时优化: thin / full，空字符串表示关闭
+    gcSections: Optional[bool] = None  # -ffunction-sections -fdata-sections 并在链接时移除未引用的段
+    extraCflags: str = ""  # 追加到 --extra-cflags 的编译选项
+    extraLdflags: str = ""  # 追加到 --extra-ldflags 的链接选项
+    pruneLibraries: bool = True  # 按组件禁用不需要的库 (avdevice/avfilter/postproc/swscale/network)
+    keepLibraries: List[str] = field(default_factory=list)  # 裁剪时仍保留的库，如应用直接调用的 swscale
+    
+    def resolve_profile(self) -> Dict[str, Any]:
+        """合并档位默认值和显式设置，返回实际使用的 optLevel/lto/gcSections"""
+        resolved = {'optLevel': '', 'lto': '', 'gcSections': False}
+        resolved.update(OPTIMIZATION_PROFILES.get(self.profile, {}))
+        for key in resolved:
+            value = getattr(self, key)
+            if value is not None:
+                resolved[key] = value
+        return resolved
+
+
+@dataclass
+class BuildOptions:
+    """构建过程选项（除 resolveComponents 外不影响编译产物）"""
+    parallel: bool = False  # 各架构在独立的 build-<arch>/ 目录中并行编译
+    jobs: int = 0  # 所有架构共享的并行任务数，0 表示使用 nproc
+    incremental: bool = False  # configure 参数未变化时跳过 distclean/configure，只执行 make
+    ccache: bool = False  # 通过内置编译缓存调用 CC/CXX
+    ccacheDir: str = "build/ccache"  # 编译缓存目录，相对路径基于工作目录
+    ccacheMaxSize: int = 5120  # 编译缓存容量上限 (MB)，超出后按 LRU 淘汰
+    artifactCache: bool = False  # 复用相同配置已编译的安装目录，命中的架构跳过编译
+    artifactCacheDir: str = "build/artifacts"  # 产物缓存目录，相对路径基于工作目录
+    artifactCacheMaxSize: int = 10240  # 产物缓存容量上限 (MB)，超出后按 LRU 淘汰
+    configureCache: bool = False  # 按配置指纹缓存 configure 输出，命中时跳过 configure
+    configureCacheDir: str = "build/configure-cache"  # 配置缓存目录，相对路径基于工作目录
+    executor: str = "script"  # script: 生成并运行 build_ffmpeg.sh；orchestrator: Python 直接调度各步骤
+    resolveComponents: bool = True  # 编译前按 FFmpeg configure 的依赖表解析组件，使用最小组件集编译
+    package: str = ""  # 编译后打包: zip (jniLibs + include) / aar / tar.zst，为空时不打包
+    packageDir: str = "build/dist"  # 打包输出目录，相对路径基于工作目录
 
 
 @dataclass
@@ -31,7 +103,10 @@ class BuildConfig:
     demuxers: list = None
     protocols: list = None
     filters: list = None
+    parsers: list = None
+    bsfs: list = None
     optimizations: OptimizationConfig = None
+    buildOptions: BuildOptions = None
     
     def __post_init__(self):
         if self.architectures is None:
@@ -48,8 +123,14 @@ class BuildConfig:
             self.protocols = ["file", "http", "https"]
         if self.filters is None:
             self.filters = []
+        if self.parsers is None:
+            self.parsers = []
+        if self.bsfs is None:
+            self.bsfs = []
         if self.optimizations is None:
             self.optimizations = OptimizationConfig()
+        if self.buildOptions is None:
+            self.buildOptions = BuildOptions()
 
 
 class ConfigManager:
@@ -57,6 +138,10 @@ class ConfigManager:
     
     SUPPORTED_ARCHITECTURES = ["arm64-v8a", "armeabi-v7a", "x86", "x86_64"]
     SUPPORTED_OUTPUT_TYPES = ["shared", "static"]
+    SUPPORTED_EXECUTORS = ["script", "orchestrator"]
+    SUPPORTED_PACKAGE_FORMATS = ["", "zip", "aar", "tar.zst"]
+    SUPPORTED_OPT_LEVELS = ["", "O0", "O1", "O2", "O3", "Os", "Oz"]
+    SUPPORTED_LTO_MODES = ["", "thin", "full"]
     
     def __init__(self, work_dir: Path):
         self.work_dir = Path(work_dir)
@@ -98,13 +183,35 @@ class ConfigManager:
         return BuildConfig()
     
     def load_presets(self) -> Dict[str, Any]:
-        """加载预设配置"""
+        """加载预设配置
+
+        解析结果缓存在内存中，只在文件的修改时间或大小变化时重新读取；返回的字典为共享的缓存，不要修改。
+        """
+        stamp = self.presets_stamp()
+        if stamp is None:
+            return {}
+        with _presets_lock:
+            cached = _presets_cache.get(self.presets_file)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        
         try:
             with open(self.presets_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return data.get('presets', {})
+                presets = data.get('presets', {})
         except Exception:
             return {}
+        with _presets_lock:
+            _presets_cache[self.presets_file] = (stamp, presets)
+        return presets
+    
+    def presets_stamp(self) -> Optional[Tuple[int, int]]:
+        """预设文件的 (修改时间 ns, 大小)，文件不存在时为None"""
+        try:
+            stat = self.presets_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
     
     def load_preset_config(self, preset_name: str) -> Optional[BuildConfig]:
         """加载预设配置"""
@@ -113,7 +220,8 @@ class ConfigManager:
         if preset_name not in presets:
             return None
         
-        preset_data = presets[preset_name]['config']
+        # 配置对象会引用其中的列表，复制一份以免修改缓存
+        preset_data = copy.deepcopy(presets[preset_name]['config'])
         return self._dict_to_config(preset_data)
     
     def validate_config(self, config: BuildConfig) -> bool:
@@ -128,9 +236,69 @@ class ConfigManager:
             raise ValueError(f"不支持的输出类型: {config.outputType}")
         
         # 验证API级别
+        if not isinstance(config.api, int) or isinstance(config.api, bool):
+            raise ValueError(f"API级别必须是整数: {config.api!r}")
         if config.api < 16:
             raise ValueError(f"API级别必须大于等于16: {config.api}")
         
+        # 验证优化档位
+        opt = config.optimizations
+        if opt.profile and opt.profile not in OPTIMIZATION_PROFILES:
+            raise ValueError(f"不支持的优化档位: {opt.profile}")
+        
+        profile = opt.resolve_profile()
+        if profile['optLevel'] not in self.SUPPORTED_OPT_LEVELS:
+            raise ValueError(f"不支持的优化级别: {profile['optLevel']}")
+        if profile['lto'] not in self.SUPPORTED_LTO_MODES:
+            raise ValueError(f"不支持的链接时优化方式: {profile['lto']}")
+        
+        # 验证额外的编译/链接选项
+        for name in ('extraCflags', 'extraLdflags'):
+            value = getattr(opt, name)
+            if not isinstance(value, str) or re.search(r'[^\S ]', value):
+                raise ValueError(f"无效的 {name}: {value!r} (选项之间只能用空格分隔)")
+            for flag in value.split(' '):
+                if flag and not EXTRA_FLAG_PATTERN.match(flag):
+                    raise ValueError(f"不支持的 {name} 选项: {flag!r} "
+                                     f"(须以 - 开头，不能包含引号、$、反引号、反斜杠等字符)")
+        
+        # 验证组件名
+        for name in COMPONENT_FIELDS:
+            for component in getattr(config, name):
+                if not isinstance(component, str) or not COMPONENT_NAME_PATTERN.match(component):
+                    raise ValueError(f"无效的组件名 ({name}): {component!r}")
+        
+        # 验证保留的库
+        for library in opt.keepLibraries:
+            if library not in PRUNABLE_LIBRARIES:
+                raise ValueError(f"不支持保留的库: {library} (可选: {', '.join(PRUNABLE_LIBRARIES)})")
+        
+        # 验证并行任务数
+        if config.buildOptions.jobs < 0:
+            raise ValueError(f"并行任务数不能为负数: {config.buildOptions.jobs}")
+        
+        # 验证执行方式
+        if config.buildOptions.executor not in self.SUPPORTED_EXECUTORS:
+            raise ValueError(f"不支持的执行方式: {config.buildOptions.executor}")
+        
+        # 验证打包格式
+        if config.buildOptions.package not in self.SUPPORTED_PACKAGE_FORMATS:
+            raise ValueError(f"不支持的打包格式: {config.buildOptions.package}")
+        if config.buildOptions.package == 'aar' and config.outputType != 'shared':
+            raise ValueError("AAR 只能包含动态库，静态库请使用 zip 或 tar.zst 打包")
+        
+        # 验证目录
+        for name in PATH_OPTIONS:
+            value = getattr(config.buildOptions, name)
+            if not isinstance(value, str) or not value or UNSAFE_PATH_CHARS.search(value):
+                raise ValueError(f"无效的目录 {name}: {value!r} (不能为空，不能包含引号、$、反引号或控制字符)")
+        
+        # 验证编译缓存容量
+        if config.buildOptions.ccache and config.buildOptions.ccacheMaxSize <= 0:
+            raise ValueError(f"编译缓存容量必须大于0: {config.buildOptions.ccacheMaxSize}")
+        if config.buildOptions.artifactCache and config.buildOptions.artifactCacheMaxSize <= 0:
+            raise ValueError(f"产物缓存容量必须大于0: {config.buildOptions.artifactCacheMaxSize}")
+        
         return True
     
     def _config_to_dict(self, config: BuildConfig) -> Dict[str, Any]:
@@ -157,7 +325,34 @@ class ConfigManager:
             'disableDebug': 'disableDebug',
             'disableDoc': 'disableDoc',
             'disablePrograms': 'disablePrograms',
-            'enableSmall': 'enableSmall'
+            'enableSmall': 'enableSmall',
+            'profile': 'profile',
+            'optLevel': 'optLevel',
+            'lto': 'lto',
+            'gcSections': 'gcSections',
+            'extraCflags': 'extraCflags',
+            'extraLdflags': 'extraLdflags',
+            'pruneLibraries': 'pruneLibraries',
+            'keepLibraries': 'keepLibraries'
+        }
+        
+        # 构建选项字段名映射（保持驼峰命名）
+        build_opt_field_mapping = {
+            'parallel': 'parallel',
+            'jobs': 'jobs',
+            'incremental': 'incremental',
+            'ccache': 'ccache',
+            'ccacheDir': 'ccacheDir',
+            'ccacheMaxSize': 'ccacheMaxSize',
+            'artifactCache': 'artifactCache',
+            'artifactCacheDir': 'artifactCacheDir',
+            'artifactCacheMaxSize': 'artifactCacheMaxSize',
+            'configureCache': 'configureCache',
+            'configureCacheDir': 'configureCacheDir',
+            'executor': 'executor',
+            'resolveComponents': 'resolveComponents',
+            'package': 'package',
+            'packageDir': 'packageDir'
         }
         
         # 转换主配置字段名
@@ -180,6 +375,19 @@ class ConfigManager:
         
         config_data['optimizations'] = optimizations
         
+        # 处理构建选项
+        build_opt_data = config_data.get('buildOptions', {})
+        if isinstance(build_opt_data, dict):
+            converted_build_opt_data = {}
+            for key, value in build_opt_data.items():
+                new_key = build_opt_field_mapping.get(key, key)
+                converted_build_opt_data[new_key] = value
+            build_options = BuildOptions(**converted_build_opt_data)
+        else:
+            build_options = BuildOptions()
+        
+        config_data['buildOptions'] = build_options
+        
         # 移除不支持的字段（preset字段仅用于前端显示）
         unsupported_fields = ['preset']
         for field in unsupported_fields:
@@ -200,4 +408,30 @@ class ConfigManager:
         print(f"解复用器: {', '.join(config.demuxers)}")
         print(f"协议: {', '.join(config.protocols)}")
         print(f"滤镜: {', '.join(config.filters)}")
+        opt = config.optimizations
+        profile = opt.resolve_profile()
+        if profile['optLevel'] or profile['lto'] or profile['gcSections']:
+            print(f"优化档位: {opt.profile or '自定义'} (优化级别: {profile['optLevel'] or '默认'}, "
+                  f"LTO: {profile['lto'] or '关闭'}, 移除未引用段: {'是' if profile['gcSections'] else '否'})")
+        if config.parsers:
+            print(f"解析器: {', '.join(config.parsers)}")
+        if config.bsfs:
+            print(f"比特流滤镜: {', '.join(config.bsfs)}")
+        if config.buildOptions.parallel:
+            jobs = config.buildOptions.jobs or 'nproc'
+            print(f"构建模式: 多架构并行 (共享任务数: {jobs})")
+        if config.buildOptions.incremental:
+            print("增量编译: 配置未变化时跳过 configure")
+        if config.buildOptions.ccache:
+            print(f"编译缓存: {config.buildOptions.ccacheDir} (上限 {config.buildOptions.ccacheMaxSize} MB)")
+        if config.buildOptions.artifactCache:
+            print(f"产物缓存: {config.buildOptions.artifactCacheDir}")
+        if config.buildOptions.configureCache:
+            print(f"配置缓存: {config.buildOptions.configureCacheDir}")
+        if config.buildOptions.executor == 'orchestrator':
+            print("执行方式: Python 编排器")
+        if not config.buildOptions.resolveComponents:
+            print("组件依赖解析: 关闭")
+        if config.buildOptions.package:
+            print(f"打包: {config.buildOptions.package} → {config.buildOptions.packageDir}")
         print("=" * 30)
\ No newline at end of file
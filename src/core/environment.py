@@ -4,6 +4,7 @@
 
 import os
 import sys
+import stat
 import shutil
 import urllib.request
 import zipfile
@@ -12,6 +13,22 @@ from typing import Optional, List
 from .utils import run_command_safe, create_safe_popen
 
 
+# 支持的主机平台 -> NDK 下载包的平台后缀
+SUPPORTED_HOSTS = {
+    'windows': 'windows',
+    'linux': 'linux'
+}
+
+
+def get_host_os() -> str:
+    """获取主机平台名称"""
+    if sys.platform.startswith('win'):
+        return 'windows'
+    if sys.platform.startswith('linux'):
+        return 'linux'
+    return sys.platform
+
+
 class EnvironmentManager:
     """环境管理器"""
     
@@ -20,18 +37,25 @@ class EnvironmentManager:
         self.ffmpeg_dir = self.work_dir / "ffmpeg"
         self.ndk_dir = self.work_dir / "android-ndk"
         self.msys2_dir = self.work_dir / "msys64"
+        self.host_os = get_host_os()
         
         # NDK配置
         self.ndk_version = "r27d"
-        self.ndk_url = f"https://googledownloads.cn/android/repository/android-ndk-{self.ndk_version}-windows.zip"
+        ndk_host = SUPPORTED_HOSTS.get(self.host_os, 'windows')
+        self.ndk_filename = f"android-ndk-{self.ndk_version}-{ndk_host}.zip"
+        self.ndk_url = f"https://googledownloads.cn/android/repository/{self.ndk_filename}"
         
         # MSYS2配置
         self.msys2_url = "https://github.com/msys2/msys2-installer/releases/latest/download/msys2-base-x86_64-latest.sfx.exe"
     
+    def is_windows(self) -> bool:
+        """是否为Windows主机（需要MSYS2）"""
+        return self.host_os == 'windows'
+    
     def check_platform(self) -> bool:
         """检查平台支持"""
-        if not sys.platform.startswith('win'):
-            raise RuntimeError(f"仅支持Windows平台，当前平台: {sys.platform}")
+        if self.host_os not in SUPPORTED_HOSTS:
+            raise RuntimeError(f"仅支持Windows和Linux平台，当前平台: {sys.platform}")
         return True
     
     def check_git(self) -> bool:
@@ -44,14 +68,21 @@ class EnvironmentManager:
         except FileNotFoundError:
             pass
         
-        print("Git未安装，请先安装Git for Windows")
-        print("下载地址: https://git-scm.windows.com/")
+        if self.is_windows():
+            print("Git未安装，请先安装Git for Windows")
+            print("下载地址: https://git-scm.windows.com/")
+        else:
+            print("Git未安装，请使用系统包管理器安装git")
         return False
     
     def setup_msys2(self) -> bool:
         """设置MSYS2环境"""
         print("=== 设置MSYS2环境 ===")
         
+        if not self.is_windows():
+            print("非Windows平台，使用系统bash，无需MSYS2")
+            return True
+        
         if self.msys2_dir.exists():
             print("MSYS2目录已存在")
             return True
@@ -83,6 +114,9 @@ class EnvironmentManager:
         """安装MSYS2包"""
         print("=== 安装MSYS2构建工具 ===")
         
+        if not self.is_windows():
+            return self._check_host_tools()
+        
         msys2_bash = self._find_msys2_bash()
         if not msys2_bash:
             print("找不到MSYS2 bash")
@@ -140,8 +174,7 @@ class EnvironmentManager:
         print("=== 设置Android NDK ===")
         
         self.check_platform()
-        ndk_filename = f"android-ndk-{self.ndk_version}-windows.zip"
-        ndk_path = self.work_dir / ndk_filename
+        ndk_path = self.work_dir / self.ndk_filename
         
         if self.ndk_dir.exists():
             print("Android NDK目录已存在")
@@ -157,8 +190,7 @@ class EnvironmentManager:
         # 解压NDK
         print("正在解压Android NDK...")
         try:
-            with zipfile.ZipFile(ndk_path, 'r') as zip_ref:
-                zip_ref.extractall(self.work_dir)
+            self._extract_zip(ndk_path, self.work_dir)
             
             # 重命名解压后的目录
             extracted_dir = self.work_dir / f"android-ndk-{self.ndk_version}"
@@ -173,8 +205,27 @@ class EnvironmentManager:
             print(f"解压失败: {e}")
             return False
     
+    def get_ffmpeg_revision(self) -> Optional[str]:
+        """获取FFmpeg源码版本（git提交，或发布包的RELEASE版本号）"""
+        if (self.ffmpeg_dir / ".git").exists():
+            try:
+                result = run_command_safe(['git', 'rev-parse', 'HEAD'], cwd=self.ffmpeg_dir)
+                if result.returncode == 0 and result.stdout.strip():
+                    return result.stdout.strip()
+            except FileNotFoundError:
+                pass
+        
+        release_file = self.ffmpeg_dir / "RELEASE"
+        if release_file.exists():
+            release = release_file.read_text(encoding='utf-8', errors='replace').strip()
+            if release:
+                return f"release-{release}"
+        return None
+    
     def get_msys2_bash_path(self) -> Optional[str]:
-        """获取MSYS2 bash路径"""
+        """获取执行构建脚本的bash路径（Windows下为MSYS2 bash，其他平台为系统bash）"""
+        if not self.is_windows():
+            return shutil.which('bash')
         return self._find_msys2_bash()
     
     def _find_msys2_bash(self) -> Optional[str]:
@@ -189,6 +240,42 @@ class EnvironmentManager:
                 return str(path)
         return None
     
+    def _check_host_tools(self) -> bool:
+        """检查非Windows主机上的构建工具"""
+        tools = ['bash', 'make', 'gcc', 'pkg-config', 'tar', 'sha256sum']
+        missing = [tool for tool in tools if not shutil.which(tool)]
+        if missing:
+            print(f"缺少构建工具: {', '.join(missing)}，请使用系统包管理器安装")
+            return False
+        
+        if not (shutil.which('nasm') or shutil.which('yasm')):
+            print("未找到 nasm/yasm，x86/x86_64 架构将不启用汇编优化")
+        
+        print("系统构建工具检查完成")
+        return True
+    
+    def _extract_zip(self, zip_path: Path, target_dir: Path) -> None:
+        """解压zip，保留Unix权限位和符号链接（zipfile.extractall会丢失它们）"""
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            if self.is_windows():
+                zip_ref.extractall(target_dir)
+                return
+            
+            for info in zip_ref.infolist():
+                mode = info.external_attr >> 16
+                if not stat.S_ISLNK(mode):
+                    extracted = zip_ref.extract(info, target_dir)
+                    if mode and not info.is_dir():
+                        os.chmod(extracted, stat.S_IMODE(mode))
+                    continue
+                
+                # 符号链接以链接目标作为文件内容保存
+                link_path = Path(target_dir) / info.filename
+                link_path.parent.mkdir(parents=True, exist_ok=True)
+                if link_path.is_symlink() or link_path.exists():
+                    link_path.unlink()
+                os.symlink(zip_ref.read(info).decode('utf-8'), link_path)
+    
     def _run_pacman_command(self, msys2_bash: str, command: str) -> bool:
         """运行pacman命令"""
         cmd = f'"{msys2_bash}" -lc "{command}"'
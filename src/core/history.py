@@ -0,0 +1,246 @@
+"""
+编译历史模块
+
+每次编译结束后写入 build/history.db (SQLite):
+    builds  每次编译: 配置哈希、匹配的预设、架构、执行方式、编译模式、结果、总耗时、NDK/FFmpeg 版本、
+            缓存命中情况、各架构产物体积、检测到的耗时回归
+    stages  各架构各阶段的墙钟时间和 CPU 时间
+
+编译结束时与同一配置、同一编译模式 (build_mode) 最近 REGRESSION_WINDOW 次成功编译的中位数比较，
+总耗时或单个阶段明显变慢时记为耗时回归，用于发现 NDK 或 FFmpeg 升级后编译变慢。
+缓存命中的编译只与同样命中缓存的编译比较，首次（冷）编译不会因为之前的增量或缓存编译而被记为回归。
+"""
+
+import hashlib
+import json
+import sqlite3
+import statistics
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .artifacts import NON_ARTIFACT_FIELDS
+
+HISTORY_DB = "history.db"
+
+# 中位数取同一配置最近的成功编译次数
+REGRESSION_WINDOW = 10
+
+# 至少有这么多次历史记录才判断回归
+MIN_SAMPLES = 3
+
+# 超过中位数的比例，且至少慢 REGRESSION_MIN_SECONDS 秒（忽略短阶段的抖动）
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 10.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    startTime REAL NOT NULL,
+    endTime REAL NOT NULL,
+    duration REAL NOT NULL,
+    configHash TEXT NOT NULL,
+    preset TEXT,
+    archs TEXT NOT NULL,
+    executor TEXT,
+    mode TEXT,
+    success INTEGER NOT NULL,
+    ndk TEXT,
+    ffmpeg TEXT,
+    cache TEXT,
+    sizes TEXT,
+    regressions TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_config ON builds (configHash, id);
+CREATE INDEX IF NOT EXISTS builds_mode ON builds (configHash, mode, id);
+CREATE TABLE IF NOT EXISTS stages (
+    buildId INTEGER NOT NULL REFERENCES builds (id) ON DELETE CASCADE,
+    arch TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    duration REAL NOT NULL,
+    cpuTime REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS stages_build ON stages (buildId);
+'''
+
+# 以 JSON 保存的列
+JSON_COLUMNS = ('archs', 'cache', 'sizes', 'regressions')
+
+# 旧版本数据库中没有、打开时补充的列
+ADDED_COLUMNS = {'mode': 'TEXT'}
+
+
+def config_hash(config_data: Dict[str, Any]) -> str:
+    """配置哈希：与产物缓存相同，只取影响编译内容的配置"""
+    data = {k: v for k, v in config_data.items() if k not in NON_ARTIFACT_FIELDS}
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_mode(build_options: Any, cache: Dict[str, Any]) -> str:
+    """编译模式：执行方式、影响耗时的构建选项，以及本次是否命中了缓存 (warm/cold)
+
+    例如 "orchestrator/parallel+ccache/warm"，只有编译模式相同的编译之间才比较耗时。
+    """
+    options = [name for name, enabled in (
+        ('parallel', build_options.parallel),
+        ('incremental', build_options.incremental),
+        ('ccache', build_options.ccache),
+        ('configure-cache', build_options.configureCache),
+        ('artifact-cache', build_options.artifactCache)
+    ) if enabled]
+    warm = ((cache.get('artifact') or {}).get('hits', 0) > 0
+            or (cache.get('configure') or {}).get('skipped', 0) > 0
+            or any(stats.get('hits', 0) > 0 for stats in (cache.get('ccache') or {}).values()))
+    return f"{build_options.executor or 'script'}/{'+'.join(options) or 'default'}/{'warm' if warm else 'cold'}"
+
+
+class BuildHistory:
+    """编译历史数据库"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """每次操作使用独立连接，Web 服务的各线程可以同时读取"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        if not self._initialized:
+            with self._lock:
+                self._migrate(conn)
+                conn.executescript(SCHEMA)
+                self._initialized = True
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """为旧版本创建的 builds 表补充新增的列"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(builds)")}
+        if not columns:
+            return
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE builds ADD COLUMN {column} {column_type}")
+        conn.commit()
+
+    def record(self, build: Dict[str, Any], stages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """写入一次编译及其各阶段耗时，返回带 id 和 regressions 的记录
+
+        build 包含 startTime/endTime/configHash/preset/archs/executor/mode/success/ndk/ffmpeg/cache/sizes，
+        stages 的每项包含 arch/stage/duration/cpuTime/status。
+        """
+        build = dict(build)
+        build['duration'] = build['endTime'] - build['startTime']
+        conn = self._connect()
+        try:
+            with conn:
+                build['regressions'] = (self._detect_regressions(conn, build, stages)
+                                        if build['success'] else [])
+                columns = ('startTime', 'endTime', 'duration', 'configHash', 'preset', 'archs',
+                           'executor', 'mode', 'success', 'ndk', 'ffmpeg', 'cache', 'sizes', 'regressions')
+                values = [json.dumps(build.get(column), ensure_ascii=False) if column in JSON_COLUMNS
+                          else build.get(column) for column in columns]
+                cursor = conn.execute(
+                    f"INSERT INTO builds ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    values)
+                build['id'] = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO stages (buildId, arch, stage, duration, cpuTime, status) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(build['id'], stage['arch'], stage['stage'], stage['duration'],
+                      stage.get('cpuTime'), stage.get('status')) for stage in stages])
+        finally:
+            conn.close()
+        return build
+
+    def list_builds(self, limit: int = 20, config: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最近的编译记录（最新的在前），config 为配置哈希或其前缀"""
+        conn = self._connect()
+        try:
+            if config:
+                rows = conn.execute(
+                    "SELECT * FROM builds WHERE configHash LIKE ? ORDER BY id DESC LIMIT ?",
+                    (config + '%', limit)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM builds ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_build(self, build_id: int) -> Optional[Dict[str, Any]]:
+        """单次编译记录，包含各阶段耗时"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM builds WHERE id = ?", (build_id,)).fetchone()
+            if row is None:
+                return None
+            build = self._row_to_dict(row)
+            build['stages'] = [dict(stage) for stage in conn.execute(
+                "SELECT arch, stage, duration, cpuTime, status FROM stages WHERE buildId = ? ORDER BY rowid",
+                (build_id,))]
+        finally:
+            conn.close()
+        return build
+
+    def _detect_regressions(self, conn: sqlite3.Connection, build: Dict[str, Any],
+                            stages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """与同一配置、同一编译模式最近的成功编译比较总耗时和各阶段耗时"""
+        rows = conn.execute(
+            "SELECT id, duration FROM builds WHERE configHash = ? AND mode IS ? AND success = 1 "
+            "ORDER BY id DESC LIMIT ?",
+            (build['configHash'], build.get('mode'), REGRESSION_WINDOW)).fetchall()
+        if len(rows) < MIN_SAMPLES:
+            return []
+
+        regressions = []
+        regression = self._compare(build['duration'], [row['duration'] for row in rows])
+        if regression:
+            regressions.append(dict(regression, scope='build'))
+
+        previous = {}
+        ids = [row['id'] for row in rows]
+        for row in conn.execute(
+                f"SELECT arch, stage, duration FROM stages WHERE status = 'success' "
+                f"AND buildId IN ({', '.join('?' * len(ids))})", ids):
+            previous.setdefault((row['arch'], row['stage']), []).append(row['duration'])
+        for stage in stages:
+            if stage.get('status') != 'success':
+                continue
+            samples = previous.get((stage['arch'], stage['stage']), [])
+            if len(samples) < MIN_SAMPLES:
+                continue
+            regression = self._compare(stage['duration'], samples)
+            if regression:
+                regressions.append(dict(regression, scope='stage', arch=stage['arch'], stage=stage['stage']))
+        return regressions
+
+    @staticmethod
+    def _compare(duration: float, samples: List[float]) -> Optional[Dict[str, Any]]:
+        median = statistics.median(samples)
+        if duration <= median * REGRESSION_RATIO or duration - median < REGRESSION_MIN_SECONDS:
+            return None
+        return {
+            'duration': round(duration, 1),
+            'median': round(median, 1),
+            'samples': len(samples),
+            'ratio': round(duration / median, 2) if median else None
+        }
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        build = dict(row)
+        build['success'] = bool(build['success'])
+        for column in JSON_COLUMNS:
+            build[column] = json.loads(build[column]) if build[column] else None
+        return build
+
+    @staticmethod
+    def format_regression(regression: Dict[str, Any]) -> str:
+        """耗时回归的说明"""
+        target = '总耗时' if regression['scope'] == 'build' else f"[{regression['arch']}] {regression['stage']}"
+        return (f"{target} {regression['duration']:.1f}s，比同一配置和编译模式最近 {regression['samples']} 次的"
+                f"中位数 {regression['median']:.1f}s 慢 {regression['duration'] - regression['median']:.1f}s")
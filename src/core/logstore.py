@@ -0,0 +1,258 @@
+"""
+编译日志持久化模块
+
+每次编译的完整日志写入 logs/<编译ID>/:
+    seg-00000.jsonl.gz ...  每段 SEGMENT_LINES 行，gzip 压缩，每行为 [时间, 级别, 消息]
+    index.json              各段的起始行号、行数和各级别的行数，以及编译状态
+
+按行号分页或按级别过滤时，只根据索引定位并解压需要的段，不会把整个日志读入内存。
+正在写入的段保存在内存中，写满后压缩落盘。
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 每段的行数
+SEGMENT_LINES = 10000
+
+# 保留的编译日志数量，超出时删除最早的
+MAX_BUILDS = 50
+
+# 单次查询返回的最大行数
+MAX_LIMIT = 5000
+
+INDEX_FILE = "index.json"
+
+LOG_LEVELS = ('info', 'success', 'warning', 'error')
+
+
+def _build_order(build_id: str) -> Tuple[str, int]:
+    """编译ID的排序键：同一秒内的序号按数值比较（-10 排在 -2 之后）"""
+    # 编译ID为 YYYYmmdd-HHMMSS，同一秒内再次开始的编译加上 -2、-3 ...
+    timestamp, sep, suffix = build_id.rpartition('-')
+    if build_id.count('-') >= 2 and suffix.isdigit():
+        return (timestamp, int(suffix))
+    return (build_id, 1)
+
+
+class BuildLog:
+    """单次编译的日志"""
+
+    def __init__(self, log_dir: Path, segment_lines: int = SEGMENT_LINES):
+        self.log_dir = Path(log_dir)
+        self.build_id = self.log_dir.name
+        self.segment_lines = segment_lines
+        self.index: Dict[str, Any] = {
+            'build': self.build_id,
+            'startTime': time.time(),
+            'endTime': None,
+            'status': 'running',
+            'lines': 0,
+            'levels': {},
+            'segments': []
+        }
+        self._pending: List[list] = []  # 当前段中尚未落盘的行
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, log_dir: Path) -> 'BuildLog':
+        """打开已有的编译日志（只读）"""
+        log = cls(log_dir)
+        with open(log.log_dir / INDEX_FILE, 'r', encoding='utf-8') as f:
+            log.index = json.load(f)
+        return log
+
+    def append(self, entries: List[Tuple[str, str, str]]):
+        """追加 (时间, 级别, 消息)，写满一段时压缩落盘"""
+        with self._lock:
+            for timestamp, level, message in entries:
+                self._pending.append([timestamp, level, message])
+                if len(self._pending) >= self.segment_lines:
+                    self._flush_segment()
+            self.index['lines'] = self._written_lines() + len(self._pending)
+
+    def close(self, status: str):
+        """写出剩余的行，记录编译状态"""
+        with self._lock:
+            if self._pending:
+                self._flush_segment()
+            self.index['status'] = status
+            self.index['endTime'] = time.time()
+            self._write_index()
+
+    def read(self, offset: int = 0, limit: int = 500, level: Optional[str] = None) -> Dict[str, Any]:
+        """读取第 offset 行起的 limit 行；指定 level 时 offset 和 total 按该级别的行计算"""
+        limit = max(0, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        with self._lock:
+            segments = list(self.index['segments'])
+            pending = list(self._pending)
+            levels = dict(self.index['levels'])
+            written = self._written_lines()
+            for _, entry_level, _ in pending:
+                levels[entry_level] = levels.get(entry_level, 0) + 1
+            status = self.index['status']
+
+        # 内存中的段与已落盘的段统一处理
+        sources = [(segment, None) for segment in segments]
+        if pending:
+            pending_levels: Dict[str, int] = {}
+            for _, entry_level, _ in pending:
+                pending_levels[entry_level] = pending_levels.get(entry_level, 0) + 1
+            sources.append(({'firstLine': written, 'lines': len(pending), 'levels': pending_levels}, pending))
+
+        total = levels.get(level, 0) if level else written + len(pending)
+        lines = []
+        skip = offset
+        for segment, rows in sources:
+            if len(lines) >= limit:
+                break
+            count = segment['levels'].get(level, 0) if level else segment['lines']
+            if skip >= count:
+                skip -= count
+                continue
+            if rows is None:
+                rows = self._load_segment(segment['file'])
+            for number, row in enumerate(rows, segment['firstLine']):
+                if level and row[1] != level:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                lines.append({'line': number, 'timestamp': row[0], 'level': row[1], 'message': row[2]})
+                if len(lines) >= limit:
+                    break
+
+        return {
+            'build': self.build_id,
+            'status': status,
+            'total': total,
+            'offset': offset,
+            'lines': lines
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {key: value for key, value in self.index.items() if key != 'segments'}
+
+    def _written_lines(self) -> int:
+        segments = self.index['segments']
+        return segments[-1]['firstLine'] + segments[-1]['lines'] if segments else 0
+
+    def _flush_segment(self):
+        segment_no = len(self.index['segments'])
+        filename = f"seg-{segment_no:05d}.jsonl.gz"
+        levels: Dict[str, int] = {}
+        for _, level, _ in self._pending:
+            levels[level] = levels.get(level, 0) + 1
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.log_dir / (filename + ".tmp")
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in self._pending)
+        os.replace(temp_path, self.log_dir / filename)
+
+        self.index['segments'].append({
+            'file': filename,
+            'firstLine': self._written_lines(),
+            'lines': len(self._pending),
+            'levels': levels
+        })
+        for level, count in levels.items():
+            self.index['levels'][level] = self.index['levels'].get(level, 0) + count
+        self._pending = []
+        self._write_index()
+
+    def _write_index(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.log_dir / (INDEX_FILE + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(temp_path, self.log_dir / INDEX_FILE)
+
+    def _load_segment(self, filename: str) -> List[list]:
+        with gzip.open(self.log_dir / filename, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+
+class LogStore:
+    """编译日志目录 logs/"""
+
+    def __init__(self, logs_dir: Path, max_builds: int = MAX_BUILDS):
+        self.logs_dir = Path(logs_dir)
+        self.max_builds = max_builds
+        self.active: Dict[str, BuildLog] = {}  # 正在写入的编译日志（可同时有多个编译）
+        self._lock = threading.Lock()
+
+    def start_build(self) -> BuildLog:
+        """开始记录新的编译日志，并删除超出保留数量的旧日志"""
+        with self._lock:
+            self.logs_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = time.strftime('%Y%m%d-%H%M%S')
+            build_id = timestamp
+            # 同一秒内已有编译时接在最大序号之后（旧日志可能已被清理，不能复用空出的序号）
+            suffixes = [_build_order(path.name)[1] for path in self.logs_dir.glob(f'{timestamp}*')
+                        if _build_order(path.name)[0] == timestamp]
+            if suffixes:
+                build_id = f"{timestamp}-{max(suffixes) + 1}"
+
+            log = BuildLog(self.logs_dir / build_id)
+            log.log_dir.mkdir()
+            log._write_index()
+            self.active[build_id] = log
+            self._prune()
+        return log
+
+    def end_build(self, log: BuildLog, status: str):
+        """写出剩余的日志并记录编译状态"""
+        log.close(status)
+        with self._lock:
+            self.active.pop(log.build_id, None)
+
+    def get(self, build_id: Optional[str] = None) -> Optional[BuildLog]:
+        """按编译ID获取日志，为空或 latest 时返回最近一次编译"""
+        if not build_id or build_id == 'latest':
+            builds = self.list_build_ids()
+            if not builds:
+                return None
+            build_id = builds[-1]
+        active = self.active.get(build_id)
+        if active:
+            return active
+        # 编译ID只能是 logs/ 下的目录名
+        log_dir = self.logs_dir / build_id
+        if Path(build_id).name != build_id or not (log_dir / INDEX_FILE).exists():
+            return None
+        log = BuildLog.open(log_dir)
+        if log.index['status'] == 'running':
+            # 服务在编译过程中退出，未落盘的行已丢失
+            log.index['status'] = 'interrupted'
+        return log
+
+    def list_build_ids(self) -> List[str]:
+        """各次编译的ID，按开始顺序排列"""
+        if not self.logs_dir.exists():
+            return []
+        build_ids = [path.name for path in self.logs_dir.iterdir() if (path / INDEX_FILE).exists()]
+        return sorted(build_ids, key=_build_order)
+
+    def list_builds(self) -> List[Dict[str, Any]]:
+        """各次编译的摘要，最近的在前"""
+        builds = []
+        for build_id in reversed(self.list_build_ids()):
+            log = self.get(build_id)
+            if log:
+                builds.append(log.summary())
+        return builds
+
+    def _prune(self):
+        for build_id in self.list_build_ids()[:-self.max_builds]:
+            if build_id in self.active:
+                continue
+            shutil.rmtree(self.logs_dir / build_id, ignore_errors=True)
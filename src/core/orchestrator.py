@@ -0,0 +1,613 @@
+"""
+构建编排模块
+
+不生成 build_ffmpeg.sh，直接以 asyncio 子进程按架构执行
+distclean / configure / make / install 各步骤，并结构化记录每个步骤的状态。
+各架构并发执行，make 通过同一个 jobserver 共享任务数，可以单独取消某个架构。
+"""
+
+import asyncio
+import hashlib
+import os
+import signal
+import tarfile
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from string import Template
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import BuildConfig
+from .builder import ArchitectureConfig, ScriptGenerator
+from .ccache import CompilerCache
+from .environment import get_host_os
+from .progress import OBJECTS_MARKER, count_dry_run_objects
+from .trace import parse_times
+from .utils import run_command_safe
+
+# 每个架构依次执行的步骤
+STEP_NAMES = ('distclean', 'configure', 'make', 'install')
+
+# 输出各主机工具的版本（第一行），找不到时为 none
+TOOL_VERSIONS_SCRIPT = '''for tool in "$@"; do
+    version=$("$tool" --version 2>/dev/null | head -n 1)
+    echo "$tool: ${version:-none}"
+done'''
+
+# 子进程单行输出上限，超长的编译命令行也能完整读取
+STREAM_LIMIT = 1024 * 1024
+
+# 通过 bash 执行步骤命令，结束后用 times 记录子进程 CPU 时间
+TIMED_COMMAND = '"$@"; rc=$?; times > "$FFAB_TIMES_FILE"; exit $rc'
+
+# 不放入配置缓存的 configure 输出
+CONFIGURE_CACHE_EXCLUDES = ('ffbuild/config.log', '.configure-fingerprint')
+
+
+class StepStatus:
+    """步骤/架构状态"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    CANCELLED = 'cancelled'
+
+
+@dataclass
+class StepState:
+    """单个构建步骤的状态"""
+    name: str
+    status: str = StepStatus.PENDING
+    startTime: Optional[float] = None
+    endTime: Optional[float] = None
+    returnCode: Optional[int] = None
+    cpuTime: Optional[float] = None  # 步骤子进程的 CPU 时间（用户态 + 内核态，秒）
+    cached: bool = False  # configure 由配置缓存恢复
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.startTime is None or self.endTime is None:
+            return None
+        return self.endTime - self.startTime
+
+
+@dataclass
+class ArchState:
+    """单个架构的构建状态"""
+    arch: str
+    status: str = StepStatus.PENDING
+    currentStep: Optional[str] = None
+    error: Optional[str] = None
+    steps: Dict[str, StepState] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.steps:
+            self.steps = {name: StepState(name) for name in STEP_NAMES}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class StepFailed(Exception):
+    """构建步骤失败"""
+
+
+class MakeJobserver:
+    """GNU make jobserver（管道形式）
+
+    每个顶层 make 自带一个隐含任务槽，管道中再放入 jobs - clients 个令牌，
+    并发的各架构 make 合计最多运行 jobs 个任务（clients 不能超过 jobs，由调用方限制同时编译的架构数）。
+    """
+
+    def __init__(self, jobs: int, clients: int):
+        self.jobs = jobs
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_inheritable(self.read_fd, True)
+        os.set_inheritable(self.write_fd, True)
+        tokens = max(jobs - clients, 0)
+        if tokens:
+            os.write(self.write_fd, b'+' * tokens)
+
+    @property
+    def makeflags(self) -> str:
+        return f"-j{self.jobs} --jobserver-auth={self.read_fd},{self.write_fd}"
+
+    @property
+    def pass_fds(self) -> tuple:
+        return (self.read_fd, self.write_fd)
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class BuildOrchestrator:
+    """构建编排器"""
+
+    def __init__(self, work_dir: Path, bash_path: str,
+                 output_callback: Optional[Callable[[str, str, str], None]] = None,
+                 state_callback: Optional[Callable[[ArchState, StepState], None]] = None):
+        self.work_dir = Path(work_dir).resolve()
+        self.bash_path = bash_path
+        self.output_callback = output_callback
+        self.state_callback = state_callback
+
+        self.source_dir = self.work_dir / "ffmpeg"
+        self.host_os = get_host_os()
+        host_tag = 'windows-x86_64' if self.host_os == 'windows' else 'linux-x86_64'
+        self.toolchain = self.work_dir / "android-ndk" / "toolchains" / "llvm" / "prebuilt" / host_tag
+
+        # 复用脚本生成器的 configure 选项，两种执行方式的配置保持一致
+        self.generator = ScriptGenerator()
+
+        self.states: Dict[str, ArchState] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def run(self, config: BuildConfig) -> bool:
+        """执行编译（阻塞直到所有架构结束）"""
+        return asyncio.run(self.run_async(config))
+
+    async def run_async(self, config: BuildConfig) -> bool:
+        """并发编译所有架构，全部成功时返回True"""
+        build_opts = config.buildOptions
+        jobs = build_opts.jobs if build_opts.jobs > 0 else (os.cpu_count() or 1)
+
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self.states = {arch: ArchState(arch) for arch in config.architectures}
+
+        # 每个编译中的架构至少占用一个任务，同时编译的架构数不超过任务数
+        concurrency = max(min(len(config.architectures), jobs), 1)
+        slots = asyncio.Semaphore(concurrency)
+
+        # Windows 下 MSYS2 make 无法继承管道句柄，改为平分任务数
+        jobserver = None
+        if self.host_os != 'windows':
+            jobserver = MakeJobserver(jobs, concurrency)
+
+        try:
+            await self._clean_source_tree()
+            with self._lock:
+                for arch in config.architectures:
+                    self._tasks[arch] = asyncio.ensure_future(
+                        self._build_arch(config, arch, jobs, concurrency, jobserver, slots))
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        finally:
+            if jobserver:
+                jobserver.close()
+            with self._lock:
+                self._tasks.clear()
+                self._loop = None
+
+        return all(state.status == StepStatus.SUCCESS for state in self.states.values())
+
+    def cancel_arch(self, arch: str) -> bool:
+        """取消单个架构的编译（可从其他线程调用）"""
+        with self._lock:
+            task = self._tasks.get(arch)
+            if not task or task.done() or not self._loop:
+                return False
+            self._loop.call_soon_threadsafe(task.cancel)
+            return True
+
+    def cancel_all(self) -> bool:
+        """取消所有架构的编译"""
+        with self._lock:
+            archs = list(self._tasks)
+        return any([self.cancel_arch(arch) for arch in archs])
+
+    def probe_host(self, config: BuildConfig, arch: str) -> Dict[str, Any]:
+        """影响编译结果的本机信息（产物缓存键的一部分）：汇编检测得到的 configure 参数和主机工具版本
+
+        与编译时相同，汇编器不可用时为 --disable-neon/--disable-x86asm，这样的产物不会被汇编器可用的主机复用。
+        """
+        env, variables = self._arch_env(config, arch)
+        asm_args = []
+        if not config.optimizations.disableAsm:
+            asm_args = asyncio.run(self._detect_asm(arch, self.work_dir, env))
+        tools = [variables['HOSTCC']]
+        if arch in ('x86', 'x86_64'):
+            tools.extend(['nasm', 'yasm'])
+        try:
+            result = run_command_safe([self.bash_path, '-c', TOOL_VERSIONS_SCRIPT, 'probe', *tools], env=env)
+            versions = dict(line.split(': ', 1) for line in result.stdout.splitlines() if ': ' in line)
+        except OSError:
+            versions = {}
+        return {'asm': asm_args, 'tools': versions}
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """获取各架构的构建状态"""
+        with self._lock:
+            return {arch: state.to_dict() for arch, state in self.states.items()}
+
+    async def _clean_source_tree(self):
+        """树外构建要求源码目录中没有旧的配置：与构建脚本相同，在各架构开始前执行一次 distclean"""
+        if not (self.source_dir / "config.h").exists():
+            return
+        process = await asyncio.create_subprocess_exec(
+            self.bash_path, '-c', 'make -C "$1" distclean', 'distclean', self.source_dir.as_posix(),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL)
+        await process.wait()
+
+    async def _build_arch(self, config: BuildConfig, arch: str, jobs: int, concurrency: int,
+                          jobserver: Optional[MakeJobserver], slots: asyncio.Semaphore):
+        """编译单个架构，等到 slots 中有空位后开始"""
+        state = self.states[arch]
+        build_opts = config.buildOptions
+        acquired = False
+
+        try:
+            await slots.acquire()
+            acquired = True
+            state.status = StepStatus.RUNNING
+
+            env, variables = self._arch_env(config, arch)
+            if not Path(variables['CC']).exists():
+                raise StepFailed(f"编译器不存在: {variables['CC']}")
+
+            build_dir = self.work_dir / f"build-{arch}"
+            build_dir.mkdir(parents=True, exist_ok=True)
+
+            # 在启用编译缓存前用原始编译器检测汇编器
+            asm_args = []
+            if not config.optimizations.disableAsm:
+                asm_args = await self._detect_asm(arch, build_dir, env)
+
+            cache = None
+            if build_opts.ccache:
+                cache = self._compiler_cache(config)
+                cache.ensure_dirs()
+                env['FFAB_CCACHE_DIR'] = str(cache.cache_dir)
+                env['FFAB_CCACHE_MAXSIZE'] = str(build_opts.ccacheMaxSize)
+                env['FFAB_CCACHE_STATS'] = arch
+                wrapper = self._write_ccache_wrapper()
+                for var in ('CC', 'CXX'):
+                    variables[var] = f"{wrapper} {variables[var]}"
+                    env[var] = variables[var]
+                cache.zero_stats(arch)
+
+            configure_args = []
+            for option in self.generator._configure_options(config):
+                if option == ScriptGenerator.ASM_ARGS:
+                    configure_args.extend(asm_args)
+                elif isinstance(option, tuple):
+                    template, literal = option
+                    configure_args.append(Template(template).safe_substitute(variables) + literal)
+                else:
+                    configure_args.append(Template(option).safe_substitute(variables))
+            fingerprint = self._fingerprint(configure_args, build_dir)
+            fingerprint_file = build_dir / ".configure-fingerprint"
+
+            # 配置
+            if (build_opts.incremental and (build_dir / "Makefile").exists()
+                    and fingerprint_file.exists()
+                    and fingerprint_file.read_text().strip() == fingerprint):
+                self._skip_step(state, 'distclean')
+                self._skip_step(state, 'configure')
+            else:
+                if fingerprint_file.exists():
+                    fingerprint_file.unlink()
+                if (build_dir / "Makefile").exists():
+                    await self._run_step(state, 'distclean', ['make', 'distclean'],
+                                         build_dir, env, check=False)
+                else:
+                    self._skip_step(state, 'distclean')
+                await self._configure(config, state, configure_args, fingerprint, build_dir, env)
+                fingerprint_file.write_text(fingerprint + '\n')
+
+            # 统计目标数，用于计算进度和剩余时间
+            objects = await self._count_objects(build_dir, env)
+            if objects is not None:
+                self._emit_output(arch, 'make', f"{OBJECTS_MARKER} {arch} {objects}")
+
+            # 编译和安装
+            make_env = dict(env)
+            pass_fds = ()
+            make_cmd = ['make']
+            if jobserver:
+                make_env['MAKEFLAGS'] = jobserver.makeflags
+                pass_fds = jobserver.pass_fds
+            else:
+                make_cmd.append(f"-j{max(jobs // concurrency, 1)}")
+            await self._run_step(state, 'make', make_cmd, build_dir, make_env, pass_fds=pass_fds)
+            await self._run_step(state, 'install', ['make', 'install'], build_dir, env)
+
+            if cache:
+                for line in cache.format_stats(arch):
+                    self._emit_output(arch, 'install', line)
+
+            state.status = StepStatus.SUCCESS
+            state.currentStep = None
+            self._notify(state, None)
+
+        except asyncio.CancelledError:
+            state.status = StepStatus.CANCELLED
+            for step in state.steps.values():
+                if step.status == StepStatus.PENDING:
+                    step.status = StepStatus.CANCELLED
+            self._notify(state, None)
+            raise
+        except Exception as e:
+            state.status = StepStatus.FAILED
+            state.error = str(e)
+            self._notify(state, None)
+        finally:
+            if acquired:
+                slots.release()
+
+    async def _detect_asm(self, arch: str, build_dir: Path, env: Dict[str, str]) -> List[str]:
+        """执行构建脚本中的汇编检测函数，返回 configure 参数，检测结果行转发到输出"""
+        script = ScriptGenerator.ASM_DETECT_FUNCTION + "\ndetect_asm\nprintf '%s\\n' \"${ASM_ARGS[@]}\"\n"
+        process = await asyncio.create_subprocess_exec(
+            self.bash_path, '-c', script, cwd=str(build_dir), env=dict(env, ARCH=arch),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+        stdout, _ = await process.communicate()
+
+        args = []
+        for line in stdout.decode('utf-8', errors='replace').splitlines():
+            if line.startswith(ScriptGenerator.ASM_MARKER):
+                self._emit_output(arch, 'configure', line)
+            elif line.strip():
+                args.append(line.strip())
+        return args
+
+    async def _count_objects(self, build_dir: Path, env: Dict[str, str]) -> Optional[int]:
+        """make -n 预演，统计本次需要编译的目标数；预演失败时返回None"""
+        process = await asyncio.create_subprocess_exec(
+            self.bash_path, '-c', 'make -n', cwd=str(build_dir), env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=(os.name == 'posix'),
+            limit=STREAM_LIMIT)
+        count = 0
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                count += count_dry_run_objects(line.decode('utf-8', errors='replace'))
+            return_code = await process.wait()
+        except asyncio.CancelledError:
+            self._kill(process)
+            await process.wait()
+            raise
+        return count if return_code == 0 else None
+
+    async def _configure(self, config: BuildConfig, state: ArchState, configure_args: List[str],
+                         fingerprint: str, build_dir: Path, env: Dict[str, str]):
+        """运行 configure，启用配置缓存时优先从缓存恢复"""
+        archive = None
+        if config.buildOptions.configureCache:
+            archive = self._configure_cache_dir(config) / f"{fingerprint}.tar"
+            if archive.exists() and self._restore_configure_cache(archive, build_dir):
+                step = state.steps['configure']
+                step.cached = True
+                self._skip_step(state, 'configure')
+                self._emit_output(state.arch, 'configure',
+                                  f"命中配置缓存 ({fingerprint[:12]})，跳过 configure")
+                return
+
+        stamp = time.time()
+        configure = (self.source_dir / "configure").as_posix()
+        await self._run_step(state, 'configure', [self.bash_path, configure] + configure_args,
+                             build_dir, env)
+
+        if archive:
+            try:
+                self._save_configure_cache(archive, build_dir, stamp)
+                self._emit_output(state.arch, 'configure', f"已保存配置缓存 ({fingerprint[:12]})")
+            except (OSError, tarfile.TarError) as e:
+                self._emit_output(state.arch, 'configure', f"警告: 保存配置缓存失败: {e}")
+
+    async def _run_step(self, state: ArchState, name: str, argv: List[str], cwd: Path,
+                        env: Dict[str, str], pass_fds: tuple = (), check: bool = True):
+        """以子进程执行一个步骤，逐行转发输出"""
+        step = state.steps[name]
+        step.status = StepStatus.RUNNING
+        step.startTime = time.time()
+        state.currentStep = name
+        self._notify(state, step)
+
+        times_file = cwd / f".step-times.{name}"
+        env = dict(env, FFAB_TIMES_FILE=times_file.as_posix())
+        
+        process = await asyncio.create_subprocess_exec(
+            self.bash_path, '-c', TIMED_COMMAND, name, *argv, cwd=str(cwd), env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            pass_fds=pass_fds,
+            start_new_session=(os.name == 'posix'),
+            limit=STREAM_LIMIT)
+
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                self._emit_output(state.arch, name, line.decode('utf-8', errors='replace'))
+            return_code = await process.wait()
+        except asyncio.CancelledError:
+            self._kill(process)
+            await process.wait()
+            try:
+                times_file.unlink()
+            except FileNotFoundError:
+                pass
+            step.status = StepStatus.CANCELLED
+            step.endTime = time.time()
+            self._notify(state, step)
+            raise
+
+        step.endTime = time.time()
+        step.returnCode = return_code
+        if times_file.exists():
+            step.cpuTime = parse_times(times_file.read_text(errors='replace'))
+            times_file.unlink()
+        if return_code != 0 and check:
+            step.status = StepStatus.FAILED
+            self._notify(state, step)
+            raise StepFailed(f"{name} 失败，退出码: {return_code}")
+
+        step.status = StepStatus.SUCCESS
+        self._notify(state, step)
+
+    def _skip_step(self, state: ArchState, name: str):
+        step = state.steps[name]
+        step.status = StepStatus.SKIPPED
+        step.startTime = step.endTime = time.time()
+        self._notify(state, step)
+
+    def _kill(self, process: asyncio.subprocess.Process):
+        """终止步骤进程及其子进程"""
+        if process.returncode is not None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _arch_env(self, config: BuildConfig, arch: str):
+        """生成架构的环境变量和 configure 选项变量"""
+        arch_config = ArchitectureConfig.get_config(arch)
+        bin_dir = self.toolchain / "bin"
+        variables = {
+            'ARCH': arch,
+            'ARCH_NAME': arch_config['arch_name'],
+            'CPU': arch_config['cpu'],
+            'PREFIX': (self.work_dir / f"ffmpeg-android-{arch}").as_posix(),
+            'TOOLCHAIN': self.toolchain.as_posix(),
+            'CC': (bin_dir / f"{arch_config['target']}{config.api}-clang").as_posix(),
+            'CXX': (bin_dir / f"{arch_config['target']}{config.api}-clang++").as_posix(),
+            'AR': (bin_dir / "llvm-ar").as_posix(),
+            'RANLIB': (bin_dir / "llvm-ranlib").as_posix(),
+            'STRIP': (bin_dir / "llvm-strip").as_posix(),
+            'NM': (bin_dir / "llvm-nm").as_posix(),
+            'HOSTCC': 'gcc',
+            'HOSTCXX': 'g++',
+            'EXTRA_CFLAGS': arch_config['extra_cflags']
+        }
+
+        env = dict(os.environ)
+        env.update({key: variables[key] for key in
+                    ('PREFIX', 'CC', 'CXX', 'AR', 'RANLIB', 'STRIP', 'NM', 'HOSTCC', 'HOSTCXX')})
+        env.pop('MAKEFLAGS', None)
+        env.pop('MFLAGS', None)
+
+        if self.host_os == 'windows':
+            # MSYS2 工具链: bash 所在的 usr/bin 以及 mingw64/bin
+            usr_bin = Path(self.bash_path).parent
+            mingw_bin = usr_bin.parent.parent / "mingw64" / "bin"
+            env['PATH'] = os.pathsep.join([str(mingw_bin), str(usr_bin), env.get('PATH', '')])
+
+        return env, variables
+
+    def _fingerprint(self, configure_args: List[str], build_dir: Path) -> str:
+        """配置指纹，与构建脚本中的计算方式一致"""
+        payload = ''.join(f"{item}\n" for item in configure_args + [
+            self.toolchain.as_posix(), self._ffmpeg_revision(), build_dir.as_posix()])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _ffmpeg_revision(self) -> str:
+        """FFmpeg 源码版本，与构建脚本中的 FFMPEG_REV 一致"""
+        if (self.source_dir / ".git").exists():
+            try:
+                result = run_command_safe(['git', '-C', str(self.source_dir), 'rev-parse', 'HEAD'])
+                if result.returncode == 0:
+                    return result.stdout.strip()
+            except FileNotFoundError:
+                pass
+        release = self.source_dir / "RELEASE"
+        if release.exists():
+            return release.read_text(encoding='utf-8', errors='replace').rstrip('\n')
+        return 'unknown'
+
+    def _compiler_cache(self, config: BuildConfig) -> CompilerCache:
+        cache_dir = Path(config.buildOptions.ccacheDir)
+        if not cache_dir.is_absolute():
+            cache_dir = self.work_dir / cache_dir
+        return CompilerCache(cache_dir, config.buildOptions.ccacheMaxSize)
+
+    def _write_ccache_wrapper(self) -> str:
+        """生成编译器包装脚本（与构建脚本使用同一位置）"""
+        wrapper = self.work_dir / "build" / "ccache-wrapper"
+        wrapper.parent.mkdir(parents=True, exist_ok=True)
+        python = Path(self.generator.python_executable).as_posix()
+        script = self.generator.ccache_script.as_posix()
+        tmp = wrapper.with_name(f"{wrapper.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(f'#!/bin/sh\nexec "{python}" "{script}" "$@"\n', newline='\n')
+        tmp.chmod(0o755)
+        os.replace(tmp, wrapper)
+        return wrapper.as_posix()
+
+    def _configure_cache_dir(self, config: BuildConfig) -> Path:
+        cache_dir = Path(config.buildOptions.configureCacheDir)
+        if not cache_dir.is_absolute():
+            cache_dir = self.work_dir / cache_dir
+        return cache_dir
+
+    def _restore_configure_cache(self, archive: Path, build_dir: Path) -> bool:
+        """恢复配置缓存，文件时间更新为当前时间（同 tar -m）"""
+        # 缓存由本机生成，out-of-tree 构建的 src 符号链接指向源码绝对路径
+        extract_kwargs = {}
+        if hasattr(tarfile, 'fully_trusted_filter'):
+            extract_kwargs['filter'] = 'fully_trusted'
+        try:
+            with tarfile.open(archive, 'r') as tar:
+                members = tar.getmembers()
+                tar.extractall(build_dir, members=members, **extract_kwargs)
+        except (OSError, tarfile.TarError):
+            return False
+
+        now = time.time()
+        for member in members:
+            path = build_dir / member.name
+            if member.isfile():
+                os.utime(path, (now, now))
+        os.utime(archive)
+        return True
+
+    def _save_configure_cache(self, archive: Path, build_dir: Path, stamp: float):
+        """保存 configure 运行期间新建或修改的文件"""
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        tmp = archive.with_name(f"{archive.name}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            with tarfile.open(tmp, 'w') as tar:
+                for root, dirs, files in os.walk(build_dir):
+                    # 指向目录的符号链接按文件处理，不进入遍历
+                    links = [d for d in dirs if (Path(root) / d).is_symlink()]
+                    dirs[:] = [d for d in dirs if d != '.git' and d not in links]
+                    for name in files + links:
+                        path = Path(root) / name
+                        rel = path.relative_to(build_dir).as_posix()
+                        if rel in CONFIGURE_CACHE_EXCLUDES:
+                            continue
+                        if path.lstat().st_mtime > stamp:
+                            tar.add(path, arcname=f"./{rel}", recursive=False)
+            os.replace(tmp, archive)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _emit_output(self, arch: str, step: str, line: str):
+        if self.output_callback:
+            self.output_callback(arch, step, line)
+
+    def _notify(self, state: ArchState, step: Optional[StepState]):
+        if self.state_callback:
+            self.state_callback(state, step)
@@ -0,0 +1,265 @@
+"""
+编译产物打包模块
+
+把各架构安装目录 ffmpeg-android-<arch>/ 打包为 Android 项目可直接使用的归档:
+    zip      jniLibs/<abi>/lib*.so (静态库为 libs/<abi>/lib*.a) + include/
+    aar      jni/<abi>/lib*.so + AndroidManifest.xml/classes.jar/R.txt，可作为 Gradle 本地依赖
+    tar.zst  与 zip 相同的布局，使用 zstd 压缩 (需要 zstandard 模块)
+
+各架构的库并行 strip；各架构的 include/ 按内容哈希比较，相同时只写入一份。
+归档在一次顺序写入中完成：库按架构顺序依次等待 strip 完成后直接写入，条目顺序固定，
+相同的输入生成相同的归档。
+"""
+
+import hashlib
+import io
+import os
+import subprocess
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .environment import get_host_os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 打包格式 -> 归档文件扩展名
+PACKAGE_FORMATS = {
+    'zip': 'zip',
+    'aar': 'aar',
+    'tar.zst': 'tar.zst'
+}
+
+# 归档文件名（位于打包目录下）
+PACKAGE_NAME = "ffmpeg-android"
+
+AAR_MANIFEST = '''<?xml version="1.0" encoding="utf-8"?>
+<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="{package}">
+    <uses-sdk android:minSdkVersion="{api}" />
+</manifest>
+'''
+
+AAR_PACKAGE = "org.ffmpeg.android"
+
+# 归档中条目的固定修改时间
+ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class PackageError(Exception):
+    """无法打包"""
+
+
+class ArchiveWriter:
+    """zip/aar 与 tar.zst 的统一写入接口"""
+
+    def __init__(self, path: Path, package_format: str):
+        self.path = path
+        self.package_format = package_format
+        if package_format == 'tar.zst':
+            self._file = open(path, 'wb')
+            self._stream = zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(self._file)
+            self._tar = tarfile.open(fileobj=self._stream, mode='w|')
+            self._zip = None
+        else:
+            self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+
+    def add_file(self, name: str, source: Path, mode: int = 0o644):
+        if self._zip:
+            info = zipfile.ZipInfo(name, date_time=ENTRY_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = mode << 16
+            with open(source, 'rb') as src, self._zip.open(info, 'w') as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = source.stat().st_size
+            info.mode = mode
+            with open(source, 'rb') as src:
+                self._tar.addfile(info, src)
+
+    def add_bytes(self, name: str, data: bytes):
+        if self._zip:
+            info = zipfile.ZipInfo(name, date_time=ENTRY_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        if self._zip:
+            self._zip.close()
+        else:
+            self._tar.close()
+            self._stream.close()
+            self._file.close()
+
+
+class Packager:
+    """多架构打包器"""
+
+    def __init__(self, work_dir: Path, output_dir: Path, jobs: int = 0):
+        self.work_dir = Path(work_dir)
+        self.output_dir = Path(output_dir)
+        self.jobs = jobs or os.cpu_count() or 4
+        self.strip_tool = self._find_strip_tool()
+
+    def _find_strip_tool(self) -> Optional[Path]:
+        """NDK 中的 llvm-strip"""
+        host_tag = 'windows-x86_64' if get_host_os() == 'windows' else 'linux-x86_64'
+        bin_dir = self.work_dir / "android-ndk" / "toolchains" / "llvm" / "prebuilt" / host_tag / "bin"
+        for name in ('llvm-strip', 'llvm-strip.exe'):
+            if (bin_dir / name).exists():
+                return bin_dir / name
+        return None
+
+    def package(self, archs: List[str], package_format: str, shared: bool = True, api: int = 21,
+                log_callback: Optional[Callable] = None) -> Path:
+        """打包各架构的库和头文件，返回归档路径"""
+        if package_format not in PACKAGE_FORMATS:
+            raise PackageError(f"不支持的打包格式: {package_format}")
+        if package_format == 'aar' and not shared:
+            raise PackageError("AAR 只能包含动态库，静态库请使用 zip 或 tar.zst")
+        if package_format == 'tar.zst' and zstandard is None:
+            raise PackageError("tar.zst 打包需要 zstandard 模块: pip install zstandard")
+
+        pattern = "lib*.so" if shared else "lib*.a"
+        libs: List[Tuple[str, Path]] = []
+        include_dirs: Dict[str, Path] = {}
+        for arch in archs:
+            prefix = self.work_dir / f"ffmpeg-android-{arch}"
+            arch_libs = [path for path in sorted((prefix / "lib").glob(pattern)) if not path.is_symlink()]
+            if not arch_libs:
+                raise PackageError(f"{arch} 没有可打包的库: {prefix / 'lib'}")
+            libs.extend((arch, path) for path in arch_libs)
+            # AAR 中不包含头文件
+            if package_format != 'aar' and (prefix / "include").is_dir():
+                include_dirs[arch] = prefix / "include"
+
+        if package_format == 'aar':
+            lib_root = "jni"
+        else:
+            lib_root = "jniLibs" if shared else "libs"
+
+        if log_callback and not self.strip_tool:
+            log_callback("⚠️ 未找到 NDK 中的 llvm-strip，库将不经 strip 直接打包", 'warning')
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = self.output_dir / f"{PACKAGE_NAME}.{PACKAGE_FORMATS[package_format]}"
+        partial_path = archive_path.with_name(archive_path.name + ".partial")
+        start = time.time()
+        original_size = stripped_size = 0
+
+        with tempfile.TemporaryDirectory(prefix='ffab-package-') as temp_dir, \
+                ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            # strip 与头文件哈希并行进行
+            strip_futures = [
+                (arch, path, executor.submit(self._strip, path, Path(temp_dir) / arch / path.name, shared))
+                for arch, path in libs
+            ]
+            hash_futures = {arch: executor.submit(self._hash_tree, path) for arch, path in include_dirs.items()}
+
+            writer = ArchiveWriter(partial_path, package_format)
+            try:
+                if package_format == 'aar':
+                    writer.add_bytes("AndroidManifest.xml",
+                                     AAR_MANIFEST.format(package=AAR_PACKAGE, api=api).encode('utf-8'))
+                    writer.add_bytes("classes.jar", self._empty_jar())
+                    writer.add_bytes("R.txt", b"")
+
+                for arch, path, future in strip_futures:
+                    output, strip_error = future.result()
+                    if strip_error and log_callback:
+                        log_callback(f"⚠️ strip {arch}/{path.name} 失败，使用原文件: {strip_error}", 'warning')
+                    original_size += path.stat().st_size
+                    stripped_size += output.stat().st_size
+                    writer.add_file(f"{lib_root}/{arch}/{path.name}", output, 0o755 if shared else 0o644)
+                    if output != path:
+                        output.unlink()
+
+                if include_dirs:
+                    for name, source in self._header_entries(include_dirs, hash_futures, log_callback):
+                        writer.add_file(name, source)
+            except BaseException:
+                writer.close()
+                partial_path.unlink()
+                raise
+            writer.close()
+
+        os.replace(partial_path, archive_path)
+        if log_callback:
+            saved = original_size - stripped_size
+            log_callback(f"📦 已打包 {len(archs)} 个架构、{len(libs)} 个库 ({time.time() - start:.1f}s): "
+                         f"{archive_path} ({archive_path.stat().st_size / (1024 * 1024):.1f} MB)", 'success')
+            if saved > 0:
+                log_callback(f"  strip 减小 {saved / (1024 * 1024):.1f} MB", 'info')
+        return archive_path
+
+    def _strip(self, source: Path, output: Path, shared: bool) -> Tuple[Path, Optional[str]]:
+        """strip 到临时文件，失败时返回原文件和错误信息"""
+        if not self.strip_tool:
+            return source, None
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # 静态库只去掉调试信息，保留链接时需要的符号
+        flag = '--strip-unneeded' if shared else '--strip-debug'
+        result = subprocess.run([str(self.strip_tool), flag, '-o', str(output), str(source)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return source, (result.stderr.strip() or f"退出码 {result.returncode}")
+        if not output.exists():
+            return source, "未生成输出文件"
+        return output, None
+
+    @staticmethod
+    def _hash_tree(root: Path) -> Tuple[str, List[Path]]:
+        """按相对路径和内容计算目录树的哈希，返回 (哈希, 文件列表)"""
+        digest = hashlib.sha256()
+        files = sorted(path for path in root.rglob('*') if path.is_file())
+        for path in files:
+            digest.update(path.relative_to(root).as_posix().encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest(), files
+
+    def _header_entries(self, include_dirs: Dict[str, Path], hash_futures: Dict,
+                        log_callback: Optional[Callable] = None) -> List[Tuple[str, Path]]:
+        """头文件条目：所有架构相同时写入 include/，否则按架构写入 include/<abi>/"""
+        trees = {arch: future.result() for arch, future in hash_futures.items()}
+        hashes = {digest for digest, _ in trees.values()}
+        entries = []
+        if len(hashes) == 1:
+            arch = next(iter(include_dirs))
+            root = include_dirs[arch]
+            entries = [(f"include/{path.relative_to(root).as_posix()}", path) for path in trees[arch][1]]
+            if log_callback and len(trees) > 1 and entries:
+                log_callback(f"  {len(trees)} 个架构的头文件相同，只打包一份 ({len(entries)} 个文件)", 'info')
+        else:
+            if log_callback:
+                log_callback("  各架构的头文件不同，按架构分别打包到 include/<abi>/", 'info')
+            for arch, (_, files) in trees.items():
+                root = include_dirs[arch]
+                entries.extend((f"include/{arch}/{path.relative_to(root).as_posix()}", path) for path in files)
+        return entries
+
+    @staticmethod
+    def _empty_jar() -> bytes:
+        """AAR 必需的 classes.jar (只含清单)"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as jar:
+            info = zipfile.ZipInfo("META-INF/MANIFEST.MF", date_time=ENTRY_DATE_TIME)
+            jar.writestr(info, "Manifest-Version: 1.0\r\n\r\n")
+        return buffer.getvalue()
@@ -0,0 +1,295 @@
+"""
+编译进度模块
+
+按 make 简要输出中的 CC/AS/LD 等行统计各架构已完成的目标数，计算实际进度和剩余时间。
+
+每个架构的目标总数在 configure 之后通过 make -n 预演得到，只包含本次需要重新编译的目标，
+增量编译和编译缓存下同样准确；无法预演时使用同一配置上一次编译记录的目标数
+(build/progress-history.json)。剩余时间按本次的编译速度估算，样本不足时使用上一次的耗时。
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .artifacts import NON_ARTIFACT_FIELDS
+
+# 目标数标记: ::objects:: <架构> <目标数>
+OBJECTS_MARKER = '::objects::'
+
+# 计入进度的 FFmpeg 简要输出标签
+OBJECT_TAGS = ('CC', 'CXX', 'AS', 'X86ASM', 'LD', 'AR')
+_OBJECT_TAG_SET = frozenset(OBJECT_TAGS)
+
+# make -n 输出中对应的命令: printf "CC\t%s\n" libavcodec/foo.o; ...
+DRY_RUN_PATTERN = re.compile(r'printf "(?:%s)\\t' % '|'.join(OBJECT_TAGS))
+
+HISTORY_FILE = "progress-history.json"
+
+# 历史记录保留的条目数
+MAX_HISTORY = 200
+
+# 单个架构内 configure / make / install 所占的进度比例
+STAGE_WEIGHTS = {'configure': 0.1, 'make': 0.85, 'install': 0.05}
+
+# 本次至少完成这么多目标后才按本次的速度估算剩余时间
+MIN_RATE_SAMPLES = 10
+
+# 编译中进度回调的最小间隔（秒）
+REPORT_INTERVAL = 0.5
+
+
+def count_dry_run_objects(text: str) -> int:
+    """统计 make -n 输出中将要编译的目标数"""
+    return len(DRY_RUN_PATTERN.findall(text))
+
+
+def history_key(config_data: Dict[str, Any], arch: str) -> str:
+    """历史记录键：与产物缓存相同，只取影响编译内容的配置"""
+    data = {k: v for k, v in config_data.items() if k not in NON_ARTIFACT_FIELDS}
+    payload = json.dumps({'config': data, 'arch': arch}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ProgressHistory:
+    """各配置、各架构上一次编译的目标数和耗时"""
+
+    def __init__(self, build_dir: Path):
+        self.path = Path(build_dir) / HISTORY_FILE
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def update(self, entries: Dict[str, Dict[str, Any]]):
+        """写入新的记录，超出保留数量时删除最早的"""
+        if not entries:
+            return
+        data = self.load()
+        data.update(entries)
+        if len(data) > MAX_HISTORY:
+            oldest = sorted(data, key=lambda key: data[key].get('time', 0))
+            for key in oldest[:len(data) - MAX_HISTORY]:
+                del data[key]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+
+@dataclass
+class ArchProgress:
+    """单个架构的编译进度"""
+    arch: str
+    stage: str = 'pending'  # pending / configure / make / install / done
+    done: int = 0  # 已编译的目标数
+    total: Optional[int] = None  # 目标总数，未知时为None
+    estimated: bool = False  # total 取自上一次编译
+    startTime: Optional[float] = None
+    stageStart: Dict[str, float] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+
+
+class ProgressTracker:
+    """多架构编译进度与剩余时间
+
+    parallel 为 True 时各架构同时编译，总剩余时间取最慢的架构，否则为各架构之和。
+    history 为各架构上一次编译的记录: {架构: {'objects', 'configureTime', 'makeTime', 'installTime'}}
+    """
+
+    def __init__(self, archs: List[str], parallel: bool = False,
+                 history: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.parallel = parallel
+        self.history = history or {}
+        self.archs = {arch: ArchProgress(arch) for arch in archs}
+        self._current: Optional[str] = None  # 逐个架构编译时，无前缀的输出行属于该架构
+        self._last_report = 0.0
+
+    def begin(self, arch: str, stage: str, timestamp: Optional[float] = None):
+        state = self.archs.get(arch)
+        if state is None:
+            return
+        timestamp = timestamp or time.time()
+        if state.startTime is None:
+            state.startTime = timestamp
+        state.stage = stage
+        state.stageStart[stage] = timestamp
+        if stage == 'make' and not state.total:
+            objects = self.history.get(arch, {}).get('objects')
+            if objects:
+                state.total = objects
+                state.estimated = True
+        self._current = arch
+
+    def end(self, arch: str, stage: str, timestamp: Optional[float] = None):
+        state = self.archs.get(arch)
+        if state is None or stage not in state.stageStart:
+            return
+        state.durations[stage] = (timestamp or time.time()) - state.stageStart[stage]
+        if stage == 'install':
+            self.finish(arch)
+
+    def finish(self, arch: str):
+        """架构编译完成"""
+        state = self.archs.get(arch)
+        if state is None:
+            return
+        state.stage = 'done'
+        if state.total is None or state.total < state.done:
+            state.total = state.done
+
+    def set_total(self, arch: str, total: int):
+        """设置 make -n 预演得到的目标数；为 0 时可能无法预演，保留历史估计"""
+        state = self.archs.get(arch)
+        if state is None or total <= 0:
+            return
+        state.total = total
+        state.estimated = False
+
+    def handle_marker(self, line: str) -> Optional[Tuple[str, int]]:
+        """处理目标数标记行，返回 (架构, 目标数)；不是标记行时返回None"""
+        index = line.find(OBJECTS_MARKER)
+        if index < 0:
+            return None
+        fields = line[index + len(OBJECTS_MARKER):].split()
+        if len(fields) != 2 or not fields[1].isdigit():
+            return None
+        arch, total = fields[0], int(fields[1])
+        self.set_total(arch, total)
+        return arch, total
+
+    def handle_line(self, line: str, arch: Optional[str] = None) -> Optional[str]:
+        """统计编译目标行 (可带 [架构] 前缀)，返回所属架构；不是目标行时返回None"""
+        tab = line.find('\t')
+        if tab < 0:
+            return None
+        tag = line[:tab]
+        if tag.startswith('['):
+            end = tag.find('] ')
+            if end < 0:
+                return None
+            arch = tag[1:end]
+            tag = tag[end + 2:]
+        if tag not in _OBJECT_TAG_SET:
+            return None
+
+        state = self.archs.get(arch or self._current)
+        if state is None:
+            return None
+        state.done += 1
+        if state.total is not None and state.done > state.total:
+            # 历史估计偏少
+            state.total = state.done
+        return state.arch
+
+    def report(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """距上次回调超过 REPORT_INTERVAL 时返回进度快照，否则返回None"""
+        now = time.time()
+        if not force and now - self._last_report < REPORT_INTERVAL:
+            return None
+        self._last_report = now
+        return self.snapshot(now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """总进度 (percent: 0-100)、剩余秒数 (eta，无法估计时为None) 和各架构的进度"""
+        now = now or time.time()
+        archs = {}
+        etas = []
+        for arch, state in self.archs.items():
+            fraction = self._fraction(state)
+            eta = self._eta(state, now)
+            etas.append(eta)
+            archs[arch] = {
+                'stage': state.stage,
+                'done': state.done,
+                'total': state.total,
+                'estimated': state.estimated,
+                'percent': round(fraction * 100, 1),
+                'eta': None if eta is None else round(eta)
+            }
+
+        percent = sum(info['percent'] for info in archs.values()) / len(archs) if archs else 0.0
+        if any(eta is None for eta in etas):
+            total_eta = None
+        elif self.parallel:
+            total_eta = round(max(etas, default=0))
+        else:
+            total_eta = round(sum(etas))
+        return {'percent': round(percent, 1), 'eta': total_eta, 'archs': archs}
+
+    def history_entries(self) -> Dict[str, Dict[str, Any]]:
+        """已完成架构的记录，供下一次编译估计"""
+        entries = {}
+        for arch, state in self.archs.items():
+            if state.stage != 'done' or 'make' not in state.durations:
+                continue
+            entry = {'objects': state.done, 'time': time.time()}
+            for stage in STAGE_WEIGHTS:
+                if stage in state.durations:
+                    entry[f'{stage}Time'] = round(state.durations[stage], 2)
+            entries[arch] = entry
+        return entries
+
+    def _fraction(self, state: ArchProgress) -> float:
+        if state.stage == 'done':
+            return 1.0
+        if state.stage not in STAGE_WEIGHTS:
+            return 0.0
+        # 当前阶段之前的阶段计为完成（包括跳过的 configure）
+        fraction = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            if stage == state.stage:
+                break
+            fraction += weight
+        if state.stage == 'make' and state.total:
+            fraction += STAGE_WEIGHTS['make'] * min(state.done / state.total, 0.99)
+        return fraction
+
+    def _rate(self, state: ArchProgress, now: float) -> Optional[float]:
+        """目标/秒：优先使用本次的速度"""
+        elapsed = now - state.stageStart.get('make', now)
+        if state.done >= MIN_RATE_SAMPLES and elapsed > 0:
+            return state.done / elapsed
+        history = self.history.get(state.arch, {})
+        if history.get('objects') and history.get('makeTime'):
+            return history['objects'] / history['makeTime']
+        return None
+
+    def _eta(self, state: ArchProgress, now: float) -> Optional[float]:
+        if state.stage == 'done':
+            return 0.0
+        history = self.history.get(state.arch, {})
+        install = history.get('installTime', 0.0)
+
+        if state.stage == 'install':
+            return max(install - (now - state.stageStart['install']), 0.0)
+
+        if state.stage == 'make':
+            rate = self._rate(state, now)
+            if not state.total or not rate:
+                return None
+            return max(state.total - state.done, 0) / rate + install
+
+        # 尚未开始编译：使用上一次的耗时，没有记录时参考正在编译的架构
+        configure = history.get('configureTime', 0.0)
+        if state.stage == 'configure':
+            configure = max(configure - (now - state.stageStart['configure']), 0.0)
+        if history.get('makeTime'):
+            return configure + history['makeTime'] + install
+        for other in self.archs.values():
+            if other is state or other.stage != 'make' or not other.total:
+                continue
+            rate = self._rate(other, now)
+            if rate:
+                return configure + other.total / rate
+        return None
@@ -0,0 +1,331 @@
+"""
+编译产物体积分析模块
+
+纯 Python 解析 ELF (32/64 位，小端/大端)，不依赖 readelf/nm:
+    - 每个库按段 (.text/.rodata/.data.rel.ro 等) 统计体积
+    - 统计动态符号表中导出/导入的符号数
+    - 按源文件 (符号表中的 STT_FILE) 或符号名前缀把函数和数据的体积归属到 FFmpeg 组件
+静态库 (.a) 按其中的目标文件名归属组件。
+"""
+
+import json
+import struct
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+SHF_ALLOC = 0x2
+
+STT_OBJECT = 1
+STT_FUNC = 2
+STT_FILE = 4
+STB_LOCAL = 0
+
+# 无法归属到组件的体积
+UNATTRIBUTED = '(未归属)'
+
+# 符号名和源文件名中需要去掉的前缀
+SYMBOL_PREFIXES = ('avpriv_', 'ff_', 'av_')
+FILE_PREFIXES = ('vf_', 'af_', 'vsrc_', 'asrc_', 'vsink_', 'asink_', 'avf_', 'f_')
+
+# 按函数/数据分段编译 (-ffunction-sections) 的目标文件中，.text.foo 等段合并统计
+SECTION_GROUPS = ('.text', '.rodata', '.data.rel.ro', '.data', '.bss')
+
+# 报告中保留的源文件数量
+TOP_FILES = 50
+
+# 报告文件名（位于 build/ 下）
+REPORT_FILE = "size-report.json"
+
+
+class ElfError(Exception):
+    """不是有效的 ELF 文件"""
+
+
+class ElfFile:
+    """最小的 ELF 解析器，只读取段表和符号表"""
+
+    def __init__(self, data: bytes):
+        if len(data) < 52 or data[:4] != b'\x7fELF':
+            raise ElfError("不是 ELF 文件")
+        self.data = data
+        self.is64 = data[4] == 2
+        self.endian = '<' if data[5] == 1 else '>'
+
+        if self.is64:
+            fields = struct.unpack_from(self.endian + 'HHIQQQIHHHHHH', data, 16)
+        else:
+            fields = struct.unpack_from(self.endian + 'HHIIIIIHHHHHH', data, 16)
+        shoff, shentsize, shnum, shstrndx = fields[5], fields[10], fields[11], fields[12]
+
+        self.sections: List[Dict] = []
+        for index in range(shnum):
+            offset = shoff + index * shentsize
+            if self.is64:
+                values = struct.unpack_from(self.endian + 'IIQQQQIIQQ', data, offset)
+            else:
+                values = struct.unpack_from(self.endian + 'IIIIIIIIII', data, offset)
+            name, sh_type, flags, _, sh_offset, size, link, _, _, entsize = values
+            self.sections.append({
+                'nameOffset': name, 'type': sh_type, 'flags': flags, 'offset': sh_offset,
+                'size': size, 'link': link, 'entsize': entsize
+            })
+
+        if 0 <= shstrndx < len(self.sections):
+            names = self.sections[shstrndx]
+            for section in self.sections:
+                section['name'] = self._string(names, section['nameOffset'])
+        else:
+            for section in self.sections:
+                section['name'] = ''
+
+    def _string(self, table: Dict, offset: int) -> str:
+        start = table['offset'] + offset
+        end = self.data.find(b'\0', start, table['offset'] + table['size'])
+        if end < 0:
+            end = table['offset'] + table['size']
+        return self.data[start:end].decode('utf-8', errors='replace')
+
+    def find_section(self, sh_type: int) -> Optional[Dict]:
+        for section in self.sections:
+            if section['type'] == sh_type:
+                return section
+        return None
+
+    def alloc_sections(self) -> Iterable[Dict]:
+        """加载到内存中的段（.bss 等 NOBITS 段不占文件体积，但计入内存占用）"""
+        return (s for s in self.sections if s['flags'] & SHF_ALLOC and s['name'])
+
+    def symbols(self, section: Dict) -> Iterable[Tuple[str, int, int, int, int]]:
+        """遍历符号表，返回 (名称, 类型, 绑定, 段索引, 大小)"""
+        strtab = self.sections[section['link']]
+        entsize = section['entsize'] or (24 if self.is64 else 16)
+        for offset in range(section['offset'], section['offset'] + section['size'], entsize):
+            if self.is64:
+                name, info, _, shndx, _, size = struct.unpack_from(self.endian + 'IBBHQQ', self.data, offset)
+            else:
+                name, _, size, info, _, shndx = struct.unpack_from(self.endian + 'IIIBBH', self.data, offset)
+            yield self._string(strtab, name), info & 0xf, info >> 4, shndx, size
+
+
+class ComponentMatcher:
+    """按名称前缀把源文件或符号归属到组件"""
+
+    def __init__(self, components: Iterable[str]):
+        # 长名称优先匹配，如 aac_latm 优先于 aac
+        self.components = sorted({c for c in components if c}, key=len, reverse=True)
+
+    def match(self, stem: str) -> Optional[str]:
+        for component in self.components:
+            if stem.startswith(component):
+                rest = stem[len(component):]
+                # h2645_parse 不属于 h264
+                if not rest or not rest[0].isdigit():
+                    return component
+        return None
+
+    def match_file(self, filename: str) -> Optional[str]:
+        stem = Path(filename).name.split('.')[0]
+        for prefix in FILE_PREFIXES:
+            if stem.startswith(prefix):
+                stem = stem[len(prefix):]
+                break
+        return self.match(stem)
+
+    def match_symbol(self, name: str) -> Optional[str]:
+        for prefix in SYMBOL_PREFIXES:
+            if name.startswith(prefix):
+                name = name[len(prefix):]
+                break
+        return self.match(name)
+
+
+class SizeReporter:
+    """编译产物体积报告"""
+
+    def __init__(self, work_dir: Path):
+        self.work_dir = Path(work_dir)
+
+    def generate(self, archs: List[str], components: Iterable[str]) -> Dict:
+        """分析各架构安装目录中的库"""
+        matcher = ComponentMatcher(components)
+        report = {
+            'generatedAt': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'archs': {}
+        }
+        for arch in archs:
+            lib_dir = self.work_dir / f"ffmpeg-android-{arch}" / "lib"
+            if not lib_dir.is_dir():
+                continue
+            libs = {}
+            for path in sorted(lib_dir.glob("lib*.so")) + sorted(lib_dir.glob("lib*.a")):
+                if path.is_symlink():
+                    continue
+                try:
+                    libs[path.name] = self.analyze(path, matcher)
+                except (ElfError, struct.error, IndexError) as e:
+                    libs[path.name] = {'size': path.stat().st_size, 'error': str(e)}
+            report['archs'][arch] = {
+                'totalSize': sum(lib['size'] for lib in libs.values()),
+                'libs': libs
+            }
+        return report
+
+    def analyze(self, path: Path, matcher: ComponentMatcher) -> Dict:
+        """分析单个 .so 或 .a"""
+        data = path.read_bytes()
+        if data.startswith(b'!<arch>\n'):
+            return self._analyze_archive(data, matcher)
+        return self._analyze_shared(data, matcher)
+
+    def _analyze_shared(self, data: bytes, matcher: ComponentMatcher) -> Dict:
+        elf = ElfFile(data)
+        sections = defaultdict(int)
+        for section in elf.alloc_sections():
+            sections[_section_group(section['name'])] += section['size']
+
+        defined = undefined = 0
+        dynsym = elf.find_section(SHT_DYNSYM)
+        if dynsym:
+            for name, sym_type, _, shndx, _ in elf.symbols(dynsym):
+                if not name:
+                    continue
+                if shndx == 0:
+                    undefined += 1
+                else:
+                    defined += 1
+
+        # 优先使用完整符号表（含静态函数和源文件名），被 strip 后退回动态符号表
+        symtab = elf.find_section(SHT_SYMTAB)
+        source = 'symtab' if symtab else ('dynsym' if dynsym else None)
+        components = defaultdict(int)
+        files = defaultdict(int)
+        if source:
+            current_file = None
+            for name, sym_type, bind, shndx, size in elf.symbols(symtab or dynsym):
+                if sym_type == STT_FILE:
+                    current_file = name
+                    continue
+                if sym_type not in (STT_FUNC, STT_OBJECT) or shndx == 0 or not size:
+                    continue
+                # 局部符号跟在所属源文件的 STT_FILE 之后，全局符号按名称前缀归属
+                filename = current_file if bind == STB_LOCAL else None
+                component = matcher.match_file(filename) if filename else None
+                component = component or matcher.match_symbol(name) or UNATTRIBUTED
+                components[component] += size
+                if filename:
+                    files[filename] += size
+
+        return {
+            'size': len(data),
+            'sections': self._sorted(sections),
+            'dynamicSymbols': {'defined': defined, 'undefined': undefined},
+            'symbolSource': source,
+            'components': self._sorted(components),
+            'files': self._sorted(files, TOP_FILES)
+        }
+
+    def _analyze_archive(self, data: bytes, matcher: ComponentMatcher) -> Dict:
+        sections = defaultdict(int)
+        components = defaultdict(int)
+        files = defaultdict(int)
+        defined = 0
+        for member, content in self._archive_members(data):
+            try:
+                elf = ElfFile(content)
+            except ElfError:
+                continue
+            member_size = 0
+            for section in elf.alloc_sections():
+                sections[_section_group(section['name'])] += section['size']
+                member_size += section['size']
+            symtab = elf.find_section(SHT_SYMTAB)
+            if symtab:
+                defined += sum(1 for name, _, bind, shndx, _ in elf.symbols(symtab)
+                               if name and bind != STB_LOCAL and shndx != 0)
+            component = matcher.match_file(member) or UNATTRIBUTED
+            components[component] += member_size
+            files[member] += member_size
+
+        return {
+            'size': len(data),
+            'sections': self._sorted(sections),
+            'dynamicSymbols': {'defined': defined, 'undefined': 0},
+            'symbolSource': 'archive',
+            'components': self._sorted(components),
+            'files': self._sorted(files, TOP_FILES)
+        }
+
+    @staticmethod
+    def _archive_members(data: bytes) -> Iterable[Tuple[str, bytes]]:
+        """遍历 ar 归档中的成员（支持 GNU 长文件名表）"""
+        offset = 8
+        long_names = b''
+        while offset + 60 <= len(data):
+            header = data[offset:offset + 60]
+            name = header[:16].decode('utf-8', errors='replace').rstrip()
+            size = int(header[48:58].decode().strip() or 0)
+            content = data[offset + 60:offset + 60 + size]
+            offset += 60 + size + (size & 1)
+
+            if name == '//':
+                long_names = content
+                continue
+            if name in ('/', '/SYM64/'):
+                continue
+            if name.startswith('/') and name[1:].isdigit():
+                start = int(name[1:])
+                end = long_names.find(b'/\n', start)
+                name = long_names[start:end if end >= 0 else None].decode('utf-8', errors='replace')
+            yield name.rstrip('/'), content
+
+    @staticmethod
+    def _sorted(values: Dict[str, int], limit: Optional[int] = None) -> Dict[str, int]:
+        items = sorted(values.items(), key=lambda item: item[1], reverse=True)
+        return dict(items[:limit] if limit else items)
+
+    def write(self, report: Dict, build_dir: Path) -> Path:
+        """写入 build/size-report.json"""
+        build_dir = Path(build_dir)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        path = build_dir / REPORT_FILE
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return path
+
+    @staticmethod
+    def summary_lines(report: Dict, top: int = 5) -> List[str]:
+        """体积摘要：每个库的主要段和体积最大的组件"""
+        lines = []
+        for arch, arch_report in report.get('archs', {}).items():
+            lines.append(f"{arch}: 合计 {_format_size(arch_report['totalSize'])}")
+            for name, lib in arch_report['libs'].items():
+                if 'error' in lib:
+                    lines.append(f"  {name} {_format_size(lib['size'])} (无法解析: {lib['error']})")
+                    continue
+                sections = ', '.join(f"{section} {_format_size(size)}"
+                                     for section, size in list(lib['sections'].items())[:3])
+                lines.append(f"  {name} {_format_size(lib['size'])} ({sections}; "
+                             f"导出符号 {lib['dynamicSymbols']['defined']})")
+                biggest = [(c, s) for c, s in lib['components'].items() if c != UNATTRIBUTED][:top]
+                if biggest:
+                    lines.append("    体积最大的组件: " +
+                                 ', '.join(f"{c} {_format_size(s)}" for c, s in biggest))
+        return lines
+
+
+def _section_group(name: str) -> str:
+    for group in SECTION_GROUPS:
+        if name.startswith(group + '.'):
+            return group
+    return name
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.2f} MB"
+    return f"{size / 1024:.1f} KB"
@@ -0,0 +1,248 @@
+"""
+构建耗时追踪模块
+
+记录每个 (架构, 阶段) 的墙钟时间和 CPU 时间，输出 Chrome trace-event 格式
+(chrome://tracing 或 https://ui.perfetto.dev 可直接打开)，并生成耗时汇总表。
+
+构建脚本在每个阶段前后输出标记行:
+    ::stage:: begin|end <架构> <阶段> <时间戳> <子进程用户态时间> <子进程内核态时间>
+CPU 时间取自 bash 内置命令 times 的子进程累计值。
+"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 构建脚本输出的阶段标记
+STAGE_MARKER = '::stage::'
+
+# 汇总表中按此顺序显示的构建阶段
+BUILD_STAGES = ('distclean', 'configure', 'make', 'install')
+
+# 不属于任何架构的阶段（环境准备等）
+GLOBAL_TRACK = '(环境)'
+
+_TIMES_PATTERN = re.compile(r'(\d+)m([\d.]+)s')
+
+
+def parse_times(text: str) -> Optional[float]:
+    """解析 bash times 输出的子进程 CPU 时间（用户态 + 内核态，秒）
+
+    times 输出两行，第二行为子进程累计时间；只传入一行时直接解析该行。
+    """
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    if not lines:
+        return None
+    values = _TIMES_PATTERN.findall(lines[-1])
+    if not values:
+        return None
+    return sum(int(minutes) * 60 + float(seconds) for minutes, seconds in values)
+
+
+def _children_cpu_time() -> float:
+    """当前进程已回收子进程的 CPU 时间"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@dataclass
+class TraceSpan:
+    """一个计时区间"""
+    name: str
+    arch: str
+    category: str
+    start: float
+    end: Optional[float] = None
+    cpuStart: Optional[float] = None
+    cpuTime: Optional[float] = None
+    status: str = 'success'
+
+    @property
+    def duration(self) -> float:
+        return (self.end or self.start) - self.start
+
+
+class BuildTracer:
+    """构建耗时追踪器"""
+
+    def __init__(self):
+        self.origin = time.time()
+        self.spans: List[TraceSpan] = []
+        self._open: Dict[Tuple[str, str], TraceSpan] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, arch: str = GLOBAL_TRACK, category: str = 'environment'):
+        """记录一段 Python 代码的耗时（CPU 时间包含期间结束的子进程）"""
+        start = time.time()
+        cpu_start = time.process_time() + _children_cpu_time()
+        status = 'success'
+        try:
+            yield
+        except BaseException:
+            status = 'failed'
+            raise
+        finally:
+            cpu = time.process_time() + _children_cpu_time() - cpu_start
+            self.add(arch, name, start, time.time(), cpu, category, status)
+
+    def add(self, arch: str, name: str, start: float, end: float,
+            cpu_time: Optional[float] = None, category: str = 'build', status: str = 'success'):
+        """添加一个已完成的区间"""
+        with self._lock:
+            self.spans.append(TraceSpan(name, arch, category, start, end,
+                                        cpuTime=cpu_time, status=status))
+
+    def begin(self, arch: str, name: str, timestamp: Optional[float] = None,
+              cpu: Optional[float] = None, category: str = 'build'):
+        """开始一个区间"""
+        span = TraceSpan(name, arch, category, timestamp or time.time(), cpuStart=cpu)
+        with self._lock:
+            self._open[(arch, name)] = span
+
+    def end(self, arch: str, name: str, timestamp: Optional[float] = None,
+            cpu: Optional[float] = None, status: str = 'success'):
+        """结束一个区间"""
+        with self._lock:
+            span = self._open.pop((arch, name), None)
+            if span is None:
+                return
+            span.end = timestamp or time.time()
+            span.status = status
+            if cpu is not None and span.cpuStart is not None:
+                span.cpuTime = max(cpu - span.cpuStart, 0.0)
+            self.spans.append(span)
+
+    def handle_marker(self, line: str) -> Optional[Tuple[str, str, str]]:
+        """处理构建脚本的阶段标记行，返回 (begin|end, 架构, 阶段)；不是标记行时返回None"""
+        index = line.find(STAGE_MARKER)
+        if index < 0:
+            return None
+
+        fields = line[index + len(STAGE_MARKER):].split(maxsplit=4)
+        if len(fields) < 4 or fields[0] not in ('begin', 'end'):
+            return None
+
+        event, arch, stage, timestamp = fields[:4]
+        try:
+            ts = float(timestamp)
+        except ValueError:
+            ts = time.time()
+        cpu = parse_times(fields[4]) if len(fields) > 4 else None
+
+        if event == 'begin':
+            self.begin(arch, stage, ts, cpu)
+        else:
+            self.end(arch, stage, ts, cpu)
+        return event, arch, stage
+
+    def finish(self):
+        """结束追踪，仍未结束的区间（如失败中断的阶段）记为 incomplete"""
+        now = time.time()
+        with self._lock:
+            for span in self._open.values():
+                span.end = now
+                span.status = 'incomplete'
+                self.spans.append(span)
+            self._open.clear()
+
+    def to_chrome_trace(self) -> Dict:
+        """转换为 Chrome trace-event 格式"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+
+        tracks = [GLOBAL_TRACK] + sorted({s.arch for s in spans if s.arch != GLOBAL_TRACK})
+        tids = {arch: index for index, arch in enumerate(tracks)}
+
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': 1,
+            'args': {'name': 'FFmpeg Android 编译'}
+        }]
+        for arch, tid in tids.items():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                'args': {'name': arch}
+            })
+            events.append({
+                'name': 'thread_sort_index', 'ph': 'M', 'pid': 1, 'tid': tid,
+                'args': {'sort_index': tid}
+            })
+
+        for span in spans:
+            args = {'status': span.status, 'wall_s': round(span.duration, 3)}
+            if span.cpuTime is not None:
+                args['cpu_s'] = round(span.cpuTime, 3)
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': int((span.start - self.origin) * 1e6),
+                'dur': int(span.duration * 1e6),
+                'pid': 1,
+                'tid': tids[span.arch],
+                'args': args
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, build_dir: Path) -> Path:
+        """写入 build/trace-<时间戳>.json"""
+        build_dir = Path(build_dir)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        path = build_dir / f"trace-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.origin))}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    def summary_lines(self) -> List[str]:
+        """耗时汇总表（墙钟秒 / CPU 秒）"""
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return []
+
+        lines = []
+        env_spans = [s for s in spans if s.arch == GLOBAL_TRACK]
+        if env_spans:
+            lines.append("环境准备: " + ", ".join(f"{s.name} {s.duration:.1f}s" for s in env_spans))
+
+        build_spans = [s for s in spans if s.arch != GLOBAL_TRACK and s.name in BUILD_STAGES]
+        if build_spans:
+            archs = sorted({s.arch for s in build_spans})
+            header = f"{'架构':<12}" + ''.join(f"{stage:>18}" for stage in BUILD_STAGES) + f"{'合计':>18}"
+            lines.append(header)
+            for arch in archs:
+                row = f"{arch:<12}"
+                wall_total = cpu_total = 0.0
+                for stage in BUILD_STAGES:
+                    stage_spans = [s for s in build_spans if s.arch == arch and s.name == stage]
+                    if not stage_spans:
+                        row += f"{'-':>18}"
+                        continue
+                    wall = sum(s.duration for s in stage_spans)
+                    cpu = sum(s.cpuTime or 0.0 for s in stage_spans)
+                    wall_total += wall
+                    cpu_total += cpu
+                    row += f"{wall:>10.1f}/{cpu:<7.1f}"
+                row += f"{wall_total:>10.1f}/{cpu_total:<7.1f}"
+                lines.append(row.rstrip())
+
+            longest = max(build_spans, key=lambda s: s.duration)
+            lines.append(f"最长阶段: {longest.arch} {longest.name} {longest.duration:.1f}s")
+
+            # 各架构可能并行，编译耗时取最早开始到最晚结束
+            total = max(s.end or s.start for s in build_spans) - min(s.start for s in build_spans)
+            lines.append(f"编译耗时: {total:.1f}s")
+        return lines
@@ -2,11 +2,16 @@
 工具函数模块
 """
 
+import re
 import subprocess
 import sys
 from typing import Optional, Union, List
 
 
+# 除制表符和换行外的控制字符 (C0/C1)
+_CONTROL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+
+
 def get_safe_encoding() -> str:
     """获取安全的编码格式"""
     try:
@@ -84,5 +89,8 @@ def clean_output_line(line: str) -> str:
     if not line:
         return line
     
-    cleaned = ''.join(char for char in line if char.isprintable() or char in '\n\t\r')
-    return cleaned.strip()
\ No newline at end of file
+    # 绝大多数行只含可打印字符和制表符，不需要逐字符过滤
+    cleaned = line.strip()
+    if cleaned.replace('\t', '').isprintable():
+        return cleaned
+    return _CONTROL_CHARS.sub('', cleaned).strip()
\ No newline at end of file
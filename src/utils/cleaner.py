@@ -70,6 +70,12 @@ class ProjectCleaner:
             print(f"删除目录: {build_dir}")
             shutil.rmtree(build_dir)
         
+        # 清理并行编译的树外构建目录
+        for path in self.work_dir.glob("build-*"):
+            if path.is_dir():
+                print(f"删除目录: {path}")
+                shutil.rmtree(path)
+        
         print("✅ 构建缓存清理完成")
     
     def clean_all(self):
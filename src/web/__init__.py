@@ -4,5 +4,6 @@ Web界面模块
 
 from .app import WebApp
 from .server import WebServer
+from .worker import BuildWorker, WORKER_HOST, WORKER_PORT
 
-__all__ = ['WebApp', 'WebServer']
\ No newline at end of file
+__all__ = ['WebApp', 'WebServer', 'BuildWorker', 'WORKER_HOST', 'WORKER_PORT']
\ No newline at end of file
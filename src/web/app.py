@@ -8,6 +8,7 @@ import webbrowser
 import threading
 import time
 from pathlib import Path
+from typing import List, Optional
 
 from .server import WebServer
 
@@ -15,9 +16,11 @@ from .server import WebServer
 class WebApp:
     """Web应用"""
     
-    def __init__(self, work_dir: Path):
+    def __init__(self, work_dir: Path, workers: int = 1, remote_workers: Optional[List[str]] = None,
+                 worker_token: Optional[str] = None):
         self.work_dir = Path(work_dir)
-        self.server = WebServer(work_dir)
+        self.server = WebServer(work_dir, workers=workers, remote_workers=remote_workers,
+                                worker_token=worker_token)
     
     def check_dependencies(self) -> bool:
         """检查依赖"""
@@ -41,8 +44,8 @@ class WebApp:
             else:
                 return False
     
-    def run(self, port: int = 5000, auto_open: bool = True):
-        """运行Web应用"""
+    def run(self, port: int = 5000, auto_open: bool = True, server: str = 'threaded'):
+        """运行Web应用，server 为 threaded (Flask 多线程服务器) 或 async (asyncio 服务模式)"""
         # 检查依赖
         if not self.check_dependencies():
             return False
@@ -73,7 +76,7 @@ class WebApp:
             browser_thread.start()
         
         try:
-            self.server.run(port=port)
+            self.server.run(port=port, server=server)
             return True
         except Exception as e:
             print(f"❌ 启动失败: {e}")
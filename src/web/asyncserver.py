@@ -0,0 +1,401 @@
+"""
+asyncio 服务模式
+
+基于标准库 asyncio 的 HTTP/1.1 服务器，不需要额外依赖:
+    /api/logs/stream  在事件循环中直接处理，每个 SSE 连接只是一个协程和一个日志游标，
+                      不占用线程；新日志通过 LogBroadcast 一次唤醒所有连接
+    /api/events       状态事件流和长轮询 (/api/events/poll) 同样在事件循环中处理
+    其他请求          按 WSGI 交给 Flask 应用，在固定大小的线程池中执行
+
+每个连接只保存游标，日志从 LogManager 的环形缓冲区读取，写缓冲区受传输层高水位限制，
+连接数增加时每个连接的内存保持不变。
+"""
+
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote_to_bytes
+
+from .sse import CONNECTED_EVENT, HEARTBEAT_EVENT, SSE_HEADERS, log_events, parse_last_event_id, status_events
+from .events import POLL_TIMEOUT, MAX_POLL_TIMEOUT
+from .httpcache import MIN_COMPRESS_SIZE, choose_encoding, compress
+
+# 执行 Flask 请求的线程数
+APP_THREADS = 16
+
+# SSE 保活间隔（秒）；不再需要每秒唤醒一次
+HEARTBEAT_INTERVAL = 15.0
+
+# 空闲连接（等待下一个请求）的超时（秒）
+KEEPALIVE_TIMEOUT = 30.0
+
+# 监听队列长度，大量看板同时重连时不被拒绝
+BACKLOG = 1024
+
+# 缓存的已编码日志批次数：同一时刻的各连接通常读取相同的日志，只需编码一次
+ENCODED_CACHE_SIZE = 64
+
+# 请求头行数和请求体大小上限
+MAX_HEADERS = 100
+MAX_BODY = 16 * 1024 * 1024
+
+LOG_STREAM_PATH = '/api/logs/stream'
+EVENTS_PATH = '/api/events'
+EVENTS_POLL_PATH = '/api/events/poll'
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 411: 'Length Required', 413: 'Payload Too Large',
+            414: 'URI Too Long', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str = ''):
+        super().__init__(message)
+        self.status = status
+
+
+class LogBroadcast:
+    """把写入日志（或状态事件）的线程中的通知转到事件循环，所有 SSE 连接共享同一个等待对象
+
+    每批日志最多向事件循环投递一次唤醒，连接数再多也只有一次跨线程调用。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._future = loop.create_future()
+        self._scheduled = False
+
+    def notify_threadsafe(self):
+        """有新日志（可在任意线程调用）"""
+        if self._scheduled:
+            return
+        self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _wake(self):
+        self._scheduled = False
+        future, self._future = self._future, self.loop.create_future()
+        future.set_result(None)
+
+    async def wait(self, timeout: float) -> bool:
+        """等待新日志，超时返回 False"""
+        try:
+            # shield: 超时只取消本连接的等待，不影响共享的 future
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class AsyncServer:
+    """asyncio HTTP 服务器：SSE 日志流由协程处理，其余请求转给 WSGI 应用"""
+
+    def __init__(self, app: Callable, log_manager: Any, app_threads: int = APP_THREADS,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL, status_store: Any = None):
+        self.app = app
+        self.log_manager = log_manager
+        self.status_store = status_store
+        self.heartbeat_interval = heartbeat_interval
+        self.executor = ThreadPoolExecutor(max_workers=app_threads, thread_name_prefix='http')
+        self.broadcast: Optional[LogBroadcast] = None
+        self.stream_clients = 0  # 当前的日志流连接数
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._encoded: Dict[Tuple[int, int, int], bytes] = {}  # (游标, 最后序号, 跳过条数) -> SSE 事件
+        self._encoded_events: Dict[Tuple[int, int], bytes] = {}  # (起始版本, 最后版本) -> SSE 事件
+
+    def run(self, host: str = '0.0.0.0', port: int = 5000):
+        """运行服务器直到进程退出"""
+        asyncio.run(self.serve(host, port))
+
+    async def serve(self, host: str, port: int):
+        """启动服务器并一直运行"""
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def start(self, host: str, port: int) -> int:
+        """开始监听，返回实际端口（port 为 0 时由系统分配）"""
+        self.broadcast = LogBroadcast(asyncio.get_running_loop())
+        self.log_manager.add_listener(self.broadcast.notify_threadsafe)
+        if self.status_store:
+            self.status_store.add_listener(self.broadcast.notify_threadsafe)
+        self._server = await asyncio.start_server(self._handle_connection, host, port, backlog=BACKLOG)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except _BadRequest as e:
+                    await self._write_response(writer, e.status, [('Content-Type', 'text/plain; charset=utf-8')],
+                                               str(e).encode('utf-8'), keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, query = request['method'], request['path'], request['query']
+                if method == 'GET' and path == LOG_STREAM_PATH:
+                    await self._stream_logs(writer, request['headers'], query)
+                    break
+                if method == 'GET' and self.status_store and path == EVENTS_PATH:
+                    await self._stream_events(writer, request['headers'], query)
+                    break
+                if method == 'GET' and self.status_store and path == EVENTS_POLL_PATH:
+                    if not await self._poll_events(writer, request):
+                        break
+                    continue
+                if not await self._call_app(writer, request):
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # 服务器停止时取消仍在等待的连接
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+        """读取一个请求，连接已关闭时返回None"""
+        line = await self._read_line(reader, 414, '请求行过长')
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        except ValueError:
+            raise _BadRequest(400, '无效的请求行')
+
+        headers: List[Tuple[str, str]] = []
+        while True:
+            line = await self._read_line(reader, 431, '请求头过长')
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise _BadRequest(400, '请求头过多')
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip().lower(), value.strip()))
+        header_map = dict(headers)
+
+        if 'chunked' in header_map.get('transfer-encoding', '').lower():
+            raise _BadRequest(411, '不支持分块传输的请求体')
+        try:
+            length = int(header_map.get('content-length') or 0)
+        except ValueError:
+            raise _BadRequest(400, '无效的 Content-Length')
+        if length > MAX_BODY:
+            raise _BadRequest(413, '请求体过大')
+        body = await reader.readexactly(length) if length else b''
+
+        path, _, query = target.partition('?')
+        return {'method': method.upper(), 'path': path, 'query': query, 'version': version,
+                'headers': headers, 'body': body}
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader, status: int, message: str) -> bytes:
+        """读取一行，超过 StreamReader 的长度限制时返回 status 错误并关闭连接"""
+        try:
+            return await reader.readline()
+        except ValueError:
+            raise _BadRequest(status, message)
+
+    def _environ(self, request: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        """WSGI environ (PEP 3333)"""
+        sockname = writer.get_extra_info('sockname') or ('', 0)
+        peername = writer.get_extra_info('peername') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': request['method'],
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(request['path']).decode('latin-1'),
+            'QUERY_STRING': request['query'],
+            'SERVER_NAME': str(sockname[0]),
+            'SERVER_PORT': str(sockname[1]),
+            'SERVER_PROTOCOL': request['version'],
+            'REMOTE_ADDR': str(peername[0]),
+            'CONTENT_LENGTH': str(len(request['body'])) if request['body'] else '',
+            'CONTENT_TYPE': '',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(request['body']),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in request['headers']:
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'content-length':
+                key = 'HTTP_' + name.upper().replace('-', '_')
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_app(self, environ: Dict[str, Any]) -> Tuple[str, List[Tuple[str, str]], bytes]:
+        """在线程池中执行 WSGI 应用，返回 (状态行, 响应头, 响应体)"""
+        response: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        def start_response(status, headers, exc_info=None):
+            # 响应体全部生成后才发送，出错时可以直接替换状态和响应头
+            response['status'] = status
+            response['headers'] = headers
+            return chunks.append
+
+        result = self.app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    chunks.append(chunk)
+        finally:
+            close = getattr(result, 'close', None)
+            if close:
+                close()
+        return response['status'], response['headers'], b''.join(chunks)
+
+    async def _call_app(self, writer: asyncio.StreamWriter, request: Dict[str, Any]) -> bool:
+        """把请求交给 WSGI 应用，返回连接是否可以继续使用"""
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, body = await loop.run_in_executor(
+                self.executor, self._run_app, self._environ(request, writer))
+        except Exception as e:
+            await self._write_response(writer, 500, [('Content-Type', 'text/plain; charset=utf-8')],
+                                       str(e).encode('utf-8'), keep_alive=False)
+            return False
+
+        keep_alive = self._keep_alive(request)
+        if request['method'] == 'HEAD':
+            body = b''
+        await self._write_response(writer, status, headers, body, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _keep_alive(request: Dict[str, Any]) -> bool:
+        connection = dict(request['headers']).get('connection', '').lower()
+        return (connection != 'close' if request['version'] == 'HTTP/1.1'
+                else connection == 'keep-alive')
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: Any,
+                              headers: List[Tuple[str, str]], body: bytes, keep_alive: bool):
+        if isinstance(status, int):
+            status = f"{status} {_REASONS.get(status, '')}".strip()
+        lines = [f"HTTP/1.1 {status}"]
+        names = set()
+        for name, value in headers:
+            if name.lower() in ('connection', 'transfer-encoding'):
+                continue
+            names.add(name.lower())
+            lines.append(f"{name}: {value}")
+        if 'content-length' not in names:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    def _encode_logs(self, cursor: int, logs: List[Dict[str, Any]], missed: int) -> bytes:
+        key = (cursor, logs[-1]['id'], missed)
+        data = self._encoded.get(key)
+        if data is None:
+            if len(self._encoded) >= ENCODED_CACHE_SIZE:
+                self._encoded.clear()
+            data = self._encoded[key] = log_events(logs, missed).encode('utf-8')
+        return data
+
+    def _encode_events(self, since: int, events: List[Dict[str, Any]]) -> bytes:
+        key = (since, events[-1]['version'])
+        data = self._encoded_events.get(key)
+        if data is None:
+            if len(self._encoded_events) >= ENCODED_CACHE_SIZE:
+                self._encoded_events.clear()
+            data = self._encoded_events[key] = status_events(events).encode('utf-8')
+        return data
+
+    async def _start_stream(self, writer: asyncio.StreamWriter):
+        lines = ["HTTP/1.1 200 OK", "Content-Type: text/event-stream; charset=utf-8"]
+        lines.extend(f"{name}: {value}" for name, value in SSE_HEADERS.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n' + CONNECTED_EVENT).encode('utf-8'))
+        await writer.drain()
+
+    async def _stream_logs(self, writer: asyncio.StreamWriter, headers: List[Tuple[str, str]], query: str):
+        """SSE 日志流：与 Flask 线程模式的 /api/logs/stream 事件格式相同"""
+        header_map = dict(headers)
+        cursor = parse_last_event_id(header_map.get('last-event-id') or
+                                     parse_qs(query).get('lastEventId', [''])[0])
+        # 服务重启后序号从头开始，旧游标作废
+        if cursor > self.log_manager.last_id:
+            cursor = 0
+
+        await self._start_stream(writer)
+        self.stream_clients += 1
+        try:
+            while True:
+                logs, missed = self.log_manager.read_logs(cursor)
+                if logs:
+                    writer.write(self._encode_logs(cursor, logs, missed))
+                    cursor = logs[-1]['id']
+                elif not await self.broadcast.wait(self.heartbeat_interval):
+                    writer.write(HEARTBEAT_EVENT.encode('utf-8'))
+                else:
+                    continue
+                # 客户端读得慢时在这里等待，不会在内存中堆积
+                await writer.drain()
+        finally:
+            self.stream_clients -= 1
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, headers: List[Tuple[str, str]], query: str):
+        """状态事件流：与 Flask 线程模式的 /api/events 事件格式相同"""
+        cursor = parse_last_event_id(dict(headers).get('last-event-id') or
+                                     parse_qs(query).get('since', [''])[0])
+        await self._start_stream(writer)
+        self.stream_clients += 1
+        try:
+            while True:
+                events = self.status_store.read(cursor)
+                if events:
+                    writer.write(self._encode_events(cursor, events))
+                    cursor = events[-1]['version']
+                elif not await self.broadcast.wait(self.heartbeat_interval):
+                    writer.write(HEARTBEAT_EVENT.encode('utf-8'))
+                else:
+                    continue
+                await writer.drain()
+        finally:
+            self.stream_clients -= 1
+
+    async def _poll_events(self, writer: asyncio.StreamWriter, request: Dict[str, Any]) -> bool:
+        """长轮询：等待期间只占用一个协程，返回连接是否可以继续使用"""
+        params = parse_qs(request['query'])
+        try:
+            since = int(params.get('since', ['0'])[0])
+            timeout = float(params.get('timeout', [POLL_TIMEOUT])[0])
+        except ValueError:
+            since, timeout = 0, POLL_TIMEOUT
+        timeout = min(max(timeout, 0), MAX_POLL_TIMEOUT)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        events = self.status_store.read(since)
+        while not events:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await self.broadcast.wait(remaining):
+                break
+            events = self.status_store.read(since)
+
+        body = json.dumps({'success': True, 'version': events[-1]['version'] if events else since,
+                           'events': events}).encode('utf-8')
+        headers = [('Content-Type', 'application/json'), ('Cache-Control', 'no-cache'),
+                   ('Vary', 'Accept-Encoding')]
+        encoding = choose_encoding(dict(request['headers']).get('accept-encoding'))
+        if encoding and len(body) >= MIN_COMPRESS_SIZE:
+            body = compress(body, encoding)
+            headers.append(('Content-Encoding', encoding))
+        keep_alive = self._keep_alive(request)
+        await self._write_response(writer, 200, headers, body, keep_alive)
+        return keep_alive
@@ -0,0 +1,142 @@
+"""
+编译状态事件
+
+各编译任务的状态、阶段变化和日志按版本号排成一个事件序列，供 /api/events (SSE) 和
+/api/events/poll?since=<版本号> (长轮询) 推送:
+    {"type": "snapshot", "version": N, "jobs": {任务ID: 状态}, "logs": [...]}
+                                              新连接或落后太多时的完整状态
+    {"type": "status", "version": N, "job": 任务ID, "status": {...}}
+                                              任务状态变化（内容与 /api/compilation-status 相同）
+    {"type": "stage", "version": N, "job": 任务ID, "arch": 架构或null, "from": ..., "to": ...}
+                                              任务状态 (queued/running/...) 或某个架构的编译阶段变化
+    {"type": "logs", "version": N, "logs": [...], "missed": 跳过条数}
+                                              新日志（与 /api/logs/stream 的日志条目相同）
+状态变化写入后立即唤醒等待的连接，不需要客户端轮询。
+"""
+
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# 保留的事件数，客户端落后更多时改为发送完整状态
+MAX_EVENTS = 2000
+
+# 完整状态中保留的任务数（最近的）
+MAX_SNAPSHOT_JOBS = 100
+
+# 长轮询的默认和最长等待时间（秒）
+POLL_TIMEOUT = 25.0
+MAX_POLL_TIMEOUT = 60.0
+
+
+class StatusStore:
+    """线程安全、带版本号的编译状态存储
+
+    log_manager 不为None时注册为其监听器，把新日志也作为事件写入。
+    """
+
+    def __init__(self, log_manager: Any = None, max_events: int = MAX_EVENTS):
+        self.log_manager = log_manager
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._version = 1  # 从 1 开始，客户端的版本号 0 表示还没有任何状态
+        self._log_cursor = log_manager.last_id if log_manager else 0
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []  # 有新事件时调用（在写入事件的线程中）
+        if log_manager:
+            log_manager.add_listener(self._on_logs)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def add_listener(self, listener: Callable[[], None]):
+        """注册新事件通知，listener 不能阻塞"""
+        self._listeners.append(listener)
+
+    def publish(self, job_id: int, status: Dict[str, Any]) -> bool:
+        """写入任务的最新状态，与上次相同时忽略；返回是否有变化"""
+        with self._condition:
+            previous = self._jobs.get(job_id)
+            if previous == status:
+                return False
+            self._jobs[job_id] = status
+            if len(self._jobs) > MAX_SNAPSHOT_JOBS:
+                del self._jobs[min(self._jobs)]
+
+            for arch, old, new in self._stage_changes(previous, status):
+                self._append({'type': 'stage', 'job': job_id, 'arch': arch, 'from': old, 'to': new})
+            self._append({'type': 'status', 'job': job_id, 'status': status})
+            self._condition.notify_all()
+        self._notify()
+        return True
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def read(self, since: int) -> List[Dict[str, Any]]:
+        """版本号大于 since 的事件；since 为 0、已不在保留范围内或大于当前版本（服务重启）时只返回完整状态"""
+        with self._condition:
+            return self._read(since)
+
+    def wait(self, since: int, timeout: float) -> List[Dict[str, Any]]:
+        """等待版本号大于 since 的事件，超时返回空列表"""
+        with self._condition:
+            if since == self._version:
+                self._condition.wait(timeout)
+            return self._read(since)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return self._snapshot()
+
+    def _read(self, since: int) -> List[Dict[str, Any]]:
+        if since == self._version:
+            return []
+        oldest = self._events[0]['version'] if self._events else self._version + 1
+        if since <= 0 or since > self._version or since < oldest - 1:
+            return [self._snapshot()]
+        # 版本号连续，可以直接定位
+        start = len(self._events) - (self._version - since)
+        return [self._events[index] for index in range(start, len(self._events))]
+
+    def _snapshot(self) -> Dict[str, Any]:
+        logs = []
+        if self.log_manager:
+            logs = [entry for entry in self.log_manager.get_logs() if entry['id'] <= self._log_cursor]
+        return {'type': 'snapshot', 'version': self._version, 'jobs': dict(self._jobs), 'logs': logs}
+
+    def _append(self, event: Dict[str, Any]):
+        self._version += 1
+        event['version'] = self._version
+        self._events.append(event)
+
+    def _on_logs(self):
+        """LogManager 有新日志时调用：把游标之后的日志作为一个事件写入"""
+        with self._condition:
+            logs, missed = self.log_manager.read_logs(self._log_cursor)
+            if not logs:
+                return
+            self._log_cursor = logs[-1]['id']
+            self._append({'type': 'logs', 'logs': logs, 'missed': missed})
+            self._condition.notify_all()
+        self._notify()
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    @staticmethod
+    def _stage_changes(previous: Optional[Dict[str, Any]], status: Dict[str, Any]) -> List[tuple]:
+        """(架构, 原阶段, 新阶段) 列表，架构为None表示任务状态的变化"""
+        changes = []
+        old_state = previous.get('state') if previous else None
+        if status.get('state') != old_state:
+            changes.append((None, old_state, status.get('state')))
+        old_archs = previous.get('archs') or {} if previous else {}
+        for arch, info in (status.get('archs') or {}).items():
+            old_stage = (old_archs.get(arch) or {}).get('stage')
+            if info.get('stage') != old_stage:
+                changes.append((arch, old_stage, info.get('stage')))
+        return changes
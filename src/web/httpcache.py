@@ -0,0 +1,176 @@
+"""
+HTTP 缓存与压缩
+
+Flask 应用的 after_request 钩子，处理 GET/HEAD 的 200 响应:
+    ETag          沿用响应已有的（静态文件、预设），没有时按响应体的 SHA-1 生成
+    304           If-None-Match 与 ETag 相同，或没有 If-None-Match 时 If-Modified-Since 不早于 Last-Modified
+    压缩          文本、JSON、JS 响应按 Accept-Encoding 使用 brotli（已安装 brotli 包时）或 gzip，
+                  压缩后的响应体按 (路径, ETag, 编码) 缓存，静态文件和预设只压缩一次
+SSE 日志流和已经编码过的响应不处理。
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该大小的响应不压缩
+MIN_COMPRESS_SIZE = 512
+
+# 大于该大小的响应不读入内存处理
+MAX_BUFFER_SIZE = 8 * 1024 * 1024
+
+# 缓存的压缩结果数
+COMPRESS_CACHE_SIZE = 64
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+
+def http_date(timestamp: float) -> str:
+    """Last-Modified 等头使用的 GMT 时间"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按 Accept-Encoding 的权重选择压缩方式，权重相同时 br 优先；不接受压缩时返回None"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否包含 ETag（弱比较，忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tag = _strip_weak(etag)
+    return any(_strip_weak(candidate.strip()) == tag for candidate in if_none_match.split(','))
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[str]) -> bool:
+    """Last-Modified 不晚于 If-Modified-Since"""
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """按 choose_encoding 选出的方式压缩"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class ResponseCache:
+    """条件请求和响应压缩，压缩结果在各请求线程间共享"""
+
+    def __init__(self, cache_size: int = COMPRESS_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._compressed: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def process(self, response: Any, request: Any) -> Any:
+        """处理 Flask 响应：加 ETag，满足条件请求时改为 304，否则按需压缩"""
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        if response.mimetype == 'text/event-stream' or 'Content-Encoding' in response.headers:
+            return response
+        length = response.content_length
+        if length is not None and length > MAX_BUFFER_SIZE:
+            return response
+
+        # 静态文件默认直接透传文件对象，读出内容后才能计算和压缩
+        response.direct_passthrough = False
+        body = response.get_data()
+
+        etag = response.headers.get('ETag')
+        if not etag:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            response.headers['ETag'] = etag
+        if 'Cache-Control' not in response.headers:
+            # 允许缓存，但每次使用前向服务器确认，未变化时只返回 304
+            response.headers['Cache-Control'] = 'no-cache'
+
+        compressible = self._compressible(response.mimetype)
+        if compressible:
+            self._add_vary(response)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if etag_matches(if_none_match, etag) or (
+                not if_none_match and not_modified_since(request.headers.get('If-Modified-Since'),
+                                                         response.headers.get('Last-Modified'))):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Length', None)
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if not compressible or encoding is None or len(body) < MIN_COMPRESS_SIZE:
+            return response
+
+        response.set_data(self._get_compressed((request.path, etag, encoding), body))
+        response.headers['Content-Encoding'] = encoding
+        # 压缩后的内容与原内容不逐字节相同，改为弱 ETag
+        response.headers['ETag'] = 'W/' + _strip_weak(etag)
+        return response
+
+    def _get_compressed(self, key: Tuple[str, str, str], body: bytes) -> bytes:
+        with self._lock:
+            data = self._compressed.get(key)
+            if data is not None:
+                self._compressed.move_to_end(key)
+                return data
+        data = compress(body, key[2])
+        with self._lock:
+            self._compressed[key] = data
+            while len(self._compressed) > self.cache_size:
+                self._compressed.popitem(last=False)
+        return data
+
+    @staticmethod
+    def _compressible(mimetype: Optional[str]) -> bool:
+        return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _add_vary(response: Any):
+        vary = response.headers.get('Vary')
+        if not vary:
+            response.headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            response.headers['Vary'] = vary + ', Accept-Encoding'
@@ -0,0 +1,218 @@
+"""
+编译任务队列
+
+提交的编译配置按优先级排队（数值大的优先，相同时先提交的优先），由固定数量的工作线程执行。
+同时运行的任务不能使用同一组目录:
+    树外构建的任务按架构占用 build-<arch>/ 和 ffmpeg-android-<arch>/，架构不重叠的任务可以并发
+    在 ffmpeg/ 源码目录中构建的任务独占整个工作目录
+排在前面的任务暂时无法运行时，后面与它不冲突的任务可以先运行，但不会让它一直等待。
+"""
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from ..core.config import BuildConfig
+
+# 独占整个工作目录
+EXCLUSIVE = '*'
+
+# 内存中保留的已结束任务数
+MAX_FINISHED_JOBS = 100
+
+
+class JobState:
+    """任务状态"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    FINISHED = (SUCCESS, FAILED, CANCELLED)
+
+
+def job_resources(config: BuildConfig) -> FrozenSet[str]:
+    """任务运行时占用的目录"""
+    build_opts = config.buildOptions
+    # 与 ScriptGenerator._uses_build_dirs 一致；编排器总是使用 build-<arch>/
+    if build_opts.executor == 'orchestrator' or build_opts.parallel or build_opts.incremental:
+        return frozenset(f"arch:{arch}" for arch in config.architectures)
+    return frozenset([EXCLUSIVE])
+
+
+def _conflicts(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    if not a or not b:
+        return False
+    return EXCLUSIVE in a or EXCLUSIVE in b or bool(a & b)
+
+
+@dataclass
+class Job:
+    """编译任务"""
+    id: int
+    config: BuildConfig
+    priority: int = 0
+    name: str = ''
+    state: str = JobState.QUEUED
+    submitTime: float = field(default_factory=time.time)
+    startTime: Optional[float] = None
+    endTime: Optional[float] = None
+    cancelRequested: bool = False
+    resources: FrozenSet[str] = frozenset()
+    status: Any = None  # 本任务的 CompilationStatus
+    context: Dict[str, Any] = field(default_factory=dict)  # 执行方保存的运行时对象（编译器、日志等）
+
+    @property
+    def finished(self) -> bool:
+        return self.state in JobState.FINISHED
+
+
+class JobQueue:
+    """编译任务队列与工作线程池
+
+    runner(job) 在工作线程中执行任务，返回是否成功；status_factory(job) 为每个任务创建独立的状态对象；
+    on_change(job) 在任务提交、开始、结束或排队时被取消后调用（不持有队列的锁），其他任务的排队位置可能随之变化。
+    """
+
+    def __init__(self, runner: Callable[[Job], bool], workers: int = 1,
+                 status_factory: Optional[Callable[[Job], Any]] = None, first_id: int = 1,
+                 on_change: Optional[Callable[[Job], None]] = None):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.status_factory = status_factory
+        self.on_change = on_change
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(first_id)
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """启动工作线程"""
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._worker, name=f'build-worker-{len(self._threads) + 1}',
+                                      daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, config: BuildConfig, priority: int = 0, name: str = '') -> Job:
+        """提交任务"""
+        with self._condition:
+            job = Job(next(self._ids), config, priority=priority, name=name,
+                      resources=job_resources(config))
+            if self.status_factory:
+                job.status = self.status_factory(job)
+            self._jobs[job.id] = job
+            self._condition.notify_all()
+        self._changed(job)
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """全部任务，最近提交的在前"""
+        with self._condition:
+            return sorted(self._jobs.values(), key=lambda job: job.id, reverse=True)
+
+    def latest(self) -> Optional[Job]:
+        """最近提交的任务"""
+        with self._condition:
+            return self._jobs[max(self._jobs)] if self._jobs else None
+
+    def running(self) -> List[Job]:
+        with self._condition:
+            return [job for job in self._jobs.values() if job.state == JobState.RUNNING]
+
+    def position(self, job: Job) -> Optional[int]:
+        """排队中的任务前面还有几个任务，未在排队时返回None"""
+        with self._condition:
+            queued = self._queued()
+        return queued.index(job) if job in queued else None
+
+    def cancel(self, job_id: int) -> bool:
+        """取消排队中的任务；运行中的任务只标记，由执行方终止"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancelRequested = True
+            if job.state != JobState.QUEUED:
+                return True
+            job.state = JobState.CANCELLED
+            job.endTime = time.time()
+            self._condition.notify_all()
+        self._changed(job)
+        return True
+
+    def to_dict(self, job: Job) -> Dict[str, Any]:
+        """任务摘要"""
+        return {
+            'id': job.id,
+            'name': job.name,
+            'priority': job.priority,
+            'state': job.state,
+            'archs': list(job.config.architectures),
+            'executor': job.config.buildOptions.executor,
+            'submitTime': job.submitTime,
+            'startTime': job.startTime,
+            'endTime': job.endTime,
+            'queuePosition': self.position(job),
+            'status': job.status.to_dict() if job.status is not None else None
+        }
+
+    def _queued(self) -> List[Job]:
+        queued = [job for job in self._jobs.values() if job.state == JobState.QUEUED]
+        return sorted(queued, key=lambda job: (-job.priority, job.id))
+
+    def _next_runnable(self) -> Optional[Job]:
+        """按顺序取第一个可运行的任务；跳过的任务占用的目录后面的任务也不能使用"""
+        busy = frozenset().union(*(job.resources for job in self._jobs.values()
+                                   if job.state == JobState.RUNNING))
+        blocked = frozenset()
+        for job in self._queued():
+            if not _conflicts(job.resources, busy) and not _conflicts(job.resources, blocked):
+                return job
+            blocked |= job.resources
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_runnable()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_runnable()
+                job.state = JobState.RUNNING
+                job.startTime = time.time()
+            self._changed(job)
+
+            try:
+                success = self.runner(job)
+            except Exception:
+                success = False
+
+            with self._condition:
+                if job.cancelRequested:
+                    job.state = JobState.CANCELLED
+                else:
+                    job.state = JobState.SUCCESS if success else JobState.FAILED
+                job.endTime = time.time()
+                self._prune()
+                self._condition.notify_all()
+            self._changed(job)
+
+    def _changed(self, job: Job):
+        if self.on_change:
+            try:
+                self.on_change(job)
+            except Exception:
+                pass
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.id)
+        for job in finished[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job.id]
@@ -0,0 +1,423 @@
+"""
+远程编译节点的协调端
+
+注册了远程编译节点 (python main.py --worker) 时，WebServer 把任务的各架构作为编译单元分发到各节点:
+    每个架构交给当前分配的单元最少的可用节点，节点无法接收时换下一个节点；
+    没有可用节点或所有节点都无法接收时由 WebServer 改为本机编译
+    节点的日志和进度通过事件流实时转发到任务日志和编译状态，连接断开后从收到的位置继续
+    编译成功后下载安装目录的 tar.gz，解压到本机的 ffmpeg-android-<arch>/，
+    并把 .pc 文件中节点上的安装路径改为本机路径
+全部架构完成后由协调端生成体积报告和打包。
+"""
+
+import hmac
+import http.client
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..core.orchestrator import StepStatus
+from ..core.trace import BuildTracer
+from .worker import TOKEN_HEADER
+
+# 普通请求的超时（秒）
+REQUEST_TIMEOUT = 10.0
+
+# 事件流和下载的读取超时（秒），需大于节点事件流的保活间隔
+STREAM_TIMEOUT = 60.0
+
+# 事件流断开后的重连次数
+STREAM_RETRIES = 3
+
+
+class WorkerError(Exception):
+    """远程编译节点请求失败"""
+
+
+class RemoteWorker:
+    """远程编译节点的 HTTP 客户端"""
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.token = token  # 节点的 --worker-token，随每个请求发送
+        parts = urlsplit(self.url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise ValueError(f"无效的编译节点地址: {url}")
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self.name = parts.netloc
+        self.active = 0  # 本协调端分配给该节点、尚未结束的单元数
+        self.info: Optional[Dict[str, Any]] = None
+        self.lastError: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        """已获取到节点信息，且之后的请求没有连接失败"""
+        return self.lastError is None and self.info is not None
+
+    def refresh(self) -> bool:
+        """更新节点信息，返回节点是否可用"""
+        try:
+            self.info = self._request('GET', '/api/worker')['worker']
+        except WorkerError as e:
+            self.lastError = str(e)
+            return False
+        self.name = self.info.get('name') or self.name
+        self.lastError = None
+        return True
+
+    def submit(self, config_data: Dict[str, Any], arch: str) -> int:
+        """提交编译单元，返回单元ID"""
+        return self._request('POST', '/api/units', {'config': config_data, 'arch': arch})['unit']['id']
+
+    def events(self, unit_id: int, since: int = 0) -> Iterator[Dict[str, Any]]:
+        """单元的事件流（不含保活），单元结束后结束"""
+        connection = http.client.HTTPConnection(self._host, self._port, timeout=STREAM_TIMEOUT)
+        try:
+            connection.request('GET', f'/api/units/{unit_id}/stream?since={since}', headers=self._headers())
+            response = connection.getresponse()
+            if response.status != 200:
+                raise WorkerError(f"{self.name}: 事件流返回 {response.status}")
+            for line in response:
+                event = json.loads(line) if line.strip() else None
+                if event and event.get('type') != 'heartbeat':
+                    yield event
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise WorkerError(f"{self.name}: {e}")
+        finally:
+            connection.close()
+
+    def download(self, unit_id: int, target: Path):
+        """下载单元的产物"""
+        connection = http.client.HTTPConnection(self._host, self._port, timeout=STREAM_TIMEOUT)
+        try:
+            connection.request('GET', f'/api/units/{unit_id}/artifact', headers=self._headers())
+            response = connection.getresponse()
+            if response.status != 200:
+                raise WorkerError(f"{self.name}: 下载产物返回 {response.status}")
+            with open(target, 'wb') as f:
+                shutil.copyfileobj(response, f)
+            expected = response.getheader('Content-Length')
+            if expected and int(expected) != target.stat().st_size:
+                raise WorkerError(f"{self.name}: 产物下载不完整")
+        except (OSError, http.client.HTTPException) as e:
+            raise WorkerError(f"{self.name}: {e}")
+        finally:
+            connection.close()
+
+    def cancel(self, unit_id: int) -> bool:
+        try:
+            self._request('POST', f'/api/units/{unit_id}/cancel')
+            return True
+        except WorkerError:
+            return False
+
+    def release(self, unit_id: int):
+        """通知节点释放单元的日志和产物"""
+        try:
+            self._request('DELETE', f'/api/units/{unit_id}')
+        except WorkerError:
+            pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'name': self.name,
+            'active': self.active,
+            'available': self.available,
+            'info': self.info,
+            'error': self.lastError
+        }
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        connection = http.client.HTTPConnection(self._host, self._port, timeout=REQUEST_TIMEOUT)
+        try:
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = self._headers()
+            if body is not None:
+                headers['Content-Type'] = 'application/json'
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = json.loads(response.read().decode('utf-8') or '{}')
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            # 连接失败时标记为不可用，refresh 成功后恢复
+            self.lastError = f"{self.name}: {e}"
+            raise WorkerError(self.lastError)
+        finally:
+            connection.close()
+        if not data.get('success'):
+            raise WorkerError(f"{self.name}: {data.get('error') or response.status}")
+        return data
+
+    def _headers(self) -> Dict[str, str]:
+        return {TOKEN_HEADER: self.token} if self.token else {}
+
+
+class WorkerPool:
+    """已注册的远程编译节点"""
+
+    def __init__(self, token: Optional[str] = None):
+        self.token = token  # 节点和协调端共享的令牌
+        self._workers: Dict[str, RemoteWorker] = {}
+        self._lock = threading.Lock()
+
+    def register(self, url: str, check: bool = True) -> RemoteWorker:
+        """注册节点，check 为 True 时要求节点可以连接；已注册时更新节点信息"""
+        worker = RemoteWorker(url, self.token)
+        with self._lock:
+            worker = self._workers.setdefault(worker.url, worker)
+        if not worker.refresh() and check:
+            with self._lock:
+                if not worker.active:
+                    self._workers.pop(worker.url, None)
+            raise WorkerError(worker.lastError)
+        return worker
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """节点注册请求中的令牌是否一致；协调端未设置令牌时不接受注册"""
+        if not self.token:
+            return False
+        return hmac.compare_digest((token or '').encode('utf-8'), self.token.encode('utf-8'))
+
+    def unregister(self, url: str) -> bool:
+        with self._lock:
+            return self._workers.pop(url.rstrip('/'), None) is not None
+
+    def workers(self) -> List[RemoteWorker]:
+        with self._lock:
+            return list(self._workers.values())
+
+    def available(self, refresh: bool = True) -> List[RemoteWorker]:
+        """可用的节点；refresh 为 True 时先重新连接不可用的节点，节点恢复后重新使用"""
+        workers = self.workers()
+        if refresh:
+            for worker in workers:
+                if not worker.available:
+                    worker.refresh()
+        return [worker for worker in workers if worker.available]
+
+    def acquire(self, exclude: Tuple[RemoteWorker, ...] = ()) -> Optional[RemoteWorker]:
+        """选择分配的单元最少的可用节点（相同时按注册顺序）"""
+        with self._lock:
+            candidates = [worker for worker in self._workers.values()
+                          if worker.available and worker not in exclude]
+            if not candidates:
+                return None
+            worker = min(candidates, key=lambda candidate: candidate.active)
+            worker.active += 1
+            return worker
+
+    def release(self, worker: RemoteWorker):
+        with self._lock:
+            worker.active -= 1
+
+
+class RemoteBuild:
+    """一个编译任务的远程编译：每个架构一个编译单元
+
+    cancel/get_build_states 与 CompilerManager 的同名方法用法相同；tracer 不为None时
+    把每个架构从提交到取回安装目录的耗时记为 remote 阶段。
+    """
+
+    def __init__(self, pool: WorkerPool, work_dir: Path, config_data: Dict[str, Any], archs: List[str],
+                 log_batch_callback: Callable[[List[Tuple[str, str]]], None],
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 tracer: Optional[BuildTracer] = None):
+        self.pool = pool
+        self.work_dir = Path(work_dir)
+        self.config_data = config_data
+        self.archs = list(archs)
+        self.log_batch_callback = log_batch_callback
+        self.progress_callback = progress_callback
+        self.tracer = tracer
+        self._states: Dict[str, Dict[str, Any]] = {
+            arch: {'status': StepStatus.PENDING, 'worker': None, 'unit': None, 'error': None} for arch in self.archs}
+        self._units: Dict[str, Tuple[RemoteWorker, int]] = {}
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def run(self) -> bool:
+        """并发编译各架构，全部成功时返回 True"""
+        threads = [threading.Thread(target=self._build_arch, args=(arch,), name=f'remote-{arch}', daemon=True)
+                   for arch in self.archs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self._lock:
+            return all(state['status'] == StepStatus.SUCCESS for state in self._states.values())
+
+    def cancel(self, arch: Optional[str] = None) -> bool:
+        """取消一个架构，未指定时取消全部；尚未提交的架构不再提交"""
+        with self._lock:
+            if arch is None:
+                self._cancelled = True
+                targets = list(self._states)
+            elif arch in self._states:
+                targets = [arch]
+                self._states[arch]['cancelRequested'] = True
+            else:
+                return False
+            units = {target: self._units[target] for target in targets if target in self._units}
+        results = [worker.cancel(unit_id) for worker, unit_id in units.values()]
+        # 尚未提交的架构在提交前停止
+        return arch is None or arch not in units or all(results)
+
+    @property
+    def dispatched(self) -> bool:
+        """是否有架构已提交到节点"""
+        with self._lock:
+            return any(state['unit'] is not None for state in self._states.values())
+
+    def get_build_states(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {arch: {key: value for key, value in state.items() if key != 'cancelRequested'}
+                    for arch, state in self._states.items()}
+
+    def _log(self, message: str, level: str = 'info'):
+        self.log_batch_callback([(message, level)])
+
+    def _set_state(self, arch: str, **kwargs):
+        with self._lock:
+            self._states[arch].update(kwargs)
+
+    def _cancel_requested(self, arch: str) -> bool:
+        with self._lock:
+            return self._cancelled or self._states[arch].get('cancelRequested', False)
+
+    def _build_arch(self, arch: str):
+        tried: Tuple[RemoteWorker, ...] = ()
+        while True:
+            if self._cancel_requested(arch):
+                self._set_state(arch, status=StepStatus.CANCELLED, error='已取消')
+                return
+            worker = self.pool.acquire(exclude=tried)
+            if worker is None:
+                self._set_state(arch, status=StepStatus.FAILED, error='没有可用的远程编译节点')
+                self._log(f"❌ {arch}: 没有可用的远程编译节点", 'error')
+                return
+            try:
+                unit_id = worker.submit(self.config_data, arch)
+                break
+            except WorkerError as e:
+                self.pool.release(worker)
+                tried += (worker,)
+                self._log(f"⚠️ {arch}: 节点 {worker.name} 无法接收编译单元: {e}", 'warning')
+
+        with self._lock:
+            self._units[arch] = (worker, unit_id)
+            self._states[arch].update(status=StepStatus.RUNNING, worker=worker.name, unit=unit_id)
+        self._log(f"🛰️ {arch} → {worker.name} (单元 #{unit_id})", 'info')
+        start = time.time()
+        try:
+            result = self._follow(worker, unit_id, arch)
+            if not result.get('success'):
+                raise WorkerError(result.get('error') or '编译失败')
+            self._install(worker, unit_id, arch, result.get('prefix'))
+            self._set_state(arch, status=StepStatus.SUCCESS)
+            self._log(f"✅ {arch}: 已从 {worker.name} 取回安装目录", 'success')
+            self._update_progress(arch, {'stage': 'completed', 'percent': 100.0, 'eta': 0}, worker)
+        except (WorkerError, OSError, tarfile.TarError) as e:
+            status = StepStatus.CANCELLED if self._cancel_requested(arch) else StepStatus.FAILED
+            self._set_state(arch, status=status, error=str(e))
+            self._log(f"❌ {arch} ({worker.name}): {e}", 'error')
+        finally:
+            self.pool.release(worker)
+            worker.release(unit_id)
+            if self.tracer:
+                with self._lock:
+                    status = self._states[arch]['status']
+                self.tracer.add(arch, 'remote', start, time.time(), status=status)
+
+    def _follow(self, worker: RemoteWorker, unit_id: int, arch: str) -> Dict[str, Any]:
+        """转发单元的日志和进度，返回结果事件；连接断开时从已收到的事件之后继续"""
+        since = 0
+        retries = 0
+        prefix = f"[{worker.name}] "
+        while True:
+            try:
+                for event in worker.events(unit_id, since):
+                    since += 1
+                    retries = 0
+                    if event['type'] == 'logs':
+                        self.log_batch_callback([(prefix + message, level)
+                                                 for _, level, message in event['lines']])
+                    elif event['type'] == 'progress':
+                        info = event['info']
+                        arch_info = (info.get('archs') or {}).get(arch) or {
+                            'stage': info.get('stage'), 'percent': info.get('percent'), 'eta': info.get('eta')}
+                        self._update_progress(arch, arch_info, worker, info.get('message', ''))
+                    elif event['type'] == 'result':
+                        return event
+                error = '事件流意外结束'
+            except WorkerError as e:
+                error = str(e)
+            retries += 1
+            if retries > STREAM_RETRIES:
+                raise WorkerError(f"与节点的连接中断: {error}")
+            self._log(f"⚠️ {arch}: 与 {worker.name} 的连接中断，{retries} 秒后重连 ({error})", 'warning')
+            time.sleep(retries)
+
+    def _update_progress(self, arch: str, arch_info: Dict[str, Any], worker: RemoteWorker, message: str = ''):
+        """各架构进度的平均值作为总进度，未开始的架构按 0 计"""
+        if not self.progress_callback:
+            return
+        with self._lock:
+            self._progress[arch] = dict(arch_info, worker=worker.name)
+            archs = {name: dict(info) for name, info in self._progress.items()}
+        percents = [info.get('percent') for info in archs.values() if info.get('percent') is not None]
+        etas = [info.get('eta') for info in archs.values()]
+        self.progress_callback({
+            'stage': arch_info.get('stage') or 'building',
+            'message': f"[{worker.name}] {message}" if message else f"{arch}: {arch_info.get('stage')}",
+            'percent': sum(percents) / len(self.archs) if percents else None,
+            'eta': max(etas) if len(archs) == len(self.archs) and None not in etas else None,
+            'archs': archs
+        })
+
+    def _install(self, worker: RemoteWorker, unit_id: int, arch: str, remote_prefix: Optional[str]):
+        """下载并解压安装目录到 ffmpeg-android-<arch>/，替换已有的目录"""
+        target = self.work_dir / f"ffmpeg-android-{arch}"
+        staging = Path(tempfile.mkdtemp(prefix=f".remote-{arch}-", dir=self.work_dir))
+        try:
+            archive = staging / f"{target.name}.tar.gz"
+            worker.download(unit_id, archive)
+            with tarfile.open(archive, 'r:gz') as tar:
+                members = tar.getmembers()
+                for member in members:
+                    name = member.name
+                    if os.path.isabs(name) or '..' in Path(name).parts or Path(name).parts[0] != target.name:
+                        raise WorkerError(f"产物中有无效的路径: {name}")
+                extract_kwargs = {}
+                if hasattr(tarfile, 'data_filter'):
+                    extract_kwargs['filter'] = 'data'
+                tar.extractall(staging, members=members, **extract_kwargs)
+
+            extracted = staging / target.name
+            if remote_prefix:
+                _rewrite_pkgconfig(extracted, remote_prefix, target)
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(extracted, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _rewrite_pkgconfig(prefix: Path, remote_prefix: str, local_prefix: Path):
+    """把 .pc 文件中节点上的安装路径改为本机路径"""
+    pkgconfig_dir = prefix / "lib" / "pkgconfig"
+    if not pkgconfig_dir.is_dir():
+        return
+    local = local_prefix.as_posix()
+    for pc_file in pkgconfig_dir.glob("*.pc"):
+        text = pc_file.read_text(encoding='utf-8')
+        if remote_prefix in text:
+            pc_file.write_text(text.replace(remote_prefix, local), encoding='utf-8')
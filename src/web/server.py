@@ -3,107 +3,208 @@ Web服务器
 """
 
 import json
-import queue
+import os
+import shutil
 import threading
 import time
+from dataclasses import replace
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from flask import Flask, render_template, request, jsonify, send_from_directory, Response
 
 from ..core import ConfigManager, EnvironmentManager, CompilerManager
+from ..core.config import BuildConfig, BuildOptions
+from ..core.trace import BuildTracer
+from ..core.sizereport import REPORT_FILE
+from ..core.logstore import LogStore, LOG_LEVELS
+from .jobs import Job, JobQueue, JobState
+from .sse import CONNECTED_EVENT, HEARTBEAT_EVENT, SSE_HEADERS, log_events, parse_last_event_id, status_events
+from .events import StatusStore, POLL_TIMEOUT, MAX_POLL_TIMEOUT
+from .asyncserver import AsyncServer
+from .httpcache import ResponseCache, http_date
+from .remote import RemoteBuild, WorkerError, WorkerPool
+from .worker import TOKEN_HEADER
+
+# 各任务的编译脚本、耗时记录、体积报告和产物保存在 build/jobs/<任务ID>/
+JOBS_DIR = "jobs"
+
+# 保留的任务目录数量，超出时删除最早的
+MAX_JOB_DIRS = 20
 
 
 class CompilationStatus:
-    """编译状态管理"""
+    """编译状态管理
+    
+    由编译任务的工作线程更新、请求线程读取，读写都持有锁；on_change 在每次更新后调用（不持有锁）。
+    """
     
-    def __init__(self):
-        self.reset()
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        self._lock = threading.Lock()
+        self.on_change = on_change
+        self._clear()
     
     def reset(self):
         """重置状态"""
+        with self._lock:
+            self._clear()
+        self._changed()
+    
+    def _clear(self):
         self.running = False
         self.completed = False
         self.success = False
         self.progress = 0
         self.status = ''
         self.error = None
+        self.buildId = None  # 本次编译的日志ID，可用于 /api/logs?build=
+        self.eta = None  # 预计剩余秒数，无法估计时为None
+        self.archs = {}  # 各架构的阶段、已编译/总目标数、进度和剩余秒数
     
     def update(self, **kwargs):
         """更新状态"""
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+        with self._lock:
+            for key, value in kwargs.items():
+                if hasattr(self, key) and not key.startswith('_'):
+                    setattr(self, key, value)
+        self._changed()
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
-        return {
-            'running': self.running,
-            'completed': self.completed,
-            'success': self.success,
-            'progress': self.progress,
-            'status': self.status,
-            'error': self.error
-        }
+        with self._lock:
+            return {
+                'running': self.running,
+                'completed': self.completed,
+                'success': self.success,
+                'progress': self.progress,
+                'status': self.status,
+                'error': self.error,
+                'buildId': self.buildId,
+                'eta': self.eta,
+                'archs': {arch: dict(info) for arch, info in self.archs.items()}
+            }
+    
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
 
 
 class LogManager:
-    """日志管理"""
+    """日志管理
+    
+    固定容量的环形缓冲区，每条日志带单调递增的序号 (id)。各 SSE 客户端按自己的游标读取，
+    断线重连时通过 Last-Event-ID 从断开处继续；追加日志为 O(1)，不复制列表。
+    线程模式下客户端通过 wait_logs 阻塞等待；asyncio 服务模式通过 add_listener 注册通知。
+    """
     
     def __init__(self, max_lines: int = 1000):
-        self.log_queue = queue.Queue()
-        self.log_cache = []
         self.max_lines = max_lines
+        self._buffer: List[Optional[Dict[str, Any]]] = [None] * max_lines
+        self._next_id = 1  # 下一条日志的序号
+        self._first_id = 1  # 清空日志后第一条日志的序号
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []  # 有新日志时调用（在写入日志的线程中）
     
     def add_log(self, message: str, level: str = 'info'):
         """添加日志"""
+        self.add_logs([(message, level)])
+    
+    def add_logs(self, entries: list):
+        """批量添加日志，entries 为 (消息, 级别) 列表"""
         timestamp = time.strftime('%H:%M:%S')
-        log_entry = {
-            'timestamp': timestamp,
-            'level': level,
-            'message': str(message).strip()
-        }
-        
-        try:
-            self.log_queue.put_nowait(log_entry)
-        except queue.Full:
-            pass
-        
-        self.log_cache.append(log_entry)
-        
-        if len(self.log_cache) > self.max_lines:
-            self.log_cache = self.log_cache[-self.max_lines:]
+        with self._condition:
+            for message, level in entries:
+                log_id = self._next_id
+                self._buffer[log_id % self.max_lines] = {
+                    'id': log_id,
+                    'timestamp': timestamp,
+                    'level': level,
+                    'message': str(message).strip()
+                }
+                self._next_id = log_id + 1
+            self._condition.notify_all()
+        for listener in self._listeners:
+            listener()
+    
+    def add_listener(self, listener: Callable[[], None]):
+        """注册新日志通知，listener 不能阻塞"""
+        self._listeners.append(listener)
+    
+    @property
+    def last_id(self) -> int:
+        """最新一条日志的序号，没有日志时为清空前的最后序号"""
+        return self._next_id - 1
+    
+    def get_logs(self, since: int = 0) -> list:
+        """获取序号大于 since 的全部日志"""
+        with self._condition:
+            return self._read(since)[0]
+    
+    def read_logs(self, since: int) -> Tuple[list, int]:
+        """不等待，返回 (序号大于 since 的日志, 因缓冲区覆盖而丢失的条数)"""
+        with self._condition:
+            return self._read(since)
     
-    def get_logs(self) -> list:
-        """获取所有日志"""
-        return self.log_cache.copy()
+    def wait_logs(self, since: int, timeout: float) -> Tuple[list, int]:
+        """等待序号大于 since 的日志，返回 (日志, 因缓冲区覆盖而丢失的条数)；超时返回空列表"""
+        with self._condition:
+            if self._next_id - 1 <= since:
+                self._condition.wait(timeout)
+            return self._read(since)
+    
+    def _read(self, since: int) -> Tuple[list, int]:
+        first = max(self._first_id, self._next_id - self.max_lines)
+        start = max(since + 1, first)
+        missed = max(0, first - max(since + 1, self._first_id))
+        return [self._buffer[log_id % self.max_lines] for log_id in range(start, self._next_id)], missed
     
     def clear_logs(self):
-        """清空日志"""
-        self.log_cache.clear()
-        while not self.log_queue.empty():
-            try:
-                self.log_queue.get_nowait()
-            except queue.Empty:
-                break
+        """清空日志（序号继续递增，已连接的客户端不会重复收到旧日志）"""
+        with self._condition:
+            self._buffer = [None] * self.max_lines
+            self._first_id = self._next_id
 
 
 class WebServer:
     """Web服务器"""
     
-    def __init__(self, work_dir: Path):
+    def __init__(self, work_dir: Path, workers: int = 1, remote_workers: Optional[List[str]] = None,
+                 worker_token: Optional[str] = None):
         self.work_dir = Path(work_dir)
         self.build_dir = self.work_dir / "build"
         self.build_dir.mkdir(exist_ok=True)
+        self.jobs_dir = self.build_dir / JOBS_DIR
         
-        # 初始化组件
+        # 初始化组件（各任务使用独立的 CompilerManager，这里的用于生成脚本和查询编译历史）
         self.config_manager = ConfigManager(self.work_dir)
         self.env_manager = EnvironmentManager(self.work_dir)
         self.compiler_manager = CompilerManager(self.work_dir, self.build_dir)
         
         # 状态管理
-        self.compilation_status = CompilationStatus()
         self.log_manager = LogManager()
+        self.log_store = LogStore(self.work_dir / "logs")
+        
+        # 任务状态、阶段变化和日志的事件序列，由 /api/events 推送
+        self.status_store = StatusStore(self.log_manager)
+        self._publish_lock = threading.Lock()  # 生成并写入任务状态，避免较旧的状态覆盖较新的
+        
+        # 编译任务队列，每个任务有独立的状态、日志和产物
+        self.workers = max(1, workers)
+        self._prep_lock = threading.Lock()  # 环境准备（下载源码、NDK 等）同一时间只由一个任务执行
+        self.job_queue = JobQueue(self._run_job, self.workers, status_factory=self._create_status,
+                                  first_id=self._next_job_id(), on_change=self._job_changed)
+        self.job_queue.start()
+        
+        # 远程编译节点，注册后任务的各架构分发到节点编译；与节点的请求都带共享令牌
+        self.worker_pool = WorkerPool(worker_token)
+        for url in remote_workers or []:
+            try:
+                self.worker_pool.register(url, check=False)
+            except ValueError as e:
+                print(f"⚠️ {e}")
+        
+        # ETag/304 和响应压缩
+        self.response_cache = ResponseCache()
         
         # 创建Flask应用
         self.app = Flask(__name__, 
@@ -119,16 +220,20 @@ class WebServer:
         def index():
             return send_from_directory(self.app.static_folder, 'index.html')
         
+        @self.app.after_request
+        def http_cache(response):
+            return self.response_cache.process(response, request)
+        
         @self.app.route('/api/presets')
         def api_presets():
             presets = self.config_manager.load_presets()
-            return jsonify(presets)
+            return self._preset_response(jsonify(presets))
         
         @self.app.route('/api/preset/<preset_name>')
         def api_preset(preset_name):
             presets = self.config_manager.load_presets()
             if preset_name in presets:
-                return jsonify(presets[preset_name])
+                return self._preset_response(jsonify(presets[preset_name]))
             else:
                 return jsonify({'error': '预设不存在'}), 404
         
@@ -136,7 +241,7 @@ class WebServer:
         def api_save_config():
             try:
                 data = request.get_json()
-                config = self.config_manager._dict_to_config(data)
+                config = self._parse_config(data)
                 success = self.config_manager.save_config(config)
                 
                 if success:
@@ -150,7 +255,7 @@ class WebServer:
         def api_generate_script():
             try:
                 data = request.get_json()
-                config = self.config_manager._dict_to_config(data)
+                config = self._parse_config(data)
                 
                 script_path = self.compiler_manager.build_manager.generate_build_script(config)
                 
@@ -163,58 +268,265 @@ class WebServer:
         
         @self.app.route('/api/start-compilation', methods=['POST'])
         def api_start_compilation():
+            # 提交到任务队列，已有编译在运行时排队
             try:
                 data = request.get_json()
-                
-                if self.compilation_status.running:
-                    return jsonify({'success': False, 'error': '已有编译任务在运行'})
-                
-                self.compilation_status.reset()
-                self.log_manager.clear_logs()
-                
-                config = self.config_manager._dict_to_config(data)
-                success = self._start_compilation_async(config)
-                
-                if success:
-                    return jsonify({'success': True})
-                else:
-                    return jsonify({'success': False, 'error': '启动编译失败'})
+                config = self._parse_config(data)
+                job = self.job_queue.submit(config)
+                return jsonify({'success': True, 'jobId': job.id,
+                                'queuePosition': self.job_queue.position(job)})
             except Exception as e:
                 return jsonify({'success': False, 'error': str(e)})
         
         @self.app.route('/api/compilation-status')
         def api_compilation_status():
-            return jsonify(self.compilation_status.to_dict())
+            # 指定任务的状态，默认为最近提交的任务
+            job_id = request.args.get('job', type=int)
+            job = self.job_queue.get(job_id) if job_id else self.job_queue.latest()
+            if job is None:
+                if job_id:
+                    return jsonify({'success': False, 'error': '找不到编译任务'}), 404
+                return jsonify(dict(CompilationStatus().to_dict(), jobId=None, state=None, queuePosition=None))
+            return jsonify(self._job_status(job))
+        
+        @self.app.route('/api/cancel-compilation', methods=['POST'])
+        def api_cancel_compilation():
+            data = request.get_json(silent=True) or {}
+            arch = data.get('arch')
+            
+            # 指定 job 时取消该任务，否则取消最近开始运行的任务
+            job = self._find_job(data.get('job'))
+            if job is None or job.finished:
+                return jsonify({'success': False, 'error': '没有正在运行的编译任务'})
+            
+            error = self._cancel_job(job, arch)
+            if error:
+                return jsonify({'success': False, 'error': error})
+            return jsonify({'success': True, 'jobId': job.id})
+        
+        @self.app.route('/api/build-states')
+        def api_build_states():
+            job = self._find_job(request.args.get('job', type=int))
+            builder = self._job_builder(job) if job else None
+            return jsonify({'success': True, 'archs': builder.get_build_states() if builder else {}})
+        
+        @self.app.route('/api/jobs', methods=['GET'])
+        def api_jobs():
+            return jsonify({'success': True, 'jobs': [self.job_queue.to_dict(job) for job in self.job_queue.jobs()]})
+        
+        @self.app.route('/api/jobs', methods=['POST'])
+        def api_submit_jobs():
+            # {"config": {...}, "priority": 0, "name": ""}，或 {"jobs": [...]} 一次提交多个
+            data = request.get_json(silent=True) or {}
+            specs = data.get('jobs') if 'jobs' in data else [data]
+            if not isinstance(specs, list) or not specs:
+                return jsonify({'success': False, 'error': '没有要提交的任务'}), 400
+            
+            # 全部解析成功后再提交，避免只提交了一部分
+            parsed = []
+            try:
+                for spec in specs:
+                    if not isinstance(spec, dict) or not isinstance(spec.get('config'), dict):
+                        return jsonify({'success': False, 'error': '缺少编译配置 config'}), 400
+                    config = self._parse_config(spec['config'])
+                    parsed.append((config, int(spec.get('priority', 0)), str(spec.get('name', ''))))
+            except Exception as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            jobs = [self.job_queue.submit(config, priority=priority, name=name)
+                    for config, priority, name in parsed]
+            return jsonify({'success': True, 'jobs': [self.job_queue.to_dict(job) for job in jobs]})
+        
+        @self.app.route('/api/jobs/<int:job_id>')
+        def api_job(job_id):
+            job = self.job_queue.get(job_id)
+            if job is None:
+                return jsonify({'success': False, 'error': '找不到编译任务'}), 404
+            builder = self._job_builder(job)
+            return jsonify({'success': True, 'job': dict(
+                self.job_queue.to_dict(job),
+                buildStates=builder.get_build_states() if builder else {},
+                artifacts=self._job_artifacts(job)
+            )})
+        
+        @self.app.route('/api/jobs/<int:job_id>/logs')
+        def api_job_logs(job_id):
+            job = self.job_queue.get(job_id)
+            if job is None:
+                return jsonify({'success': False, 'error': '找不到编译任务'}), 404
+            level = request.args.get('level') or None
+            if level and level not in LOG_LEVELS:
+                return jsonify({'success': False, 'error': f'不支持的日志级别: {level}'}), 400
+            offset = request.args.get('offset', 0, type=int)
+            
+            build_log = job.context.get('build_log')
+            if build_log is None:
+                # 尚未开始或无法保存日志
+                return jsonify({'success': True, 'build': None, 'status': job.state,
+                                'total': 0, 'offset': offset, 'lines': []})
+            try:
+                result = build_log.read(offset=offset, limit=request.args.get('limit', 500, type=int),
+                                        level=level)
+                return jsonify({'success': True, **result})
+            except Exception as e:
+                return jsonify({'success': False, 'error': str(e)})
+        
+        @self.app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+        def api_cancel_job(job_id):
+            job = self.job_queue.get(job_id)
+            if job is None:
+                return jsonify({'success': False, 'error': '找不到编译任务'}), 404
+            data = request.get_json(silent=True) or {}
+            error = self._cancel_job(job, data.get('arch'))
+            if error:
+                return jsonify({'success': False, 'error': error})
+            return jsonify({'success': True})
+        
+        @self.app.route('/api/size-report')
+        def api_size_report():
+            report_file = self._size_report_file(request.args.get('job', type=int))
+            if not report_file.exists():
+                return jsonify({'success': False, 'error': '尚未生成体积报告'}), 404
+            try:
+                with open(report_file, 'r', encoding='utf-8') as f:
+                    return jsonify({'success': True, 'report': json.load(f)})
+            except (OSError, ValueError) as e:
+                return jsonify({'success': False, 'error': str(e)})
+        
+        @self.app.route('/api/builds')
+        def api_builds():
+            # 编译历史，可按配置哈希（前缀）过滤
+            try:
+                builds = self.compiler_manager.history.list_builds(
+                    limit=max(1, min(request.args.get('limit', 20, type=int), 500)),
+                    config=request.args.get('config') or None)
+                return jsonify({'success': True, 'builds': builds})
+            except Exception as e:
+                return jsonify({'success': False, 'error': str(e)})
+        
+        @self.app.route('/api/builds/<int:build_id>')
+        def api_build_detail(build_id):
+            try:
+                build = self.compiler_manager.history.get_build(build_id)
+            except Exception as e:
+                return jsonify({'success': False, 'error': str(e)})
+            if not build:
+                return jsonify({'success': False, 'error': '找不到编译记录'}), 404
+            return jsonify({'success': True, 'build': build})
         
         @self.app.route('/api/logs')
         def api_logs():
             try:
-                logs = self.log_manager.get_logs()
-                return jsonify({'success': True, 'logs': logs})
+                # 不带参数时返回内存中最近的日志
+                if not any(key in request.args for key in ('build', 'offset', 'limit', 'level')):
+                    logs = self.log_manager.get_logs()
+                    return jsonify({'success': True, 'logs': logs})
+                
+                # 分页/按级别读取持久化的编译日志
+                level = request.args.get('level') or None
+                if level and level not in LOG_LEVELS:
+                    return jsonify({'success': False, 'error': f'不支持的日志级别: {level}'}), 400
+                build_log = self.log_store.get(request.args.get('build'))
+                if not build_log:
+                    return jsonify({'success': False, 'error': '找不到编译日志'}), 404
+                result = build_log.read(offset=request.args.get('offset', 0, type=int),
+                                        limit=request.args.get('limit', 500, type=int),
+                                        level=level)
+                return jsonify({'success': True, **result})
             except Exception as e:
                 return jsonify({'success': False, 'error': str(e)})
         
+        @self.app.route('/api/logs/builds')
+        def api_logs_builds():
+            return jsonify({'success': True, 'builds': self.log_store.list_builds()})
+        
         @self.app.route('/api/logs/stream')
         def api_logs_stream():
+            # 每个连接独立的游标；EventSource 重连时带上 Last-Event-ID，从断开处继续
+            # （asyncio 服务模式下此接口由 AsyncServer 直接处理，不占用线程）
+            cursor = parse_last_event_id(request.headers.get('Last-Event-ID') or
+                                         request.args.get('lastEventId', ''))
+            
+            def generate():
+                nonlocal cursor
+                # 服务重启后序号从头开始，旧游标作废
+                if cursor > self.log_manager.last_id:
+                    cursor = 0
+                yield CONNECTED_EVENT
+                
+                while True:
+                    logs, missed = self.log_manager.wait_logs(cursor, timeout=1)
+                    if not logs:
+                        yield HEARTBEAT_EVENT
+                        continue
+                    yield log_events(logs, missed)
+                    cursor = logs[-1]['id']
+            
+            return Response(generate(),
+                           mimetype='text/event-stream',
+                           headers=SSE_HEADERS)
+        
+        @self.app.route('/api/workers', methods=['GET'])
+        def api_workers():
+            # ?refresh=1 时重新获取各节点的信息
+            workers = self.worker_pool.workers()
+            if request.args.get('refresh'):
+                for worker in workers:
+                    worker.refresh()
+            return jsonify({'success': True, 'workers': [worker.to_dict() for worker in workers]})
+        
+        @self.app.route('/api/workers', methods=['POST'])
+        def api_register_worker():
+            # 注册远程编译节点 {"url": "http://host:5100"}，节点用 --register 启动时自动调用
+            # 需带与 --worker-token 一致的 X-Worker-Token 请求头
+            if not self.worker_pool.authorized(request.headers.get(TOKEN_HEADER)):
+                return jsonify({'success': False, 'error': '令牌无效，或协调端未设置 --worker-token'}), 401
+            data = request.get_json(silent=True) or {}
+            try:
+                worker = self.worker_pool.register(str(data.get('url', '')))
+            except (ValueError, WorkerError) as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            self.log_manager.add_log(f"🛰️ 远程编译节点已注册: {worker.name} ({worker.url})", 'info')
+            return jsonify({'success': True, 'worker': worker.to_dict()})
+        
+        @self.app.route('/api/workers', methods=['DELETE'])
+        def api_unregister_worker():
+            data = request.get_json(silent=True) or {}
+            if not self.worker_pool.unregister(str(data.get('url', ''))):
+                return jsonify({'success': False, 'error': '找不到编译节点'}), 404
+            return jsonify({'success': True})
+        
+        @self.app.route('/api/events')
+        def api_events():
+            # 状态、阶段变化和日志的统一事件流；新连接先收到完整状态，重连时从 Last-Event-ID 继续
+            # （asyncio 服务模式下此接口由 AsyncServer 直接处理，不占用线程）
+            cursor = parse_last_event_id(request.headers.get('Last-Event-ID') or
+                                         request.args.get('since', ''))
+            
             def generate():
-                yield "data: " + json.dumps({'type': 'connected'}) + "\n\n"
+                nonlocal cursor
+                yield CONNECTED_EVENT
                 
                 while True:
-                    try:
-                        log_entry = self.log_manager.log_queue.get(timeout=1)
-                        yield "data: " + json.dumps(log_entry) + "\n\n"
-                    except queue.Empty:
-                        yield "data: " + json.dumps({'type': 'heartbeat'}) + "\n\n"
-                    except Exception:
-                        break
+                    events = self.status_store.wait(cursor, timeout=1)
+                    if not events:
+                        yield HEARTBEAT_EVENT
+                        continue
+                    yield status_events(events)
+                    cursor = events[-1]['version']
             
-            return Response(generate(), 
+            return Response(generate(),
                            mimetype='text/event-stream',
-                           headers={
-                               'Cache-Control': 'no-cache',
-                               'Connection': 'keep-alive',
-                               'Access-Control-Allow-Origin': '*'
-                           })
+                           headers=SSE_HEADERS)
+        
+        @self.app.route('/api/events/poll')
+        def api_events_poll():
+            # 长轮询：等待版本号大于 since 的事件，超时返回空列表；since 为 0 时立即返回完整状态
+            since = request.args.get('since', 0, type=int)
+            timeout = min(max(request.args.get('timeout', POLL_TIMEOUT, type=float), 0), MAX_POLL_TIMEOUT)
+            events = self.status_store.wait(since, timeout)
+            return jsonify({'success': True, 'version': events[-1]['version'] if events else since,
+                            'events': events})
         
         @self.app.route('/api/logs/clear', methods=['POST'])
         def api_logs_clear():
@@ -224,40 +536,235 @@ class WebServer:
             except Exception as e:
                 return jsonify({'success': False, 'error': str(e)})
     
-    def _start_compilation_async(self, config) -> bool:
-        """异步启动编译"""
-        def compile_worker():
-            try:
-                self._run_compilation_workflow(config)
-            except Exception as e:
-                self.compilation_status.update(
-                    running=False,
-                    completed=True,
-                    success=False,
-                    progress=0,
-                    status='编译失败',
-                    error=str(e)
-                )
-                self.log_manager.add_log(f"❌ 编译失败: {e}", 'error')
-        
-        compile_thread = threading.Thread(target=compile_worker)
-        compile_thread.daemon = True
-        compile_thread.start()
-        
-        return True
-    
-    def _run_compilation_workflow(self, config):
+    def _preset_response(self, response: Response) -> Response:
+        """预设响应的 ETag 和 Last-Modified 取自预设文件，文件未变化时浏览器收到 304"""
+        stamp = self.config_manager.presets_stamp()
+        if stamp:
+            mtime_ns, size = stamp
+            response.headers['ETag'] = f'"presets-{mtime_ns:x}-{size:x}"'
+            response.headers['Last-Modified'] = http_date(mtime_ns / 1e9)
+        return response
+    
+    def _create_status(self, job: Job) -> CompilationStatus:
+        """任务的状态对象，每次更新后写入事件序列"""
+        return CompilationStatus(on_change=lambda: self._publish_status(job))
+    
+    def _job_changed(self, job: Job):
+        """任务提交、开始或结束：排队中的其他任务位置也可能变化"""
+        self._publish_status(job)
+        for other in self.job_queue.jobs():
+            if other is not job and other.state == JobState.QUEUED:
+                self._publish_status(other)
+    
+    def _publish_status(self, job: Job):
+        if job.status is None:
+            return
+        with self._publish_lock:
+            self.status_store.publish(job.id, self._job_status(job))
+    
+    def _next_job_id(self) -> int:
+        """任务ID接着已有的任务目录编号，服务重启后不会覆盖之前任务的产物"""
+        if not self.jobs_dir.exists():
+            return 1
+        ids = [int(path.name) for path in self.jobs_dir.iterdir() if path.name.isdigit()]
+        return max(ids, default=0) + 1
+    
+    def _find_job(self, job_id: Optional[int] = None) -> Optional[Job]:
+        """按ID查找任务，未指定时返回最近开始运行的任务，没有运行中的任务时返回最近提交的任务"""
+        if job_id:
+            return self.job_queue.get(int(job_id))
+        running = self.job_queue.running()
+        if running:
+            return max(running, key=lambda job: job.startTime or 0)
+        return self.job_queue.latest()
+    
+    def _job_status(self, job: Job) -> Dict[str, Any]:
+        """任务的编译状态，附带任务ID、任务状态和排队位置"""
+        status = job.status.to_dict()
+        position = self.job_queue.position(job)
+        if job.state == JobState.QUEUED:
+            status['status'] = f"排队中，前面还有 {position} 个任务" if position else '排队中，即将开始'
+        elif job.state == JobState.CANCELLED and not status['completed']:
+            # 排队时被取消，没有运行过
+            status.update(completed=True, status='已取消', error='任务已取消')
+        status.update(jobId=job.id, state=job.state, queuePosition=position)
+        return status
+    
+    def _cancel_job(self, job: Job, arch: Optional[str] = None) -> Optional[str]:
+        """取消任务或任务中的一个架构，返回错误信息，成功时返回None"""
+        if job.finished:
+            return '任务已结束'
+        if job.state == JobState.QUEUED:
+            if arch:
+                return '任务尚未开始'
+            self.job_queue.cancel(job.id)
+            return None
+        
+        compiler = self._job_builder(job)
+        if arch:
+            if not compiler or not compiler.cancel(arch):
+                return '仅 Python 编排器模式支持取消，或该架构未在编译'
+        elif compiler is None:
+            # 仍在准备环境，下一步开始前停止
+            self.job_queue.cancel(job.id)
+        elif compiler.cancel():
+            self.job_queue.cancel(job.id)
+        else:
+            return '仅 Python 编排器模式支持取消，或该架构未在编译'
+        self._job_logger(job)([(f"⏹️ 请求取消编译: {arch or '全部架构'}", 'warning')])
+        return None
+    
+    def _parse_config(self, data: Dict[str, Any]) -> BuildConfig:
+        """请求中的配置，无效时抛出 ValueError（选项会写入构建脚本，提交前必须验证）"""
+        if not isinstance(data, dict):
+            raise ValueError("缺少编译配置")
+        config = self.config_manager._dict_to_config(data)
+        self.config_manager.validate_config(config)
+        return config
+    
+    def _job_builder(self, job: Job) -> Any:
+        """编译任务的执行对象，用于取消和查询各架构状态：远程编译时为 RemoteBuild，否则为 CompilerManager"""
+        return job.context.get('remote') or job.context.get('compiler')
+    
+    def _job_dir(self, job_id: int) -> Path:
+        return self.jobs_dir / str(job_id)
+    
+    def _job_artifacts(self, job: Job) -> List[str]:
+        """任务的产物（各架构的安装目录和打包文件），路径相对于工作目录"""
+        job_dir = self._job_dir(job.id)
+        artifacts = []
+        for sub_dir in ("artifacts", "dist"):
+            path = job_dir / sub_dir
+            if path.is_dir():
+                artifacts.extend(str(item.relative_to(self.work_dir)) for item in sorted(path.iterdir()))
+        return artifacts
+    
+    def _size_report_file(self, job_id: Optional[int] = None) -> Path:
+        """指定任务的体积报告，默认为最近一个生成了报告的任务"""
+        if job_id:
+            return self._job_dir(job_id) / REPORT_FILE
+        if self.jobs_dir.exists():
+            job_ids = sorted((int(path.name) for path in self.jobs_dir.iterdir() if path.name.isdigit()),
+                             reverse=True)
+            for candidate in job_ids:
+                report_file = self._job_dir(candidate) / REPORT_FILE
+                if report_file.exists():
+                    return report_file
+        return self.build_dir / REPORT_FILE
+    
+    def _prune_job_dirs(self):
+        """删除超出保留数量的已结束任务目录"""
+        if not self.jobs_dir.exists():
+            return
+        active = {job.id for job in self.job_queue.jobs() if not job.finished}
+        job_ids = sorted(int(path.name) for path in self.jobs_dir.iterdir() if path.name.isdigit())
+        for job_id in job_ids[:-MAX_JOB_DIRS]:
+            if job_id not in active:
+                shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+    
+    def _job_logger(self, job: Job) -> Callable[[List[Tuple[str, str]]], None]:
+        """批量写入任务日志的函数：写入任务的持久化日志，同时写入实时日志（多个工作线程时带任务ID前缀）"""
+        prefix = f"[#{job.id}] " if self.workers > 1 else ''
+        
+        def add_logs(entries: List[Tuple[str, str]]):
+            build_log = job.context.get('build_log')
+            if build_log:
+                timestamp = time.strftime('%H:%M:%S')
+                build_log.append([(timestamp, level, str(message).strip()) for message, level in entries])
+            if prefix:
+                entries = [(prefix + str(message).strip(), level) for message, level in entries]
+            self.log_manager.add_logs(entries)
+        
+        return add_logs
+    
+    def _run_job(self, job: Job) -> bool:
+        """在工作线程中执行编译任务"""
+        status = job.status
+        job_dir = self._job_dir(job.id)
+        self._prune_job_dirs()
+        job_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 没有其他任务在运行时清空实时日志
+        if len(self.job_queue.running()) <= 1:
+            self.log_manager.clear_logs()
+        add_logs = self._job_logger(job)
+        
+        # 本次编译的完整日志同时写入 logs/<编译ID>/
+        build_log = None
+        try:
+            build_log = self.log_store.start_build()
+            job.context['build_log'] = build_log
+            status.update(buildId=build_log.build_id)
+        except OSError as e:
+            add_logs([(f"⚠️ 无法保存编译日志: {e}", 'warning')])
+        
+        try:
+            self._run_compilation_workflow(job, job_dir, add_logs)
+        except Exception as e:
+            status.update(
+                running=False,
+                completed=True,
+                success=False,
+                progress=0,
+                status='已取消' if job.cancelRequested else '编译失败',
+                error=str(e),
+                eta=None
+            )
+            add_logs([(f"❌ 编译失败: {e}", 'error')])
+        finally:
+            if build_log:
+                if status.success:
+                    log_status = 'success'
+                else:
+                    log_status = 'cancelled' if job.cancelRequested else 'failed'
+                self.log_store.end_build(build_log, log_status)
+        return status.success
+    
+    def _job_config(self, job: Job, job_dir: Path) -> BuildConfig:
+        """任务实际使用的配置：目录由服务端决定（打包输出到任务目录，缓存使用默认目录）；
+        未指定并行任务数且有多个任务同时运行时平分 CPU"""
+        build_opts = job.config.buildOptions
+        # 提交的配置中的目录不可信（可能是绝对路径或含 ..），忽略
+        changes = {
+            'ccacheDir': BuildOptions.ccacheDir,
+            'artifactCacheDir': BuildOptions.artifactCacheDir,
+            'configureCacheDir': BuildOptions.configureCacheDir,
+            'packageDir': str(job_dir / "dist")
+        }
+        running = len(self.job_queue.running())
+        if build_opts.jobs == 0 and running > 1:
+            changes['jobs'] = max((os.cpu_count() or 1) // running, 1)
+        return replace(job.config, buildOptions=replace(build_opts, **changes))
+    
+    def _run_compilation_workflow(self, job: Job, job_dir: Path,
+                                  add_logs: Callable[[List[Tuple[str, str]]], None]):
         """运行编译工作流"""
-        self.compilation_status.update(
+        status = job.status
+        
+        def log(message: str, level: str = 'info'):
+            add_logs([(message, level)])
+        
+        status.update(
             running=True,
             completed=False,
             success=False,
             progress=0,
             status='初始化编译环境...',
-            error=None
+            error=None,
+            eta=None,
+            archs={}
         )
         
-        self.log_manager.add_log("🚀 开始FFmpeg Android编译", 'info')
+        log(f"🚀 开始FFmpeg Android编译 (任务 #{job.id}{' ' + job.name if job.name else ''})", 'info')
+        tracer = BuildTracer()
+        
+        # 注册了远程编译节点时各架构在节点上编译，本机不需要准备编译环境；没有节点可用时在本机编译
+        if self.worker_pool.workers():
+            config = self._job_config(job, job_dir)
+            success = self._run_remote_compilation(job, config, job_dir, add_logs, tracer)
+            if success is not None:
+                self._finish_compilation(job, config, job_dir, success, log)
+                return
         
         # 环境准备
         prep_steps = [
@@ -268,79 +775,170 @@ class WebServer:
             (50, '设置Android NDK...', self.env_manager.setup_ndk)
         ]
         
-        for progress, status, step_func in prep_steps:
-            self.compilation_status.update(progress=progress, status=status)
-            self.log_manager.add_log(f"🔧 {status}", 'info')
-            
-            try:
-                if not step_func():
-                    if '安装编译工具包' in status:
-                        self.log_manager.add_log(f"⚠️ {status}失败，但可以继续...", 'warning')
-                        continue
-                    raise Exception(f"{status}失败")
-                self.log_manager.add_log(f"✅ {status}完成", 'success')
-            except Exception as e:
-                raise Exception(f"{status}失败: {e}")
+        with self._prep_lock:
+            for progress, step_status, step_func in prep_steps:
+                if job.cancelRequested:
+                    raise Exception("任务已取消")
+                status.update(progress=progress, status=step_status)
+                log(f"🔧 {step_status}", 'info')
+                
+                try:
+                    with tracer.span(step_func.__name__):
+                        ok = step_func()
+                    if not ok:
+                        if '安装编译工具包' in step_status:
+                            log(f"⚠️ {step_status}失败，但可以继续...", 'warning')
+                            continue
+                        raise Exception(f"{step_status}失败")
+                    log(f"✅ {step_status}完成", 'success')
+                except Exception as e:
+                    raise Exception(f"{step_status}失败: {e}")
         
         # 开始编译
-        self.compilation_status.update(progress=60, status='开始编译...')
+        status.update(progress=60, status='开始编译...')
         
         msys2_bash_path = self.env_manager.get_msys2_bash_path()
         if not msys2_bash_path:
-            raise Exception("找不到MSYS2 bash")
+            raise Exception("找不到bash (Windows下需要MSYS2)")
+        
+        # 每个任务独立的脚本、耗时记录和体积报告；编译历史和进度记录与其他任务共享
+        config = self._job_config(job, job_dir)
+        compiler = CompilerManager(self.work_dir, job_dir, state_dir=self.build_dir)
+        job.context['compiler'] = compiler
+        if job.cancelRequested:
+            raise Exception("任务已取消")
         
-        success = self.compiler_manager.compile(
+        success = compiler.compile(
             config,
             msys2_bash_path,
-            progress_callback=self._progress_callback,
-            log_callback=self._log_callback
+            progress_callback=lambda info: self._progress_callback(status, info),
+            log_callback=log,
+            tracer=tracer,
+            log_batch_callback=add_logs
         )
+        self._finish_compilation(job, config, job_dir, success, log)
+    
+    def _run_remote_compilation(self, job: Job, config: BuildConfig, job_dir: Path,
+                                add_logs: Callable[[List[Tuple[str, str]]], None], tracer: BuildTracer) -> Optional[bool]:
+        """各架构分发到远程编译节点，收集到 ffmpeg-android-<arch>/ 后在本机生成体积报告和打包；
+        没有可用节点、或所有节点都无法接收编译单元时返回None，由调用方改为本机编译"""
+        status = job.status
+        
+        def log(message: str, level: str = 'info'):
+            add_logs([(message, level)])
         
+        workers = self.worker_pool.available()
+        if not workers:
+            log("⚠️ 没有可用的远程编译节点，改为本机编译", 'warning')
+            return None
+        status.update(progress=10, status='分发到远程编译节点...')
+        log(f"🛰️ 分发 {len(config.architectures)} 个架构到 {len(workers)} 个远程编译节点: "
+            f"{', '.join(worker.name for worker in workers)}", 'info')
+        
+        # 节点按任务的原始配置编译（并行任务数由节点决定），打包在收集全部架构后进行
+        unit_config = replace(job.config, buildOptions=replace(job.config.buildOptions, package=''))
+        remote = RemoteBuild(self.worker_pool, self.work_dir, self.config_manager._config_to_dict(unit_config),
+                             config.architectures, add_logs,
+                             progress_callback=lambda info: self._progress_callback(status, info),
+                             tracer=tracer)
+        job.context['remote'] = remote
+        if job.cancelRequested:
+            raise Exception("任务已取消")
+        
+        with tracer.span('remote_build'):
+            success = remote.run()
+        if not remote.dispatched and not job.cancelRequested:
+            job.context.pop('remote', None)
+            log("⚠️ 远程编译节点均无法接收编译单元，改为本机编译", 'warning')
+            return None
+        
+        # 体积报告、打包、耗时记录和编译历史与本机编译相同
+        compiler = CompilerManager(self.work_dir, job_dir, state_dir=self.build_dir)
+        job.context['compiler'] = compiler
+        return compiler.finish_external_build(config, success, log, tracer)
+    
+    def _finish_compilation(self, job: Job, config: BuildConfig, job_dir: Path, success: bool, log: Callable):
+        """编译结束：成功时保存产物并更新状态，失败或取消时抛出异常"""
+        status = job.status
         if success:
-            self.compilation_status.update(
+            self._collect_artifacts(config, job_dir, log)
+            status.update(
                 running=False,
                 completed=True,
                 success=True,
                 progress=100,
                 status='编译完成！',
-                error=None
+                error=None,
+                eta=0
             )
+        elif job.cancelRequested:
+            raise Exception("编译已取消")
         else:
             raise Exception("编译过程失败")
     
-    def _progress_callback(self, progress_info: Dict[str, Any]):
+    def _collect_artifacts(self, config: BuildConfig, job_dir: Path, log: Callable):
+        """把各架构的安装目录复制到任务目录，后续任务覆盖 ffmpeg-android-<arch>/ 后仍可取用"""
+        artifacts_dir = job_dir / "artifacts"
+        try:
+            for arch in config.architectures:
+                prefix = self.work_dir / f"ffmpeg-android-{arch}"
+                if not prefix.is_dir():
+                    continue
+                target = artifacts_dir / prefix.name
+                if target.exists():
+                    shutil.rmtree(target)
+                shutil.copytree(prefix, target, symlinks=True)
+        except OSError as e:
+            log(f"⚠️ 保存任务产物失败: {e}", 'warning')
+            return
+        log(f"📁 任务产物: {artifacts_dir}", 'info')
+    
+    def _progress_callback(self, status: CompilationStatus, progress_info: Dict[str, Any]):
         """进度回调"""
         stage = progress_info.get('stage', '')
         message = progress_info.get('message', '')
         
-        # 根据阶段计算进度
-        stage_progress = {
-            'configuring': 70,
-            'building': 85,
-            'installing': 95,
-            'completed': 100
-        }
+        percent = progress_info.get('percent')
+        if percent is None:
+            # 没有目标数统计时按阶段估计
+            stage_progress = {
+                'configuring': 70,
+                'building': 85,
+                'installing': 95,
+                'completed': 100
+            }
+            status.update(progress=stage_progress.get(stage, 60), status=message)
+            return
         
-        progress = stage_progress.get(stage, 60)
-        self.compilation_status.update(progress=progress, status=message)
-    
-    def _log_callback(self, message: str, level: str = 'info'):
-        """日志回调"""
-        self.log_manager.add_log(message, level)
-    
-    def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
-        """运行服务器"""
+        # 编译阶段占总进度的 60-99%，完成后由工作流置为 100%
+        progress = 60 + int(percent * 39 / 100)
+        status.update(
+            progress=max(progress, status.progress),
+            status=message,
+            eta=progress_info.get('eta'),
+            archs=progress_info.get('archs', {})
+        )
+
+    def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False, server: str = 'threaded'):
+        """运行服务器，server 为 threaded (Flask 多线程服务器) 或 async (asyncio 服务模式)"""
         print("🚀 启动 FFmpeg Android 编译配置器")
         print("=" * 50)
         print(f"📱 网页界面: http://localhost:{port}")
         print("🔧 配置文件: build/config.json")
-        print("📝 编译脚本: build/build_ffmpeg.sh")
+        print("📝 编译脚本: build/jobs/<任务ID>/build_ffmpeg.sh")
+        print(f"👷 同时运行的编译任务: {self.workers}")
+        if self.worker_pool.workers():
+            print(f"🛰️ 远程编译节点: {', '.join(worker.url for worker in self.worker_pool.workers())}")
+        print(f"🌐 服务模式: {'asyncio' if server == 'async' else 'Flask 多线程'}")
         print("=" * 50)
         print("💡 提示: 编译过程中的详细日志将显示在Web界面中")
         print("🔧 按 Ctrl+C 停止服务器")
         print("=" * 50)
         
         try:
-            self.app.run(host=host, port=port, debug=debug, threaded=True)
+            if server == 'async':
+                AsyncServer(self.app, self.log_manager, status_store=self.status_store).run(host=host, port=port)
+            else:
+                self.app.run(host=host, port=port, debug=debug, threaded=True)
         except KeyboardInterrupt:
             print("\n👋 服务器已停止")
\ No newline at end of file
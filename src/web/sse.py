@@ -0,0 +1,44 @@
+"""
+SSE 日志流格式
+
+Flask 线程模式和 asyncio 服务模式的 /api/logs/stream 使用相同的事件格式:
+    data: {"type": "connected"}              连接建立
+    data: {"type": "heartbeat"}              保活
+    id: <序号>\\ndata: {日志}                 每条日志，id 供断线重连时的 Last-Event-ID 使用
+    data: {"level": "warning", ...}          连接落后、跳过了部分日志的提示
+
+/api/events 的每个事件以版本号作为 id，断线重连时从 Last-Event-ID 之后继续（事件格式见 events.py）。
+"""
+
+import json
+from typing import Any, Dict, List
+
+CONNECTED_EVENT = "data: " + json.dumps({'type': 'connected'}) + "\n\n"
+HEARTBEAT_EVENT = "data: " + json.dumps({'type': 'heartbeat'}) + "\n\n"
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*'
+}
+
+
+def parse_last_event_id(value: str) -> int:
+    """Last-Event-ID 对应的日志游标，无效时从头开始"""
+    return int(value) if value and value.isdigit() else 0
+
+
+def log_events(logs: List[Dict[str, Any]], missed: int = 0) -> str:
+    """日志批次对应的 SSE 事件，missed 为因缓冲区覆盖而跳过的条数"""
+    events = []
+    if missed:
+        notice = {'timestamp': logs[0]['timestamp'], 'level': 'warning',
+                  'message': f"⚠️ 连接落后，已跳过 {missed} 条日志"}
+        events.append("data: " + json.dumps(notice) + "\n\n")
+    events.extend(f"id: {entry['id']}\ndata: {json.dumps(entry)}\n\n" for entry in logs)
+    return ''.join(events)
+
+
+def status_events(events: List[Dict[str, Any]]) -> str:
+    """StatusStore 事件对应的 SSE 事件"""
+    return ''.join(f"id: {event['version']}\ndata: {json.dumps(event)}\n\n" for event in events)
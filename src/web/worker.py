@@ -0,0 +1,487 @@
+"""
+远程编译节点
+
+python main.py --worker 启动的 HTTP 服务，接收协调端 (Web 模式的 WebServer) 分发的编译单元，
+每个单元为一个配置中的一个架构，用本机的 CompilerManager 编译:
+    GET  /api/worker                      节点信息（名称、同时编译数、排队和运行中的单元数）
+    POST /api/units                       提交 {"config": {...}, "arch": "arm64-v8a"}，返回单元ID
+    GET  /api/units/<id>                  单元状态
+    GET  /api/units/<id>/stream?since=N   按行输出的 JSON 事件流 (logs/progress/heartbeat/result)，
+                                          从第 N 个事件开始，单元结束后关闭；断线后可从收到的事件数继续
+    GET  /api/units/<id>/artifact         编译成功后安装目录 ffmpeg-android-<arch>/ 的 tar.gz
+    POST /api/units/<id>/cancel           取消排队或正在编译的单元（编译阶段仅 Python 编排器模式支持）
+    DELETE /api/units/<id>                协调端取回产物后释放单元的日志和产物
+/api/units 下的请求需带 X-Worker-Token 请求头（与 --worker-token 一致），默认只监听 127.0.0.1。
+只依赖标准库；单元由 JobQueue 调度，同一架构的单元依次编译。
+"""
+
+import hmac
+import json
+import os
+import re
+import shutil
+import socket
+import tarfile
+import threading
+import time
+import urllib.request
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from ..core import ConfigManager, EnvironmentManager, CompilerManager
+from ..core.config import BuildOptions, PATH_OPTIONS
+from ..core.trace import BuildTracer
+from .jobs import Job, JobQueue, JobState
+
+# 默认端口
+WORKER_PORT = 5100
+
+# 默认监听地址，其他机器访问时需显式指定（如 0.0.0.0）
+WORKER_HOST = "127.0.0.1"
+
+# 节点与协调端之间的共享令牌请求头
+TOKEN_HEADER = "X-Worker-Token"
+
+# 各单元的编译脚本、耗时记录和产物保存在 build/units/<单元ID>/
+UNITS_DIR = "units"
+
+# 保留的单元目录数量，超出时删除最早的
+MAX_UNIT_DIRS = 20
+
+# 事件流空闲时的保活间隔（秒）
+HEARTBEAT_INTERVAL = 15.0
+
+# 请求体大小上限
+MAX_BODY = 16 * 1024 * 1024
+
+_UNIT_PATH = re.compile(r'^/api/units/(\d+)(?:/(stream|artifact|cancel))?$')
+
+
+class UnitStatus:
+    """编译单元的事件序列：日志、进度和最终结果，供事件流按序号读取"""
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._result: Optional[Dict[str, Any]] = None
+        self._condition = threading.Condition()
+        self.finished = False
+        self.success = False
+        self.error: Optional[str] = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self.artifact: Optional[Path] = None
+        self.prefix: Optional[str] = None  # 节点上的安装目录，协调端据此改写 .pc 文件中的路径
+
+    def add_logs(self, entries: List[Tuple[str, str]]):
+        """批量添加日志，entries 为 (消息, 级别) 列表"""
+        timestamp = time.strftime('%H:%M:%S')
+        self._append({'type': 'logs', 'lines': [[timestamp, level, str(message).strip()]
+                                                 for message, level in entries]})
+
+    def add_progress(self, info: Dict[str, Any]):
+        self.progress = info
+        self._append({'type': 'progress', 'info': info})
+
+    def finish(self, success: bool, error: Optional[str] = None):
+        with self._condition:
+            if self.finished:
+                return
+            self.finished = True
+            self.success = success
+            self.error = error
+            self._result = {'type': 'result', 'success': success, 'error': error, 'prefix': self.prefix,
+                            'artifact': self.artifact is not None}
+            self._append(self._result)
+
+    def release(self):
+        """释放日志（单元已被协调端取回）"""
+        with self._condition:
+            self._events = []
+
+    def wait(self, since: int, timeout: float) -> List[Dict[str, Any]]:
+        """等待序号不小于 since 的事件，超时返回空列表；单元已结束时至少返回结果事件"""
+        with self._condition:
+            if since >= len(self._events) and not self.finished:
+                self._condition.wait(timeout)
+            events = self._events[since:]
+            if not events and self.finished:
+                return [self._result]
+            return events
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'finished': self.finished,
+                'success': self.success,
+                'error': self.error,
+                'progress': self.progress,
+                'events': len(self._events),
+                'artifact': self.artifact is not None
+            }
+
+    def _append(self, event: Dict[str, Any]):
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify_all()
+
+
+class BuildWorker:
+    """远程编译节点"""
+
+    def __init__(self, work_dir: Path, slots: int = 1, name: Optional[str] = None,
+                 token: Optional[str] = None):
+        self.work_dir = Path(work_dir)
+        self.build_dir = self.work_dir / "build"
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        self.units_dir = self.build_dir / UNITS_DIR
+        self.name = name or socket.gethostname()
+        self.slots = max(1, slots)
+        self.token = token  # 为空时不校验（只应在本机测试时使用）
+
+        self.config_manager = ConfigManager(self.work_dir)
+        self.env_manager = EnvironmentManager(self.work_dir)
+        self._prep_lock = threading.Lock()  # 环境准备（下载源码、NDK 等）同一时间只由一个单元执行
+        self.queue = JobQueue(self._run_unit, self.slots, status_factory=lambda job: UnitStatus(),
+                              first_id=self._next_unit_id(), on_change=self._unit_changed)
+
+    def start(self):
+        self.queue.start()
+
+    def run(self, host: str = WORKER_HOST, port: int = WORKER_PORT, register: Optional[str] = None,
+            url: Optional[str] = None):
+        """运行编译节点直到进程退出；register 为协调端地址时启动后向其注册 (url 为本节点对外地址)"""
+        self.start()
+        httpd = self.create_server(host, port)
+        port = httpd.server_address[1]
+        print("=" * 50)
+        print("🛰️ FFmpeg Android 远程编译节点")
+        print("=" * 50)
+        print(f"📍 地址: http://{host}:{port}")
+        print(f"🏷️ 名称: {self.name}")
+        print(f"👷 同时编译的单元: {self.slots}")
+        print("=" * 50)
+
+        if register:
+            # 监听所有地址时上报主机名，否则上报监听地址
+            url = url or f"http://{socket.gethostname() if host in ('0.0.0.0', '') else host}:{port}"
+            threading.Thread(target=self._register, args=(register, url), daemon=True).start()
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 编译节点已停止")
+        finally:
+            httpd.server_close()
+
+    def create_server(self, host: str, port: int) -> ThreadingHTTPServer:
+        """创建 HTTP 服务器（port 为 0 时由系统分配），由调用方运行 serve_forever"""
+        handler = type('WorkerHandler', (_WorkerHandler,), {'worker': self})
+        httpd = ThreadingHTTPServer((host, port), handler)
+        httpd.daemon_threads = True
+        return httpd
+
+    def info(self) -> Dict[str, Any]:
+        units = self.queue.jobs()
+        return {
+            'name': self.name,
+            'slots': self.slots,
+            'queued': sum(1 for unit in units if unit.state == JobState.QUEUED),
+            'running': sum(1 for unit in units if unit.state == JobState.RUNNING),
+            'platform': os.name
+        }
+
+    def submit(self, config_data: Dict[str, Any], arch: str) -> Job:
+        """提交编译单元：只编译 arch 一个架构，打包由协调端在收集全部架构后进行；
+        目录选项使用本节点的默认目录，忽略提交的值；架构或配置无效时抛出 ValueError（请求返回 400）"""
+        if arch not in ConfigManager.SUPPORTED_ARCHITECTURES:
+            raise ValueError(f"不支持的架构: {arch}")
+        config = self.config_manager._dict_to_config(config_data)
+        dirs = {name: getattr(BuildOptions, name) for name in PATH_OPTIONS}
+        config = replace(config, architectures=[arch],
+                         buildOptions=replace(config.buildOptions, package='', **dirs))
+        self.config_manager.validate_config(config)
+        job = self.queue.submit(config, name=arch)
+        print(f"📥 编译单元 #{job.id}: {arch}")
+        return job
+
+    def cancel(self, unit: Job) -> bool:
+        if unit.finished:
+            return False
+        if unit.state == JobState.QUEUED:
+            return self.queue.cancel(unit.id)
+        compiler = unit.context.get('compiler')
+        if compiler is None:
+            # 仍在准备环境，下一步开始前停止
+            return self.queue.cancel(unit.id)
+        if compiler.cancel():
+            return self.queue.cancel(unit.id)
+        return False
+
+    def release(self, unit: Job):
+        """协调端已取回产物：删除产物并释放日志"""
+        unit.status.release()
+        if unit.status.artifact:
+            try:
+                unit.status.artifact.unlink()
+            except OSError:
+                pass
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """请求中的令牌是否与本节点的令牌一致"""
+        if not self.token:
+            return True
+        return hmac.compare_digest((token or '').encode('utf-8'), self.token.encode('utf-8'))
+
+    def _register(self, coordinator: str, url: str):
+        """向协调端注册，协调端未启动时每 5 秒重试"""
+        data = json.dumps({'url': url}).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        while True:
+            try:
+                request = urllib.request.Request(coordinator.rstrip('/') + '/api/workers', data=data,
+                                                 headers=headers)
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    result = json.loads(response.read().decode('utf-8'))
+                if result.get('success'):
+                    print(f"🔗 已注册到 {coordinator} ({url})")
+                    return
+                print(f"⚠️ 注册失败: {result.get('error')}")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 无法连接协调端 {coordinator}: {e}")
+            time.sleep(5)
+
+    def _next_unit_id(self) -> int:
+        if not self.units_dir.exists():
+            return 1
+        ids = [int(path.name) for path in self.units_dir.iterdir() if path.name.isdigit()]
+        return max(ids, default=0) + 1
+
+    def _prune_unit_dirs(self):
+        if not self.units_dir.exists():
+            return
+        active = {unit.id for unit in self.queue.jobs() if not unit.finished}
+        unit_ids = sorted(int(path.name) for path in self.units_dir.iterdir() if path.name.isdigit())
+        for unit_id in unit_ids[:-MAX_UNIT_DIRS]:
+            if unit_id not in active:
+                shutil.rmtree(self.units_dir / str(unit_id), ignore_errors=True)
+
+    def _unit_changed(self, unit: Job):
+        # 排队时被取消的单元不会运行，直接结束事件流
+        if unit.state == JobState.CANCELLED and unit.startTime is None:
+            unit.status.finish(False, '编译单元已取消')
+
+    def _run_unit(self, unit: Job) -> bool:
+        """在工作线程中编译单元"""
+        status: UnitStatus = unit.status
+        arch = unit.config.architectures[0]
+        unit_dir = self.units_dir / str(unit.id)
+        self._prune_unit_dirs()
+        unit_dir.mkdir(parents=True, exist_ok=True)
+
+        def log(message: str, level: str = 'info'):
+            status.add_logs([(message, level)])
+
+        try:
+            log(f"🛰️ {self.name} 开始编译 {arch} (单元 #{unit.id})", 'info')
+            tracer = BuildTracer()
+            self._prepare(unit, log, tracer)
+
+            msys2_bash_path = self.env_manager.get_msys2_bash_path()
+            if not msys2_bash_path:
+                raise Exception("找不到bash (Windows下需要MSYS2)")
+
+            compiler = CompilerManager(self.work_dir, unit_dir, state_dir=self.build_dir)
+            unit.context['compiler'] = compiler
+            if unit.cancelRequested:
+                raise Exception("编译单元已取消")
+            success = compiler.compile(unit.config, msys2_bash_path,
+                                       progress_callback=status.add_progress,
+                                       log_callback=log,
+                                       tracer=tracer,
+                                       log_batch_callback=status.add_logs)
+            if not success:
+                raise Exception("编译已取消" if unit.cancelRequested else "编译过程失败")
+
+            prefix = self.work_dir / f"ffmpeg-android-{arch}"
+            status.prefix = str(prefix)
+            status.artifact = self._pack_prefix(prefix, unit_dir)
+            log(f"📦 安装目录已打包: {status.artifact.name} "
+                f"({status.artifact.stat().st_size / 1024 / 1024:.1f} MB)", 'info')
+            status.finish(True)
+            print(f"✅ 编译单元 #{unit.id}: {arch} 完成")
+            return True
+        except Exception as e:
+            log(f"❌ 编译失败: {e}", 'error')
+            status.finish(False, str(e))
+            print(f"❌ 编译单元 #{unit.id}: {arch} 失败: {e}")
+            return False
+
+    def _prepare(self, unit: Job, log, tracer: BuildTracer):
+        """准备编译环境（与 Web 模式相同的步骤）"""
+        prep_steps = [
+            ('检查编译环境', self.env_manager.check_platform),
+            ('设置MSYS2环境', self.env_manager.setup_msys2),
+            ('安装编译工具包', self.env_manager.install_msys2_packages),
+            ('准备FFmpeg源码', self.env_manager.setup_ffmpeg),
+            ('设置Android NDK', self.env_manager.setup_ndk)
+        ]
+        with self._prep_lock:
+            for step_name, step_func in prep_steps:
+                if unit.cancelRequested:
+                    raise Exception("编译单元已取消")
+                with tracer.span(step_func.__name__):
+                    ok = step_func()
+                if not ok:
+                    if step_name == '安装编译工具包':
+                        log(f"⚠️ {step_name}失败，但可以继续...", 'warning')
+                        continue
+                    raise Exception(f"{step_name}失败")
+
+    @staticmethod
+    def _pack_prefix(prefix: Path, unit_dir: Path) -> Path:
+        """把安装目录打包为 tar.gz，包内顶层目录为 ffmpeg-android-<arch>/"""
+        if not prefix.is_dir():
+            raise Exception(f"找不到安装目录 {prefix}")
+        archive = unit_dir / f"{prefix.name}.tar.gz"
+        tmp = archive.with_name(archive.name + '.tmp')
+        with tarfile.open(tmp, 'w:gz', compresslevel=6) as tar:
+            tar.add(prefix, arcname=prefix.name)
+        os.replace(tmp, archive)
+        return archive
+
+
+class _WorkerHandler(BaseHTTPRequestHandler):
+    """编译节点的 HTTP 接口"""
+
+    worker: BuildWorker = None
+    server_version = 'FFmpegAndroidWorker/1.0'
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/api/worker':
+            return self._json({'success': True, 'worker': self.worker.info()})
+        if not self._authorize():
+            return
+        if path == '/api/units':
+            return self._json({'success': True, 'units': [self._unit_dict(unit)
+                                                          for unit in self.worker.queue.jobs()]})
+        unit, action = self._find_unit(path)
+        if unit is None:
+            return
+        if action is None:
+            return self._json({'success': True, 'unit': self._unit_dict(unit)})
+        if action == 'stream':
+            since = parse_qs(query).get('since', ['0'])[0]
+            return self._stream(unit, int(since) if since.isdigit() else 0)
+        if action == 'artifact':
+            return self._artifact(unit)
+        self._json({'success': False, 'error': '不支持的请求'}, 405)
+
+    def do_POST(self):
+        path = self.path.partition('?')[0]
+        if not self._authorize():
+            return
+        if path == '/api/units':
+            try:
+                data = self._read_json()
+                if not isinstance(data.get('config'), dict) or not data.get('arch'):
+                    return self._json({'success': False, 'error': '缺少编译配置 config 或架构 arch'}, 400)
+                unit = self.worker.submit(data['config'], str(data['arch']))
+            except Exception as e:
+                return self._json({'success': False, 'error': str(e)}, 400)
+            return self._json({'success': True, 'unit': self._unit_dict(unit)})
+        unit, action = self._find_unit(path)
+        if unit is None:
+            return
+        if action != 'cancel':
+            return self._json({'success': False, 'error': '不支持的请求'}, 405)
+        if not self.worker.cancel(unit):
+            return self._json({'success': False, 'error': '单元已结束，或编译阶段仅 Python 编排器模式支持取消'})
+        self._json({'success': True})
+
+    def do_DELETE(self):
+        if not self._authorize():
+            return
+        unit, action = self._find_unit(self.path.partition('?')[0])
+        if unit is None:
+            return
+        if action is not None:
+            return self._json({'success': False, 'error': '不支持的请求'}, 405)
+        self.worker.release(unit)
+        self._json({'success': True})
+
+    def log_message(self, format, *args):
+        # 单元的开始和结束由 BuildWorker 输出，不逐个打印请求
+        pass
+
+    def _authorize(self) -> bool:
+        """校验令牌，不一致时返回 401"""
+        if self.worker.authorized(self.headers.get(TOKEN_HEADER)):
+            return True
+        self._json({'success': False, 'error': '令牌无效'}, 401)
+        return False
+
+    def _find_unit(self, path: str) -> Tuple[Optional[Job], Optional[str]]:
+        match = _UNIT_PATH.match(path)
+        unit = self.worker.queue.get(int(match.group(1))) if match else None
+        if unit is None:
+            self._json({'success': False, 'error': '找不到编译单元'}, 404)
+            return None, None
+        return unit, match.group(2)
+
+    @staticmethod
+    def _unit_dict(unit: Job) -> Dict[str, Any]:
+        return dict(unit.status.to_dict(), id=unit.id, arch=unit.config.architectures[0], state=unit.state)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ValueError('请求体过大')
+        data = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        if not isinstance(data, dict):
+            raise ValueError('请求体应为 JSON 对象')
+        return data
+
+    def _json(self, data: Dict[str, Any], code: int = 200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, unit: Job, since: int):
+        """每行一个 JSON 事件，单元结束（发送 result 事件）后关闭连接"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        status: UnitStatus = unit.status
+        try:
+            while True:
+                events = status.wait(since, HEARTBEAT_INTERVAL)
+                if not events:
+                    self.wfile.write(b'{"type": "heartbeat"}\n')
+                    self.wfile.flush()
+                    continue
+                self.wfile.write(''.join(json.dumps(event) + '\n' for event in events).encode('utf-8'))
+                self.wfile.flush()
+                since += len(events)
+                if events[-1]['type'] == 'result':
+                    return
+        except (ConnectionError, OSError):
+            return
+
+    def _artifact(self, unit: Job):
+        artifact = unit.status.artifact
+        if not artifact or not artifact.exists():
+            return self._json({'success': False, 'error': '没有可下载的产物'}, 404)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(artifact.stat().st_size))
+        self.end_headers()
+        with open(artifact, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
@@ -19,18 +19,34 @@ class FFmpegConfigApp {
             protocols: ['file', 'http', 'https'],
             filters: [],
             optimizations: {
-                disableAsm: true,
+                disableAsm: false,
                 enablePic: true,
                 disableDebug: true,
                 disableDoc: true,
                 disablePrograms: true,
-                enableSmall: false
+                enableSmall: false,
+                profile: '',
+                pruneLibraries: true,
+                keepLibraries: []
+            },
+            buildOptions: {
+                parallel: false,
+                jobs: 0,
+                incremental: false,
+                ccache: false,
+                configureCache: false,
+                artifactCache: false,
+                executor: 'script',
+                resolveComponents: true,
+                package: ''
             }
         };
 
         this.presets = {};
         this.isCompiling = false;
-        this.logEventSource = null;
+        this.jobId = null;  // 当前编译任务的ID
+        this.eventSource = null;
+        this.eventPolling = null;  // 长轮询时的当前会话，停止时置空
         this.autoScroll = true;
 
         this.init();
@@ -90,6 +106,14 @@ class FFmpegConfigApp {
             this.config.outputType = e.target.value;
         });
 
+        document.getElementById('optProfile').addEventListener('change', (e) => {
+            this.config.optimizations.profile = e.target.value;
+        });
+
+        document.getElementById('packageFormat').addEventListener('change', (e) => {
+            this.config.buildOptions.package = e.target.value;
+        });
+
         // 复选框监听
         this.setupCheckboxListeners();
 
@@ -98,6 +122,7 @@ class FFmpegConfigApp {
         document.getElementById('save-config-btn').addEventListener('click', () => this.saveConfig());
         document.getElementById('generate-script-btn').addEventListener('click', () => this.generateScript());
         document.getElementById('clear-logs-btn').addEventListener('click', () => this.clearLogs());
+        document.getElementById('cancel-compile-btn').addEventListener('click', () => this.cancelCompilation());
         document.getElementById('auto-scroll-btn').addEventListener('click', () => this.toggleAutoScroll());
     }
 
@@ -158,6 +183,39 @@ class FFmpegConfigApp {
         document.getElementById('disableAsm').addEventListener('change', (e) => {
             this.config.optimizations.disableAsm = e.target.checked;
         });
+
+        document.getElementById('pruneLibraries').addEventListener('change', (e) => {
+            this.config.optimizations.pruneLibraries = e.target.checked;
+        });
+
+        // 构建选项
+        document.getElementById('parallel').addEventListener('change', (e) => {
+            this.config.buildOptions.parallel = e.target.checked;
+        });
+
+        document.getElementById('incremental').addEventListener('change', (e) => {
+            this.config.buildOptions.incremental = e.target.checked;
+        });
+
+        document.getElementById('ccache').addEventListener('change', (e) => {
+            this.config.buildOptions.ccache = e.target.checked;
+        });
+
+        document.getElementById('configureCache').addEventListener('change', (e) => {
+            this.config.buildOptions.configureCache = e.target.checked;
+        });
+
+        document.getElementById('artifactCache').addEventListener('change', (e) => {
+            this.config.buildOptions.artifactCache = e.target.checked;
+        });
+
+        document.getElementById('orchestrator').addEventListener('change', (e) => {
+            this.config.buildOptions.executor = e.target.checked ? 'orchestrator' : 'script';
+        });
+
+        document.getElementById('resolveComponents').addEventListener('change', (e) => {
+            this.config.buildOptions.resolveComponents = e.target.checked;
+        });
     }
 
     selectPreset(card) {
@@ -181,6 +239,10 @@ class FFmpegConfigApp {
                 optimizations: {
                     ...this.config.optimizations,
                     ...presetConfig.optimizations
+                },
+                buildOptions: {
+                    ...this.config.buildOptions,
+                    ...presetConfig.buildOptions
                 }
             };
 
@@ -251,12 +313,24 @@ class FFmpegConfigApp {
         document.getElementById('outputType').value = this.config.outputType;
 
         // 更新优化选项
+        document.getElementById('optProfile').value = this.config.optimizations.profile || '';
         document.getElementById('enableSmall').checked = this.config.optimizations.enableSmall;
         document.getElementById('disableDebug').checked = this.config.optimizations.disableDebug;
         document.getElementById('disablePrograms').checked = this.config.optimizations.disablePrograms;
         document.getElementById('disableDoc').checked = this.config.optimizations.disableDoc;
         document.getElementById('enablePic').checked = this.config.optimizations.enablePic;
         document.getElementById('disableAsm').checked = this.config.optimizations.disableAsm;
+        document.getElementById('pruneLibraries').checked = this.config.optimizations.pruneLibraries !== false;
+
+        // 更新构建选项
+        document.getElementById('parallel').checked = this.config.buildOptions.parallel;
+        document.getElementById('incremental').checked = this.config.buildOptions.incremental;
+        document.getElementById('ccache').checked = this.config.buildOptions.ccache;
+        document.getElementById('configureCache').checked = this.config.buildOptions.configureCache;
+        document.getElementById('artifactCache').checked = this.config.buildOptions.artifactCache;
+        document.getElementById('orchestrator').checked = this.config.buildOptions.executor === 'orchestrator';
+        document.getElementById('resolveComponents').checked = this.config.buildOptions.resolveComponents;
+        document.getElementById('packageFormat').value = this.config.buildOptions.package || '';
     }
 
     switchTab(button) {
@@ -489,6 +563,28 @@ class FFmpegConfigApp {
         }
     }
 
+    async cancelCompilation(arch = null) {
+        try {
+            const response = await fetch('/api/cancel-compilation', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ arch, job: this.jobId })
+            });
+
+            const result = await response.json();
+
+            if (result.success) {
+                this.showNotification('已请求取消编译', 'warning');
+            } else {
+                this.showNotification('取消失败: ' + result.error, 'error');
+            }
+        } catch (error) {
+            this.showNotification('取消失败: ' + error.message, 'error');
+        }
+    }
+
     async startCompilation() {
         if (this.isCompiling) {
             this.showNotification('编译正在进行中...', 'warning');
@@ -515,8 +611,11 @@ class FFmpegConfigApp {
             const result = await response.json();
 
             if (result.success) {
-                this.startLogStream();
-                this.startStatusPolling();
+                this.jobId = result.jobId;
+                if (result.queuePosition) {
+                    this.showNotification(`已加入编译队列，前面还有 ${result.queuePosition} 个任务`, 'info');
+                }
+                this.startEventStream();
             } else {
                 this.showNotification('启动编译失败: ' + result.error, 'error');
                 this.isCompiling = false;
@@ -533,6 +632,8 @@ class FFmpegConfigApp {
         document.getElementById('final-compile-btn').disabled = true;
         document.getElementById('final-compile-btn').innerHTML =
             '<span class="btn-icon">⏳</span>编译中...';
+        document.getElementById('cancel-compile-btn').style.display =
+            this.config.buildOptions.executor === 'orchestrator' ? 'inline-block' : 'none';
     }
 
     showLogContainer() {
@@ -540,60 +641,120 @@ class FFmpegConfigApp {
         document.getElementById('log-content').innerHTML = '';
     }
 
-    startLogStream() {
-        if (this.logEventSource) {
-            this.logEventSource.close();
+    startEventStream() {
+        this.stopEventStream();
+
+        // 状态、阶段变化和日志由同一个事件流推送；不支持 EventSource 时改用长轮询
+        if (typeof EventSource === 'undefined') {
+            this.startEventPolling();
+            return;
         }
 
-        this.logEventSource = new EventSource('/api/logs/stream');
+        this.eventSource = new EventSource('/api/events');
 
-        this.logEventSource.onmessage = (event) => {
+        this.eventSource.onmessage = (event) => {
             try {
-                const data = JSON.parse(event.data);
-
-                if (data.type === 'heartbeat' || data.type === 'connected') {
-                    return;
-                }
-
-                this.addLogEntry(data);
+                this.handleEvent(JSON.parse(event.data));
             } catch (error) {
-                console.error('解析日志数据失败:', error);
+                console.error('解析事件数据失败:', error);
             }
         };
 
-        this.logEventSource.onerror = (error) => {
-            console.error('日志流连接错误:', error);
+        this.eventSource.onerror = (error) => {
+            // EventSource 会自动重连，并通过 Last-Event-ID 从断开处继续
+            console.error('事件流连接错误:', error);
         };
     }
 
-    startStatusPolling() {
-        const pollStatus = async () => {
+    startEventPolling() {
+        const session = this.eventPolling = {};
+        let since = 0;
+        const poll = async () => {
+            if (this.eventPolling !== session) {
+                return;
+            }
             try {
-                const response = await fetch('/api/compilation-status');
-                const status = await response.json();
-
-                this.updateCompilationStatus(status);
-
-                if (status.running) {
-                    setTimeout(pollStatus, 60000);
-                } else {
-                    this.isCompiling = false;
-                    this.onCompilationComplete(status);
-                }
+                const response = await fetch(`/api/events/poll?since=${since}`);
+                const result = await response.json();
+                result.events.forEach(event => this.handleEvent(event));
+                since = result.version;
+                setTimeout(poll, 0);
             } catch (error) {
                 console.error('获取编译状态失败:', error);
-                setTimeout(pollStatus, 60000);
+                setTimeout(poll, 3000);
             }
         };
 
-        pollStatus();
+        poll();
+    }
+
+    stopEventStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        this.eventPolling = null;
+    }
+
+    handleEvent(data) {
+        switch (data.type) {
+            case 'snapshot':
+                // 新连接或落后太多时的完整状态
+                document.getElementById('log-content').innerHTML = '';
+                data.logs.forEach(entry => this.addLogEntry(entry));
+                if (data.jobs[this.jobId]) {
+                    this.onJobStatus(data.jobs[this.jobId]);
+                }
+                break;
+            case 'status':
+                if (data.job === this.jobId) {
+                    this.onJobStatus(data.status);
+                }
+                break;
+            case 'stage':
+                if (data.job === this.jobId && data.arch === null && data.from === 'queued' && data.to === 'running') {
+                    this.showNotification('编译任务开始运行', 'info');
+                }
+                break;
+            case 'logs':
+                if (data.missed) {
+                    this.addLogEntry({
+                        timestamp: data.logs[0].timestamp,
+                        level: 'warning',
+                        message: `⚠️ 连接落后，已跳过 ${data.missed} 条日志`
+                    });
+                }
+                data.logs.forEach(entry => this.addLogEntry(entry));
+                break;
+        }
+    }
+
+    onJobStatus(status) {
+        if (!this.isCompiling) {
+            return;
+        }
+        this.updateCompilationStatus(status);
+
+        // 以任务状态为准：任务刚开始运行时编译状态的 running 还未置为 true
+        if (['success', 'failed', 'cancelled'].includes(status.state)) {
+            this.isCompiling = false;
+            this.onCompilationComplete(status);
+        }
     }
 
     updateCompilationStatus(status) {
         document.getElementById('status-text').textContent = status.status || '编译中...';
         document.getElementById('progress-fill').style.width = status.progress + '%';
         document.getElementById('progress-percentage').textContent = status.progress + '%';
-        document.getElementById('progress-stage').textContent = status.status || '';
+        let stageText = status.status || '';
+        if (status.running && status.eta != null) {
+            stageText += ' · 剩余约 ' + this.formatEta(status.eta);
+        }
+        document.getElementById('progress-stage').textContent = stageText;
+        document.getElementById('progress-stage').title = Object.entries(status.archs || {})
+            .map(([arch, info]) => `${arch}: ${info.percent}%` +
+                (info.total ? ` (${info.done}/${info.estimated ? '~' : ''}${info.total})` : ''))
+            .join('\n');
 
         // 更新状态指示器
         const indicator = document.getElementById('status-indicator');
@@ -605,14 +766,23 @@ class FFmpegConfigApp {
         }
     }
 
-    onCompilationComplete(status) {
-        if (this.logEventSource) {
-            this.logEventSource.close();
-            this.logEventSource = null;
+    formatEta(seconds) {
+        if (seconds < 60) {
+            return seconds + '秒';
         }
+        const minutes = Math.floor(seconds / 60);
+        if (minutes < 60) {
+            return minutes + '分' + (seconds % 60) + '秒';
+        }
+        return Math.floor(minutes / 60) + '小时' + (minutes % 60) + '分';
+    }
+
+    onCompilationComplete(status) {
+        this.stopEventStream();
 
         // 重新显示配置摘要
         document.getElementById('config-summary').style.display = 'block';
+        document.getElementById('cancel-compile-btn').style.display = 'none';
 
         const btn = document.getElementById('final-compile-btn');
         btn.disabled = false;